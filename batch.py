@@ -0,0 +1,201 @@
+"""
+This program runs one of the preprocessing programs on every csv file of a directory or a glob pattern.
+The files are processed concurrently in a pool of processes, so pandas is imported once per worker
+instead of once per file. Each file gets its own output, named as when the program is run on it alone.
+A failing file doesn't stop the others: its error is reported and the next files are processed.
+
+Command line: --workers=[integer] --out-dir=[directory] [program] [input] [program arguments] | --help
+    --workers: Optional. Number of files processed at the same time. The default value is the number of CPUs.
+        For example: --workers=4
+    --out-dir: Optional. Directory where the outputs are written. The default is the current directory.
+        The input files must have different names.
+        For example: --out-dir=cleaned
+    program: The program to run, one of:
+        count_missing_rows, list_missing_cols, drop_duplicates, drop_missing_data_cols,
+        drop_missing_data_rows, fill_missing_values, feature_scaling, solve_equation
+    input: A directory, whose csv files are processed, or a glob pattern.
+        For example: partitions, "partitions/2024-*.csv"
+    program arguments: The arguments of the program, without the input file, see its --help.
+        For example: python batch.py --workers=8 drop_missing_data_rows partitions --percent=5
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
+    --help: See this documentation
+
+Output:
+    The outputs of the program for each file, the status of each file,
+    and a summary aggregated over all files, for example the total number of rows with missing data.
+"""
+
+import sys
+import os
+import io
+import glob
+import time
+import importlib
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from run_metrics import instrumented
+
+# How each program takes its input file: as the first argument, or with the --in flag
+PROGRAMS = {
+    "count_missing_rows": "positional",
+    "list_missing_cols": "positional",
+    "drop_duplicates": "positional",
+    "drop_missing_data_cols": "positional",
+    "drop_missing_data_rows": "--in",
+    "fill_missing_values": "--in",
+    "feature_scaling": "positional",
+    "solve_equation": "positional",
+}
+
+
+def find_inputs(pattern: str) -> 'list[str]':
+    """List the csv files of a directory, or the files matching a glob pattern, sorted by path."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+
+
+def program_args(program: str, path: str, args: 'list[str]') -> 'list[str]':
+    """Build the command line arguments of a program run on one file."""
+    if PROGRAMS[program] == "--in":
+        return [program + ".py", "--in=" + path] + args
+    return [program + ".py", path] + args
+
+
+def summary_facts(module) -> 'dict | None':
+    """Get the facts of a processed file that are aggregated in the summary.
+    They are the counts recorded by the program in its summary variable, so the file isn't read again.
+    """
+    return getattr(module, "summary", None)
+
+
+def run_file(program: str, path: str, args: 'list[str]', outdir: str) -> 'dict':
+    """Run a program on one file, in the output directory, capturing what it prints.
+    Any error is caught, so that it only fails this file.
+
+    Returns:
+        dict: The exit code, the printed output, the facts for the summary and the duration of the run
+    """
+    start = time.perf_counter()
+    output = io.StringIO()
+    facts = None
+    cwd = os.getcwd()
+    argv = sys.argv
+    try:
+        module = importlib.import_module(program)
+        os.chdir(outdir)
+        sys.argv = program_args(program, path, args)
+        with contextlib.redirect_stdout(output):
+            code = module.main()
+        code = 0 if code is None else code
+        if code == 0:
+            facts = summary_facts(module)
+    except Exception as error:
+        code = -1
+        output.write(type(error).__name__ + ": " + str(error) + "\n")
+    finally:
+        sys.argv = argv
+        os.chdir(cwd)
+    return {"code": code, "output": output.getvalue(), "facts": facts, "seconds": time.perf_counter() - start}
+
+
+def print_summary(program: str, paths: 'list[str]', results: 'list[dict]'):
+    """Print the summary aggregated over all files."""
+    succeeded = [result for result in results if result["code"] == 0]
+    print("Files processed:", len(succeeded), "of", len(paths))
+    print("Total time of the files: {:.4f} s".format(sum(result["seconds"] for result in results)))
+    facts = [result["facts"] for result in succeeded if result["facts"] is not None]
+    if program == "count_missing_rows":
+        print("Total number of rows:", sum(fact["rows"] for fact in facts))
+        print("Total number of rows with missing data:", sum(fact["missing_rows"] for fact in facts))
+    elif program == "list_missing_cols":
+        totals = {}
+        for fact in facts:
+            for name, count in fact["missing"].items():
+                totals[name] = totals.get(name, 0) + count
+        print("Columns with missing data over all files (name - missing count):")
+        for name, count in totals.items():
+            if count > 0:
+                print(name, '-', count)
+    failed = [path for path, result in zip(paths, results) if result["code"] != 0]
+    if len(failed) > 0:
+        print("Failed files:")
+        for path in failed:
+            print("    " + path)
+
+
+def main():
+    args = sys.argv
+    parse_error = "Invalid command line arguments. Please use \"--help\" flag to see the documentation."
+
+    # Parse the options of the batch, given before the program name
+    workers = os.cpu_count() or 1
+    outdir = os.getcwd()
+    position = 1
+    while position < len(args) and args[position].startswith("--"):
+        flag, _, value = args[position].partition("=")
+        if flag == "--help":
+            print(__doc__)
+            return 0
+        elif flag == "--workers":
+            try:
+                workers = int(value)
+                if workers <= 0:
+                    raise ValueError
+            except ValueError:
+                print("The number of workers must be a positive integer.")
+                return -1
+        elif flag == "--out-dir" and len(value) > 0:
+            outdir = os.path.abspath(value)
+        else:
+            print(parse_error)
+            return -1
+        position += 1
+
+    if len(args) - position < 2:
+        print(parse_error)
+        return -1
+    program = args[position]
+    if program.endswith(".py"):
+        program = program[:-3]
+    if program not in PROGRAMS:
+        print("Unknown program: " + program + " - Please use \"--help\" flag to see the documentation.")
+        return -1
+
+    paths = [os.path.abspath(path) for path in find_inputs(args[position + 1])]
+    if len(paths) == 0:
+        print("No input file found: " + args[position + 1] + " - Please try again")
+        return -1
+    names = [os.path.basename(path) for path in paths]
+    if len(set(names)) != len(names):
+        print("The input files must have different names, as their outputs are written in the same directory.")
+        return -1
+    os.makedirs(outdir, exist_ok=True)
+
+    programArgs = args[position + 2:]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        futures = [executor.submit(run_file, program, path, programArgs, outdir) for path in paths]
+        results = []
+        for index, (path, future) in enumerate(zip(paths, futures)):
+            try:
+                result = future.result()
+            except Exception as error:
+                # The worker process itself died
+                result = {"code": -1, "output": type(error).__name__ + ": " + str(error) + "\n",
+                          "facts": None, "seconds": 0.0}
+            results.append(result)
+            status = "OK" if result["code"] == 0 else "FAILED"
+            print("[{}/{}] {} - {} ({:.4f} s)".format(index + 1, len(paths), path, status, result["seconds"]))
+            for line in result["output"].splitlines():
+                if len(line) > 0:
+                    print("    " + line)
+
+    print_summary(program, paths, results)
+
+    return 0 if all(result["code"] == 0 for result in results) else -1
+
+
+if __name__ == "__main__":
+    instrumented(main)
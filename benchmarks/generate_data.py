@@ -0,0 +1,181 @@
+"""
+This program generates a synthetic csv file with the schema of house-prices.csv, for the benchmarks.
+Every column is sampled from the values of the same column in the schema file, so nominal columns
+keep their categories and frequencies and numeric columns keep their distributions.
+The rows are generated and written in chunks, so files of 10M+ rows can be generated with little memory.
+
+Command line: [output_path] --rows=[integer] --missing=[float] --duplicates=[float] --seed=[integer] --schema=[csv_path] | --help
+    output_path: Path to the generated csv file.
+        For example: synthetic.csv
+    --rows: Optional. Number of rows. The default value is 100000.
+        For example: --rows=10000000
+    --missing: Optional. Average ratio of missing cells, in range [0, 1].
+        The missing cells are spread over the columns in proportion to their missing ratio in the schema file.
+        By default, each column keeps its missing ratio of the schema file.
+        For example: --missing=0.1
+    --duplicates: Optional. Ratio of rows that are copies of a previous row, in range [0, 1).
+        The default value is 0.01.
+        For example: --duplicates=0.05
+    --seed: Optional. Seed of the random generator. The default value is 0.
+    --schema: Optional. The csv file whose schema and values are mimicked. The default is house-prices.csv.
+    --help: See this documentation
+
+Output:
+    The generated csv file.
+"""
+
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_PATH = os.path.join(ROOT, "house-prices.csv")
+
+# Number of rows generated and written at a time
+CHUNKSIZE = 100000
+
+
+def load_schema(path: str) -> 'list[dict]':
+    """Load the columns of the schema file: their name, their available values and their missing ratio.
+    A column of distinct integers, like Id, is marked as an identifier and numbered instead of sampled.
+
+    Args:
+        path (str): Path to the schema csv file
+
+    Returns:
+        list[dict]: The description of each column
+    """
+    df = pd.read_csv(path)
+    schema = []
+    for name in df.columns:
+        column = df[name]
+        values = column.dropna().to_numpy()
+        schema.append({
+            "name": name,
+            "values": values,
+            "missing": float(column.isna().mean()),
+            "integer": column.dtype.kind in "iu" or (len(values) > 0 and column.dtype.kind == "f"
+                                                      and bool((values == np.round(values)).all())),
+            "identifier": column.dtype.kind in "iu" and column.is_unique and column.notna().all(),
+        })
+    return schema
+
+
+def missing_ratios(schema: 'list[dict]', missing: 'float | None') -> 'list[float]':
+    """Get the missing ratio of each column, scaled so that their average is the requested ratio."""
+    ratios = np.array([column["missing"] for column in schema])
+    if missing is None:
+        return ratios.tolist()
+    if ratios.sum() == 0:
+        return [missing] * len(schema)
+    # Columns can't be more than fully missing, so the scale is raised until the average is reached
+    scale = missing / ratios.mean()
+    for _ in range(100):
+        scaled = np.minimum(ratios * scale, 1.0)
+        if scaled.mean() >= missing * (1 - 1e-9) or (scaled[ratios > 0] == 1).all():
+            break
+        scale *= missing / scaled.mean()
+    return scaled.tolist()
+
+
+def generate_chunk(schema: 'list[dict]', ratios: 'list[float]', start: int, rows: int,
+                   duplicates: float, rng: 'np.random.Generator') -> 'pd.DataFrame':
+    """Generate a chunk of rows, numbered from start.
+
+    Returns:
+        pandas.DataFrame: The generated rows
+    """
+    data = {}
+    for column, ratio in zip(schema, ratios):
+        if column["identifier"]:
+            data[column["name"]] = np.arange(start + 1, start + rows + 1)
+            continue
+        if len(column["values"]) == 0:
+            data[column["name"]] = np.full(rows, np.nan)
+            continue
+        values = column["values"][rng.integers(len(column["values"]), size=rows)]
+        blank = rng.random(rows) < ratio
+        if column["integer"]:
+            # Nullable integers are written without a decimal part, like in the schema file
+            data[column["name"]] = pd.array(values.astype(np.int64), dtype="Int64")
+            data[column["name"]][blank] = pd.NA
+        else:
+            values = values.copy()
+            values[blank] = np.nan
+            data[column["name"]] = values
+    chunk = pd.DataFrame(data)
+    if duplicates > 0 and rows > 1:
+        # Replace some rows with copies of previous rows of the chunk
+        order = np.arange(rows)
+        copies = np.flatnonzero(rng.random(rows) < duplicates)
+        copies = copies[copies > 0]
+        sources = (rng.random(len(copies)) * copies).astype(np.int64)
+        # A copy of a copy is a copy of the original row
+        for copy, source in zip(copies, sources):
+            order[copy] = order[source]
+        chunk = chunk.iloc[order].reset_index(drop=True)
+    return chunk
+
+
+def generate(path: str, rows: int, missing: 'float | None' = None, duplicates: float = 0.01,
+             seed: int = 0, schema_path: str = SCHEMA_PATH):
+    """Generate a synthetic csv file, see the module documentation.
+
+    Args:
+        path (str): Path to the generated csv file
+        rows (int): Number of rows
+        missing (float | None): Average ratio of missing cells, or None to keep the ratios of the schema file
+        duplicates (float): Ratio of rows that are copies of a previous row
+        seed (int): Seed of the random generator
+        schema_path (str): Path to the csv file whose schema is mimicked
+    """
+    schema = load_schema(schema_path)
+    ratios = missing_ratios(schema, missing)
+    rng = np.random.default_rng(seed)
+    # An empty file still gets its header
+    for start in range(0, max(rows, 1), CHUNKSIZE):
+        chunk = generate_chunk(schema, ratios, start, min(CHUNKSIZE, rows - start), duplicates, rng)
+        chunk.to_csv(path, index=False, mode="w" if start == 0 else "a", header=start == 0)
+
+
+def main():
+    args = sys.argv
+    parse_error = "Invalid command line arguments. Please use \"--help\" flag to see the documentation."
+
+    if len(args) < 2:
+        print(parse_error)
+        return -1
+    if args[1] == "--help":
+        print(__doc__)
+        return 0
+
+    options = {"--rows": 100000, "--missing": None, "--duplicates": 0.01, "--seed": 0, "--schema": SCHEMA_PATH}
+    for arg in args[2:]:
+        flag, _, value = arg.partition("=")
+        try:
+            if flag in ("--rows", "--seed"):
+                options[flag] = int(value)
+                if options[flag] < 0:
+                    raise ValueError
+            elif flag in ("--missing", "--duplicates"):
+                options[flag] = float(value)
+                if not 0 <= options[flag] <= 1 or (flag == "--duplicates" and options[flag] == 1):
+                    raise ValueError
+            elif flag == "--schema" and os.path.exists(value):
+                options[flag] = value
+            else:
+                raise ValueError
+        except ValueError:
+            print("Invalid option " + arg + ". Please use \"--help\" flag to see the documentation.")
+            return -1
+
+    generate(args[1], options["--rows"], options["--missing"], options["--duplicates"],
+             options["--seed"], options["--schema"])
+    print("GENERATED " + str(options["--rows"]) + " ROWS TO " + args[1])
+
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+This program runs every preprocessing program on a synthetic csv file and records, for each one,
+its wall time, its throughput in rows per second and its peak memory (resident set size).
+The results are written to a JSON file and can be compared with a saved baseline to flag regressions.
+
+Each program runs in its own process, in a temporary directory, with the profile cache disabled,
+so that the runs don't reuse each other's work. With --repeat, the fastest run is kept.
+The benchmarks ending with _workers_1 and _workers run the same program with 1 and 4 processes,
+to show how it scales with --workers.
+
+Command line: --rows=[integer] --missing=[float] --duplicates=[float] --seed=[integer] --data=[csv_path]
+              --only=[names] --repeat=[integer] --output=[json_path] --baseline=[json_path]
+              --tolerance=[float] --save-baseline | --help
+    --rows: Optional. Number of rows of the synthetic file, see generate_data.py. The default value is 100000.
+        For example: --rows=10000000
+    --missing: Optional. Average ratio of missing cells of the synthetic file. The default value is 0.05.
+    --duplicates: Optional. Ratio of duplicated rows of the synthetic file. The default value is 0.01.
+    --seed: Optional. Seed of the synthetic file. The default value is 0.
+    --data: Optional. Benchmark this csv file instead of generating one. It must have the house-prices columns.
+        For example: --data=synthetic.csv
+    --only: Optional. Names of the benchmarks to run, separated by comma. By default, all of them are run.
+        For example: --only=drop_duplicates,feature_scaling
+    --repeat: Optional. Number of runs of each benchmark. The default value is 1.
+    --output: Optional. Path to the results file. The default is "benchmark_results.json".
+    --baseline: Optional. Compare the results with this results file, and fail if a benchmark regressed.
+        For example: --baseline=benchmarks/baseline.json
+    --tolerance: Optional. Allowed relative slowdown or memory growth over the baseline. The default value is 0.2.
+        Slowdowns of less than 0.05 seconds are ignored, as they are mostly noise.
+    --save-baseline: Optional. Also write the results to the --baseline file, replacing it.
+    --help: See this documentation
+
+Output:
+    A table of the results, and the results file:
+        {"rows": ..., "python": ..., "platform": ...,
+         "benchmarks": {name: {"seconds": ..., "rows_per_second": ..., "peak_rss_mb": ..., "returncode": ...}}}
+"""
+
+import sys
+import os
+import csv
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Slowdowns under this many seconds are not regressions
+MIN_SLOWDOWN = 0.05
+
+PIPELINE_SPEC = {
+    "input": "data.csv",
+    "output": "output_pipeline.csv",
+    "steps": [
+        {"step": "drop_duplicates"},
+        {"step": "drop_missing_data_cols", "percentage": 0.5},
+        {"step": "fill_missing_values", "num_method": "mean"},
+        {"step": "feature_scaling", "attribute": "LotArea", "include": "all"},
+        {"step": "solve_equation", "equation": "LotArea*2+MSSubClass", "name": "Score"},
+    ],
+}
+
+# The name of each benchmark and the command line of its program, run on data.csv
+BENCHMARKS = [
+    ("count_missing_rows", ["count_missing_rows.py", "data.csv"]),
+    ("count_missing_rows_workers_1", ["count_missing_rows.py", "data.csv", "--workers=1"]),
+    ("count_missing_rows_workers", ["count_missing_rows.py", "data.csv", "--workers=4"]),
+    ("list_missing_cols", ["list_missing_cols.py", "data.csv"]),
+    ("drop_duplicates", ["drop_duplicates.py", "data.csv"]),
+    ("drop_missing_data_cols", ["drop_missing_data_cols.py", "data.csv", "0.5"]),
+    ("drop_missing_data_cols_workers_1", ["drop_missing_data_cols.py", "data.csv", "0.5", "--workers=1"]),
+    ("drop_missing_data_cols_workers", ["drop_missing_data_cols.py", "data.csv", "0.5", "--workers=4"]),
+    ("drop_missing_data_rows", ["drop_missing_data_rows.py", "--in=data.csv", "--percent=5"]),
+    ("drop_missing_data_rows_chunked",
+     ["drop_missing_data_rows.py", "--in=data.csv", "--percent=5", "--chunksize=100000"]),
+    ("fill_missing_values", ["fill_missing_values.py", "--in=data.csv", "--attributes=all"]),
+    ("fill_missing_values_median",
+     ["fill_missing_values.py", "--in=data.csv", "--attributes=all", "--num_method=median"]),
+    ("fill_missing_values_chunked",
+     ["fill_missing_values.py", "--in=data.csv", "--attributes=all", "--chunksize=100000"]),
+    ("feature_scaling", ["feature_scaling.py", "data.csv", "all-numeric", "all"]),
+    ("solve_equation", ["solve_equation.py", "data.csv", "LotArea*2+MSSubClass"]),
+    ("pipeline", ["pipeline.py", "pipeline.json"]),
+]
+
+
+def run_program(args: 'list[str]', workdir: str) -> 'tuple[float, float | None, int]':
+    """Run a program of the repository in its own process.
+
+    Args:
+        args (list[str]): The command line arguments, starting with the program file name
+        workdir (str): The working directory of the process
+
+    Returns:
+        tuple: The wall time in seconds, the peak resident set size in megabytes
+            (None if the platform can't tell) and the exit code
+    """
+    env = dict(os.environ, PREPROCESSING_CACHE_DIR="")
+    command = [sys.executable, os.path.join(ROOT, args[0])] + args[1:]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL)
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        peak = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    else:
+        process.wait()
+        seconds = time.perf_counter() - start
+        peak = None
+    return seconds, peak, process.returncode
+
+
+def run_benchmarks(datapath: str, rows: int, names: 'list[str] | None', repeat: int) -> 'dict':
+    """Run the benchmarks on a csv file, printing each result as it is measured.
+
+    Args:
+        datapath (str): Path to the csv file
+        rows (int): Number of data rows of the csv file
+        names (list[str] | None): Names of the benchmarks to run, None for all
+        repeat (int): Number of runs of each benchmark, the fastest one is kept
+
+    Returns:
+        dict: The result of each benchmark, keyed by name
+    """
+    results = {}
+    for name, args in BENCHMARKS:
+        if names is not None and name not in names:
+            continue
+        best = None
+        for _ in range(repeat):
+            # A fresh directory per run, so no output or cache of a previous run is reused
+            workdir = tempfile.mkdtemp(prefix="benchmark_")
+            try:
+                os.symlink(os.path.abspath(datapath), os.path.join(workdir, "data.csv"))
+                with open(os.path.join(workdir, "pipeline.json"), "w") as file:
+                    json.dump(PIPELINE_SPEC, file)
+                seconds, peak, code = run_program(args, workdir)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            if best is None or seconds < best["seconds"]:
+                best = {"seconds": round(seconds, 4),
+                        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else None,
+                        "peak_rss_mb": None if peak is None else round(peak, 1),
+                        "returncode": code}
+        results[name] = best
+        print("{:<32} {:>10.4f} s {:>14} rows/s {:>10} MB{}".format(
+            name, best["seconds"], str(best["rows_per_second"]), str(best["peak_rss_mb"]),
+            "" if best["returncode"] == 0 else "  FAILED (exit code " + str(best["returncode"]) + ")"))
+    return results
+
+
+def find_regressions(results: 'dict', baseline: 'dict', tolerance: float) -> 'list[str]':
+    """Compare the results with a baseline.
+
+    Args:
+        results (dict): The results file content, see the module documentation
+        baseline (dict): The baseline file content
+        tolerance (float): Allowed relative growth of the time and of the peak memory
+
+    Returns:
+        list[str]: A description of each regression
+    """
+    regressions = []
+    if baseline.get("rows") != results["rows"]:
+        print("Warning: the baseline was measured on " + str(baseline.get("rows")) + " rows, not "
+              + str(results["rows"]) + ".")
+    for name, result in results["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if base is None:
+            continue
+        if result["returncode"] != 0 and base["returncode"] == 0:
+            regressions.append(name + ": failed with exit code " + str(result["returncode"]))
+            continue
+        if (result["seconds"] > base["seconds"] * (1 + tolerance)
+                and result["seconds"] - base["seconds"] > MIN_SLOWDOWN):
+            regressions.append("{}: {:.4f} s, baseline {:.4f} s".format(name, result["seconds"], base["seconds"]))
+        if (result["peak_rss_mb"] is not None and base["peak_rss_mb"] is not None
+                and result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance)):
+            regressions.append("{}: {} MB, baseline {} MB".format(name, result["peak_rss_mb"], base["peak_rss_mb"]))
+    return regressions
+
+
+def count_rows(path: str) -> int:
+    """Count the data rows of a csv file."""
+    # pandas is not imported by this process: the peak memory of a child process on Linux
+    # starts from the memory of its parent, and would hide the memory used by the programs
+    with open(path, newline='') as file:
+        return max(sum(1 for _ in csv.reader(file)) - 1, 0)
+
+
+def main():
+    args = sys.argv
+    parse_error = "Invalid command line arguments. Please use \"--help\" flag to see the documentation."
+
+    options = {"--rows": 100000, "--missing": 0.05, "--duplicates": 0.01, "--seed": 0, "--data": None,
+               "--only": None, "--repeat": 1, "--output": "benchmark_results.json", "--baseline": None,
+               "--tolerance": 0.2, "--save-baseline": False}
+    for arg in args[1:]:
+        flag, _, value = arg.partition("=")
+        if flag == "--help":
+            print(__doc__)
+            return 0
+        try:
+            if flag in ("--rows", "--seed", "--repeat"):
+                options[flag] = int(value)
+                if options[flag] < 0 or (flag == "--repeat" and options[flag] == 0):
+                    raise ValueError
+            elif flag in ("--missing", "--duplicates", "--tolerance"):
+                options[flag] = float(value)
+                if options[flag] < 0:
+                    raise ValueError
+            elif flag == "--data" and os.path.exists(value):
+                options[flag] = value
+            elif flag == "--only" and len(value) > 0:
+                options[flag] = value.split(",")
+            elif flag in ("--output", "--baseline") and len(value) > 0:
+                options[flag] = value
+            elif arg == "--save-baseline":
+                options[flag] = True
+            else:
+                raise ValueError
+        except ValueError:
+            print(parse_error)
+            return -1
+    if options["--save-baseline"] and options["--baseline"] is None:
+        print("--save-baseline needs the --baseline file.")
+        return -1
+    known = [name for name, _ in BENCHMARKS]
+    if options["--only"] is not None and any(name not in known for name in options["--only"]):
+        print("Unknown benchmark. The benchmarks are: " + ", ".join(known))
+        return -1
+
+    datadir = None
+    try:
+        if options["--data"] is None:
+            datadir = tempfile.mkdtemp(prefix="benchmark_data_")
+            datapath = os.path.join(datadir, "data.csv")
+            print("Generating " + str(options["--rows"]) + " rows...")
+            # Generated in another process, for the same reason as in count_rows
+            subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate_data.py"),
+                            datapath, "--rows=" + str(options["--rows"]), "--missing=" + str(options["--missing"]),
+                            "--duplicates=" + str(options["--duplicates"]), "--seed=" + str(options["--seed"])],
+                           check=True, stdout=subprocess.DEVNULL)
+            rows = options["--rows"]
+        else:
+            datapath = options["--data"]
+            rows = count_rows(datapath)
+        results = {"rows": rows, "python": platform.python_version(), "platform": platform.platform(),
+                   "benchmarks": run_benchmarks(datapath, rows, options["--only"], options["--repeat"])}
+    finally:
+        if datadir is not None:
+            shutil.rmtree(datadir, ignore_errors=True)
+
+    with open(options["--output"], "w") as file:
+        json.dump(results, file, indent=4)
+    print("RESULTS SAVED TO " + options["--output"])
+
+    code = 0
+    if options["--save-baseline"]:
+        shutil.copyfile(options["--output"], options["--baseline"])
+        print("BASELINE SAVED TO " + options["--baseline"])
+    elif options["--baseline"] is not None:
+        with open(options["--baseline"]) as file:
+            regressions = find_regressions(results, json.load(file), options["--tolerance"])
+        if len(regressions) > 0:
+            print("Regressions over the baseline:")
+            for regression in regressions:
+                print("    " + regression)
+            code = -1
+        else:
+            print("No regression over the baseline.")
+    if any(result["returncode"] != 0 for result in results["benchmarks"].values()):
+        code = -1
+
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+This program sends a preprocessing program run to the local server (see server.py), which runs it
+in the current directory, and prints what the program printed.
+Runs on a table that the server read recently are much faster than running the program directly,
+as neither pandas nor the csv file has to be loaded again.
+This program only imports the standard library, so it starts quickly.
+
+Command line: --socket=[socket_path] [program] [program arguments] | --status | --stop | --help
+    --socket: Optional. Path to the Unix socket of the server. The default is the default of server.py.
+        The socket must belong to the user.
+        For example: --socket=cleanup.sock
+    program: The program to run, one of:
+        count_missing_rows, list_missing_cols, drop_duplicates, drop_missing_data_cols,
+        drop_missing_data_rows, fill_missing_values, feature_scaling, solve_equation,
+        pipeline, columnar_cache, table_schema
+    program arguments: The arguments of the program, see its --help.
+        For example: python client.py fill_missing_values --in=house-prices.csv --num_method=median
+    --status: Print the tables cached by the server and the number of cache hits and misses
+    --stop: Stop the server
+    --help: See this documentation
+
+Output:
+    The output of the program, as if it was run directly.
+"""
+
+import sys
+import os
+from server import PROGRAMS, default_socket, send_request
+
+
+def main():
+    args = sys.argv
+    parse_error = "Invalid command line arguments. Please use \"--help\" flag to see the documentation."
+
+    # Parse the options of the client, given before the program name
+    path = None
+    position = 1
+    request = None
+    while position < len(args) and args[position].startswith("--"):
+        flag, _, value = args[position].partition("=")
+        if flag == "--help":
+            print(__doc__)
+            return 0
+        elif flag == "--socket" and len(value) > 0:
+            path = value
+        elif flag == "--status":
+            request = {"status": True}
+        elif flag == "--stop":
+            request = {"stop": True}
+        else:
+            print(parse_error)
+            return -1
+        position += 1
+
+    if request is None:
+        if position >= len(args):
+            print(parse_error)
+            return -1
+        program = args[position]
+        if program.endswith(".py"):
+            program = program[:-3]
+        if program not in PROGRAMS:
+            print("Unknown program: " + program + " - Please use \"--help\" flag to see the documentation.")
+            return -1
+        request = {"program": program, "args": args[position + 1:], "cwd": os.getcwd()}
+    elif position < len(args):
+        print(parse_error)
+        return -1
+
+    if path is None:
+        path = default_socket()
+    try:
+        response = send_request(path, request)
+    except (OSError, ValueError) as error:
+        print("Can't reach the server on " + path + " (" + str(error) + "). Please start it with server.py")
+        return -1
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+
+    return response["code"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""This module computes the column profile of a csv file in one streaming pass and caches it,
+so that the programs run on the same file don't rediscover the same facts every time.
+
+The profile holds the number of rows and of rows with missing data, and for each column:
+    - its kind: "numeric", "nominal", or "mixed" when it can't be read with a single type
+    - the number of missing data cells, and of empty fields among them
+    - numeric columns: count, mean, sum of squared deviations (m2), min and max of the values
+    - nominal columns: the count of each value, in order of appearance (None if there are too many values)
+
+Missing data cells are the ones pandas reads as missing, see missing_mask.py.
+
+The profiles are cached as JSON files in CACHE_DIR, one per input file.
+A cached profile is valid only while the path, size, modification time and content hash
+of the file are unchanged. The content hash covers the size and the first and last HASH_SAMPLE bytes,
+so it stays cheap on large files while catching rewrites that keep the size and modification time.
+When the cache grows over CACHE_MAX_BYTES, the least recently used profiles are removed.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from run_metrics import timed_chunks
+from compressed_input import read_csv
+
+FORMAT_VERSION = 1
+
+# Directory of the cached profiles. Setting the environment variable to an empty value disables the cache
+CACHE_DIR = os.environ.get("PREPROCESSING_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "preprocessing_data"))
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Number of bytes hashed at the start and at the end of the file
+HASH_SAMPLE = 1024 * 1024
+
+# Number of rows read at a time
+CHUNKSIZE = 100000
+
+# Nominal columns with more distinct values than this don't keep their value counts
+MAX_VALUES = 10000
+
+# The strings read as missing by pandas.read_csv by default
+NA_STRINGS = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+              '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+
+def column_stats(values) -> dict:
+    """Get the count, mean, sum of squared deviations (m2), min and max of the non-missing values of a column.
+
+    Args:
+        values (Iterable): Numeric values, missing values are NaN
+
+    Returns:
+        dict: The statistics of the values
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': np.nan, 'max': np.nan}
+    mean = values.mean()
+    return {'count': len(values), 'mean': mean, 'm2': float(((values - mean) ** 2).sum()),
+            'min': values.min(), 'max': values.max()}
+
+
+def merge_stats(a: dict, b: dict) -> dict:
+    """Merge the statistics of two parts of a column with the numerically stable update of Welford/Chan,
+    so the statistics can be accumulated chunk by chunk.
+
+    Args:
+        a (dict): The statistics of the first part, see column_stats
+        b (dict): The statistics of the second part
+
+    Returns:
+        dict: The statistics of both parts
+    """
+    if a['count'] == 0:
+        return b
+    if b['count'] == 0:
+        return a
+    count = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    return {'count': count,
+            'mean': a['mean'] + delta * b['count'] / count,
+            'm2': a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / count,
+            'min': min(a['min'], b['min']),
+            'max': max(a['max'], b['max'])}
+
+
+def file_key(path: str) -> 'dict':
+    """Identify the current content of a file by its path, size, modification time and sampled content hash.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        dict: The key of the file
+    """
+    info = os.stat(path)
+    digest = hashlib.blake2b(str(info.st_size).encode(), digest_size=16)
+    with open(path, "rb") as file:
+        digest.update(file.read(HASH_SAMPLE))
+        if info.st_size > 2 * HASH_SAMPLE:
+            file.seek(-HASH_SAMPLE, os.SEEK_END)
+        digest.update(file.read(HASH_SAMPLE))
+    return {"path": os.path.abspath(path), "size": info.st_size,
+            "mtime": info.st_mtime_ns, "hash": digest.hexdigest()}
+
+
+def cache_path(path: str) -> str:
+    """Get the path of the cached profile of a file."""
+    name = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=16).hexdigest()
+    return os.path.join(CACHE_DIR, name + ".json")
+
+
+def is_numeric(values: 'pd.Series') -> bool:
+    """Tell whether all the values parse as numbers. Nominal values fail on the first one, which is cheap."""
+    try:
+        pd.to_numeric(values)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+
+def compute_profile(path: str, chunksize: int = CHUNKSIZE) -> 'dict':
+    """Compute the profile of a csv file, streaming it once in chunks.
+
+    Args:
+        path (str): Path to the csv file
+        chunksize (int): Number of rows of each chunk
+
+    Returns:
+        dict: The profile, see the module documentation
+    """
+    rows = 0
+    missingRows = 0
+    columns = None
+    # Only empty fields are read as NaN, so the other missing strings can be told apart
+    for chunk in timed_chunks(read_csv(path, chunksize=chunksize, keep_default_na=False, na_values=[''])):
+        if columns is None:
+            columns = [{"name": name, "kinds": set(), "missing": 0, "empty": 0, "float": False,
+                        "stats": column_stats([]), "values": {}} for name in chunk.columns]
+        empty = chunk.isna().to_numpy()
+        missing = empty.copy()
+        for colIndex, column in enumerate(columns):
+            values = chunk.iloc[:, colIndex]
+            if values.dtype.kind in "iuf":
+                column["kinds"].add("numeric")
+                column["float"] |= values.dtype.kind == "f"
+                column["stats"] = merge_stats(column["stats"], column_stats(values))
+            elif pd.api.types.is_bool_dtype(values.dtype):
+                column["kinds"].add("mixed")
+            else:
+                values = values.astype(object)
+                missing[:, colIndex] |= values.isin(NA_STRINGS).to_numpy()
+                available = values[~missing[:, colIndex]]
+                if len(available) == 0:
+                    # pandas reads a chunk without any value as a float column
+                    column["kinds"].add("numeric")
+                    column["float"] = True
+                elif is_numeric(available):
+                    # the missing strings hide a numeric column, read differently by pandas
+                    column["kinds"].add("mixed")
+                else:
+                    column["kinds"].add("nominal")
+                    if column["values"] is not None:
+                        # Count the values of the chunk, in order of appearance
+                        codes, uniques = pd.factorize(available.to_numpy())
+                        for value, count in zip(uniques, np.bincount(codes, minlength=len(uniques))):
+                            column["values"][value] = column["values"].get(value, 0) + int(count)
+                        if len(column["values"]) > MAX_VALUES:
+                            column["values"] = None
+        rows += len(chunk)
+        missingRows += int(missing.any(axis=1).sum())
+        for colIndex, column in enumerate(columns):
+            column["empty"] += int(empty[:, colIndex].sum())
+            column["missing"] += int(missing[:, colIndex].sum())
+
+    result = []
+    for column in columns or []:
+        kinds = column.pop("kinds")
+        stats = column.pop("stats")
+        values = column.pop("values")
+        # chunks without any value don't decide the kind of a nominal column
+        if kinds == {"numeric"}:
+            column["kind"] = "numeric"
+            column.update({key: value.item() if hasattr(value, "item") else value for key, value in stats.items()})
+        elif kinds == {"nominal", "numeric"} and stats["count"] == 0 or kinds == {"nominal"}:
+            column["kind"] = "nominal"
+            column["values"] = values
+        else:
+            column["kind"] = "mixed"
+        result.append(column)
+    return {"format_version": FORMAT_VERSION, "chunksize": chunksize,
+            "rows": rows, "missing_rows": missingRows, "columns": result}
+
+
+def load_profile(path: str) -> 'dict | None':
+    """Load the cached profile of a csv file if it is still valid.
+
+    Args:
+        path (str): Path to the csv file
+
+    Returns:
+        dict | None: The profile, or None if there is no valid cached profile
+    """
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(cache_path(path)) as file:
+            cached = json.load(file)
+        if cached.get("format_version") != FORMAT_VERSION or cached.get("key") != file_key(path):
+            return None
+        # Mark the profile as recently used for the eviction
+        os.utime(cache_path(path))
+    except (OSError, ValueError):
+        return None
+    return cached["profile"]
+
+
+def save_profile(path: str, profile: 'dict'):
+    """Cache the profile of a csv file, then evict the least recently used profiles over CACHE_MAX_BYTES.
+    Failing to write the cache is not an error, the profile is only computed again next time.
+
+    Args:
+        path (str): Path to the csv file
+        profile (dict): The profile, see compute_profile
+    """
+    if not CACHE_DIR:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temppath = cache_path(path) + ".tmp"
+        with open(temppath, "w") as file:
+            json.dump({"format_version": FORMAT_VERSION, "key": file_key(path), "profile": profile}, file)
+        os.replace(temppath, cache_path(path))
+        evict(CACHE_MAX_BYTES)
+    except OSError:
+        pass
+
+
+def evict(limit: int):
+    """Remove the least recently used profiles until the cache holds at most limit bytes.
+
+    Args:
+        limit (int): Maximum total size of the cached profiles, in bytes
+    """
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".json"):
+            info = os.stat(os.path.join(CACHE_DIR, name))
+            entries.append((info.st_mtime_ns, info.st_size, name))
+    total = sum(entry[1] for entry in entries)
+    for _, size, name in sorted(entries):
+        if total <= limit:
+            break
+        os.remove(os.path.join(CACHE_DIR, name))
+        total -= size
+
+
+def get_profile(path: str, chunksize: int = CHUNKSIZE) -> 'dict':
+    """Get the profile of a csv file from the cache, or compute and cache it.
+
+    Args:
+        path (str): Path to the csv file
+        chunksize (int): Number of rows of each chunk, if the profile is computed
+
+    Returns:
+        dict: The profile, see compute_profile
+    """
+    profile = load_profile(path)
+    if profile is None:
+        profile = compute_profile(path, chunksize)
+        save_profile(path, profile)
+    return profile
@@ -0,0 +1,233 @@
+"""
+This program converts a csv file into a columnar binary cache, so that the other programs
+open the table without parsing the csv text again.
+
+The cache is a directory next to the csv file, named csv_path + ".cols", holding:
+    - one .npy array per numeric column, which can be memory-mapped
+    - one .npy array of integer codes per nominal column, with its dictionary of distinct values in a .json file
+      (code -1 is a missing value)
+    - meta.json, with the column names and types and the key of the csv file it was converted from
+
+The programs that load the whole csv file, and feature_scaling.py for its statistics,
+use the cache transparently when it exists and is valid,
+that is when the path, size, modification time and content hash of the csv file are unchanged
+(see column_profile.py). Compressed csv files (see compressed_input.py) are cached the same way.
+The table read from the cache has the same values as the one parsed from the csv file, without copying
+its numeric columns, and its nominal columns are categoricals over their cached codes.
+Delete the directory to remove the cache.
+
+Command line: [csv_path] | --help
+    csv_path: Path to the csv file to convert.
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        For example: a.csv, "a b c.csv"
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
+    --help: See this documentation
+
+Output:
+    The cache directory of the csv file.
+"""
+
+import sys
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from column_profile import file_key
+from run_metrics import instrumented, stage, add_rows
+from compressed_input import read_csv
+import table_schema
+
+FORMAT_VERSION = 1
+
+# Tables kept in memory by a long-lived process between the runs of the programs (see server.py),
+# a table_cache.TableCache, or None in a normal run
+memory_cache = None
+
+
+def cache_dir(path: str) -> str:
+    """Get the path of the cache directory of a csv file."""
+    return path + ".cols"
+
+
+def write_cache(path: str, df: 'pd.DataFrame | None' = None) -> str:
+    """Convert a csv file into its columnar cache.
+    With the schema (see table_schema.py), the numeric columns are stored with their compact types,
+    so load_table maps them without converting them.
+
+    Args:
+        path (str): Path to the csv file
+        df (pandas.DataFrame | None): The table parsed from the csv file, parsed again if not given
+
+    Returns:
+        str: Path to the cache directory
+
+    Raises:
+        ValueError: If a column can't be stored, for example if it mixes numbers and strings
+    """
+    key = file_key(path)
+    if df is None:
+        with stage("read"):
+            df = read_csv(path)
+        add_rows(len(df))
+    if table_schema.SCHEMA:
+        df = table_schema.apply_schema(df, table_schema.get_schema(path))
+    directory = cache_dir(path)
+    # Write into a temporary directory first, so an interrupted conversion never leaves a broken cache
+    tempdir = directory + ".tmp"
+    shutil.rmtree(tempdir, ignore_errors=True)
+    os.makedirs(tempdir)
+    try:
+        columns = []
+        # The columns are encoded and saved one by one, so both are counted in the write stage
+        with stage("write"):
+            for colIndex, name in enumerate(df.columns):
+                column = df.iloc[:, colIndex]
+                filename = "col" + str(colIndex)
+                if column.dtype.kind in "iufb":
+                    np.save(os.path.join(tempdir, filename + ".npy"), column.to_numpy())
+                    columns.append({"name": name, "dtype": str(column.dtype), "encoding": "plain"})
+                    continue
+                values = column.to_numpy(dtype=object)
+                # Dictionary-encode the strings, missing values get code -1
+                codes, uniques = pd.factorize(values)
+                # The values are stored in JSON, which keeps the type of strings, booleans and numbers
+                if any(type(value) not in (str, bool, int, float) for value in uniques):
+                    raise ValueError("Column " + str(name) + " has values that can't be stored")
+                width = np.int8 if len(uniques) < 2 ** 7 else np.int16 if len(uniques) < 2 ** 15 else np.int32
+                np.save(os.path.join(tempdir, filename + ".npy"), codes.astype(width))
+                with open(os.path.join(tempdir, filename + ".json"), "w") as file:
+                    json.dump(uniques.tolist(), file)
+                columns.append({"name": name, "dtype": str(column.dtype), "encoding": "dictionary"})
+            with open(os.path.join(tempdir, "meta.json"), "w") as file:
+                json.dump({"format_version": FORMAT_VERSION, "key": key, "rows": len(df), "columns": columns}, file)
+    except BaseException:
+        shutil.rmtree(tempdir, ignore_errors=True)
+        raise
+    shutil.rmtree(directory, ignore_errors=True)
+    os.rename(tempdir, directory)
+    return directory
+
+
+def load_meta(path: str) -> 'dict | None':
+    """Load the description of the cache of a csv file if the cache is still valid.
+
+    Args:
+        path (str): Path to the csv file
+
+    Returns:
+        dict | None: The content of meta.json, or None if there is no valid cache
+    """
+    try:
+        with open(os.path.join(cache_dir(path), "meta.json")) as file:
+            meta = json.load(file)
+        if meta.get("format_version") != FORMAT_VERSION or meta.get("key") != file_key(path):
+            return None
+    except (OSError, ValueError):
+        return None
+    return meta
+
+
+def open_columns(path: str, meta: 'dict | None' = None) -> 'dict | None':
+    """Open the columns of a csv file from its cache without copying them.
+    Numeric columns are read-only memory-mapped arrays,
+    nominal columns are (memory-mapped codes, array of distinct values) pairs.
+
+    Args:
+        path (str): Path to the csv file
+        meta (dict | None): The description of the cache if already loaded, see load_meta
+
+    Returns:
+        dict | None: The columns keyed by name, in order, or None if there is no valid cache
+    """
+    if meta is None:
+        meta = load_meta(path)
+    if meta is None:
+        return None
+    directory = cache_dir(path)
+    columns = {}
+    for colIndex, column in enumerate(meta["columns"]):
+        filename = os.path.join(directory, "col" + str(colIndex))
+        values = np.load(filename + ".npy", mmap_mode="r")
+        if column["encoding"] == "dictionary":
+            with open(filename + ".json") as file:
+                values = (values, np.array(json.load(file), dtype=object))
+        columns[column["name"]] = values
+    return columns
+
+
+def read_table(path: str) -> 'pd.DataFrame':
+    """Read a csv file as a data frame, from the memory cache of the process or from the columnar cache
+    if they are valid, else by parsing the csv file.
+
+    Args:
+        path (str): Path to the csv file
+
+    Returns:
+        pandas.DataFrame: The table, with the values of pandas.read_csv(path) and the compact types of
+            its schema (see table_schema.py)
+    """
+    if memory_cache is not None:
+        return memory_cache.get(path, load_table)
+    return load_table(path)
+
+
+def load_table(path: str) -> 'pd.DataFrame':
+    """Read a csv file as a data frame, from its columnar cache if it is valid, else by parsing the csv file.
+    The numeric columns of the cache are not copied: they stay read-only memory-mapped arrays,
+    unless they were cached with other types than the schema's. The nominal columns are categoricals
+    over their cached codes.
+    """
+    meta = load_meta(path)
+    if meta is None:
+        return table_schema.read_csv(path)
+    schema = table_schema.get_schema(path)["columns"] if table_schema.SCHEMA else {}
+    data = {}
+    for column, values in zip(meta["columns"], open_columns(path, meta).values()):
+        name = column["name"]
+        if column["encoding"] == "dictionary":
+            # code -1 is a missing value in both the cache and pandas.Categorical
+            codes, uniques = values
+            values = pd.Categorical.from_codes(codes, pd.Index(uniques, dtype=object))
+        elif not table_schema.SCHEMA and values.dtype.kind in "if" and values.dtype.itemsize < 8:
+            # the column was cached with its compact type, see write_cache
+            values = values.astype(np.float64 if values.dtype.kind == "f" else np.int64)
+        elif name in schema and values.dtype.itemsize == 8:
+            # the column was cached without the schema
+            dtype = table_schema.compact_type(values, schema[name])
+            if dtype is not None:
+                values = values.astype(dtype)
+        data[name] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def main():
+    args = sys.argv
+
+    if len(args) != 2:
+        print("Invalid command line arguments. Please use \"--help\" flag to see the documentation.")
+        return -1
+
+    # Print the documentation of this file if the user ask for help
+    if args[1] == "--help":
+        print(__doc__)
+        return 0
+
+    if not os.path.exists(args[1]):
+        print("Invalid file path: " + args[1] + " - Please try again")
+        return -1
+
+    try:
+        directory = write_cache(args[1])
+    except ValueError as error:
+        print("Can't convert the file: " + str(error))
+        return -1
+    print("CACHED TO " + directory)
+
+    return 0
+
+
+if __name__ == "__main__":
+    instrumented(main)
@@ -0,0 +1,163 @@
+"""This module reads csv files compressed with gzip (.gz), bzip2 (.bz2) or xz (.xz) directly,
+without decompressing them to disk first. The compression is known from the file extension.
+
+A compressed file is decompressed in a background thread, a block at a time, while the program
+parses the blocks that are already decompressed: the decompressors of the standard library
+release the GIL, so the decompression overlaps with the parsing. At most QUEUE_BLOCKS blocks
+wait to be parsed, so the memory doesn't depend on the size of the file.
+
+A compressed file can only be read in order: the programs read it in a single process,
+and their --workers option only applies to uncompressed files.
+Uncompressed files are opened and read exactly as before.
+
+Only the standard library is imported, pandas is imported by read_csv when it is used.
+"""
+
+import io
+import os
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+
+# Functions opening each compressed file extension
+COMPRESSIONS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# Size of the blocks decompressed at a time, in bytes
+BLOCK_BYTES = 1024 * 1024
+
+# Number of decompressed blocks that can wait to be parsed
+QUEUE_BLOCKS = 8
+
+# Rough ratio between the size of a decompressed csv file and its compressed size
+COMPRESSION_RATIO = 6
+
+
+def is_compressed(path: str) -> bool:
+    """Tell whether a file is compressed, from its extension."""
+    return os.path.splitext(path)[1].lower() in COMPRESSIONS
+
+
+def decompressed_name(path: str) -> str:
+    """Get the file name of a path without its compression extension, for example a.csv for data/a.csv.gz."""
+    name = os.path.basename(path)
+    return os.path.splitext(name)[0] if is_compressed(name) else name
+
+
+def input_size(path: str) -> int:
+    """Get the size of a file in bytes, estimated with COMPRESSION_RATIO once decompressed if it is compressed."""
+    size = os.path.getsize(path)
+    return size * COMPRESSION_RATIO if is_compressed(path) else size
+
+
+class DecompressingReader(io.RawIOBase):
+    """
+    This class is a binary stream of the decompressed bytes of a compressed file,
+    decompressed by a background thread. Errors of the decompression, for example
+    a corrupted or truncated file, are raised by the read that reaches them.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.source = COMPRESSIONS[os.path.splitext(path)[1].lower()](path, "rb")
+        self.blocks = queue.Queue(QUEUE_BLOCKS)
+        self.block = memoryview(b"")
+        self.finished = False
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.decompress, daemon=True)
+        self.thread.start()
+
+    def decompress(self):
+        # An empty block marks the end of the file
+        try:
+            while not self.stopped.is_set():
+                block = self.source.read(BLOCK_BYTES)
+                self.put(block)
+                if not block:
+                    return
+        except Exception as error:
+            self.put(error)
+
+    def put(self, item):
+        # Wait for room in the queue, unless the stream is closed before it is read whole
+        while not self.stopped.is_set():
+            try:
+                self.blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if len(self.block) == 0:
+            if self.finished:
+                return 0
+            item = self.blocks.get()
+            if isinstance(item, Exception):
+                self.finished = True
+                raise item
+            if not item:
+                self.finished = True
+                return 0
+            self.block = memoryview(item)
+        size = min(len(buffer), len(self.block))
+        buffer[:size] = self.block[:size]
+        self.block = self.block[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.stopped.set()
+            self.thread.join()
+            self.source.close()
+        super().close()
+
+
+def open_input(path: str, mode: str = "r", newline: 'str | None' = None):
+    """Open an input file like open(), decompressing it in a background thread if it is compressed.
+
+    Args:
+        path (str): Path to the file
+        mode (str): "r" for text, or "rb" for bytes
+        newline (str | None): Newline mode of a text file, as in open()
+
+    Returns:
+        The opened file
+    """
+    if not is_compressed(path):
+        return open(path, mode, newline=None if "b" in mode else newline)
+    stream = io.BufferedReader(DecompressingReader(path), BLOCK_BYTES)
+    if "b" in mode:
+        return stream
+    return io.TextIOWrapper(stream, newline=newline)
+
+
+def read_csv(path: str, **options):
+    """Read a csv file with pandas.read_csv, decompressing it in a background thread if it is compressed.
+
+    Args:
+        path (str): Path to the csv file
+        **options: Options of pandas.read_csv. With a chunk size, the chunks are read
+            while the result is iterated, and the file is closed at the end
+
+    Returns:
+        pandas.DataFrame | Iterable[pandas.DataFrame]: The table, or its chunks
+    """
+    import pandas as pd
+    if not is_compressed(path):
+        return pd.read_csv(path, **options)
+    if options.get("chunksize") is not None:
+        return read_chunks(path, options)
+    with open_input(path, "rb") as file:
+        return pd.read_csv(file, **options)
+
+
+def read_chunks(path: str, options: 'dict'):
+    """Yield the chunks of a compressed csv file, see read_csv."""
+    import pandas as pd
+    with open_input(path, "rb") as file, pd.read_csv(file, **options) as reader:
+        for chunk in reader:
+            yield chunk
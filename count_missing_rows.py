@@ -1,8 +1,21 @@
 """This program counts the number of rows with missing data from a csv file.
 The csv file should be comma-separated.
+The file is streamed once in chunks to compute its column profile, which is cached
+so that the next programs run on the same file answer without reading it again (see column_profile.py).
 
-Command line: [csv_path] | --help
+Command line: [csv_path] --chunksize=[integer] --workers=[integer] | --help
     csv_path: Path to the csv file for this program to check
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
+    --chunksize: Optional. The number of rows read at a time when the file is profiled.
+        The default value is 100000.
+        For example: --chunksize=10000
+    --workers: Optional. Count the missing data with this many processes, each reading a part of the file,
+        instead of profiling the file. A valid cached profile is still used.
+        For example: --workers=8
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
@@ -12,25 +25,28 @@ Output:
 import sys
 import os
 import pandas as pd
-from list_missing_cols import isNaN
+from missing_mask import missing_mask
+from column_profile import get_profile, load_profile, CHUNKSIZE
+from parallel_csv import count_missing_parallel
+from run_metrics import instrumented, stage, add_rows
+from compressed_input import is_compressed
 
+# The counts of the last successful run, aggregated by batch.py over many files
+summary = None
 
-def count_missing_rows(data: 'list[list]') -> 'int':
-    # Result is the number of rows containing missing data
-    result = 0
 
-    # Iterate through each row
-    for row_index in range(len(data)):
-        # Iterate through each column in row
-        for col_index in range(len(data[0])):
-            if isNaN(data[row_index][col_index]):
-                result += 1
-                break
+def count_missing_rows(data: 'pd.DataFrame | list[list]') -> 'int':
+    """Count the rows that have at least one missing data cell
 
-    return result
+    Returns:
+        int: The number of rows containing missing data
+    """
+    # Build the missing mask once and reduce it along the columns
+    return int(missing_mask(data).any(axis=1).sum())
 
 
 def main():
+    global summary
     args = sys.argv
     filepath = args[1]
 
@@ -39,9 +55,22 @@ def main():
         print("""
 This program counts the number of rows with missing data from a csv file.
 The csv file should be comma-separated.
+The file is streamed once in chunks to compute its column profile, which is cached
+so that the next programs run on the same file answer without reading it again (see column_profile.py).
 
-Command line: [csv_path] | --help
+Command line: [csv_path] --chunksize=[integer] --workers=[integer] | --help
     csv_path: Path to the csv file for this program to check
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
+    --chunksize: Optional. The number of rows read at a time when the file is profiled.
+        The default value is 100000.
+        For example: --chunksize=10000
+    --workers: Optional. Count the missing data with this many processes, each reading a part of the file,
+        instead of profiling the file. A valid cached profile is still used.
+        For example: --workers=8
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
@@ -53,16 +82,48 @@ Output:
     if not os.path.exists(filepath):
         print("Invalid file path: " + filepath + " - Please try again")
         return -1
-    df = pd.read_csv(filepath)
 
-    # Convert data frame to matrix (2D list)
-    mat = df.to_numpy().tolist()
+    # Parse the optional chunk size and number of workers
+    chunksize = None
+    workers = None
+    for arg in args[2:]:
+        flag, _, value = arg.partition("=")
+        if flag not in ("--chunksize", "--workers"):
+            print("Invalid command line arguments. Please use \"--help\" flag to see the documentation.")
+            return -1
+        try:
+            if int(value) <= 0:
+                raise ValueError
+        except ValueError:
+            print("The chunk size must be a positive integer." if flag == "--chunksize" else
+                  "The number of workers must be a positive integer.")
+            return -1
+        if flag == "--chunksize":
+            chunksize = int(value)
+        else:
+            workers = int(value)
+
+    # A compressed file can only be read in order, so it is profiled instead of counted in parallel
+    if is_compressed(filepath):
+        workers = None
+
+    # Answer from the cached profile of the file, profiling it in one streaming pass if needed,
+    # or count in parallel if there is no cached profile and several workers are asked
+    with stage("statistics"):
+        profile = load_profile(filepath) if workers is not None else get_profile(filepath, chunksize or CHUNKSIZE)
+        if profile is None:
+            _, _, result, rows = count_missing_parallel(filepath, workers)
+        else:
+            result = profile["missing_rows"]
+            rows = profile["rows"]
+            add_rows(rows)
 
     # Print the result to the console
-    print("The number of rows with missing data is:", count_missing_rows(mat))
+    print("The number of rows with missing data is:", result)
+    summary = {"rows": rows, "missing_rows": result}
 
     return 0
 
 
 if __name__ == "__main__":
-    main()
+    instrumented(main)
@@ -2,53 +2,504 @@
 This program removes duplicate data in a csv file.
 The csv file should be comma-separated.
 
-Command line: [csv_path] | --help
+Command line: [csv_path] --subset=[column_names] --keep=[first|last|none] --memory=[megabytes] --workers=[integer] --out-format=[format] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is decompressed while it is read, twice with --keep=last or none.
+    --subset: Optional. Column names, separated by comma, that define a duplicate.
+        By default, two rows are duplicates only if all their columns are equal.
+        For example: --subset=Id or --subset=MSZoning,LotArea
+    --keep: Optional. Which row of each group of duplicates is kept.
+        first: keep the first occurrence (default)
+        last: keep the last occurrence
+        none: drop every row that has a duplicate
+    --memory: Optional. Memory budget in megabytes for files that don't fit in memory.
+        If the file is estimated to need more than this budget, its rows are hashed into
+        on-disk partitions next to the output file, each partition is deduplicated on its own
+        and the results are merged back in the original order.
+        For example: --memory=2048
+    --workers: Optional. Number of processes that deduplicate the partitions in parallel.
+        The memory budget is shared between the workers. The default value is 1.
+        For example: --workers=4
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A csv file identical to the input csv with the duplicates removed.
-    Output path is ''output_drop_duplicates_' + csv_path' and is not customizable.
+    A csv file identical to the input csv with the duplicates removed, in the original row order.
+    Output path is ''output_drop_duplicates_' + csv_path' and is not customizable, except for its extension.
 """
 
+import contextlib
 import csv
+import functools
+import hashlib
+import heapq
+import math
 import os
 import sys
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from run_metrics import instrumented, stage, add_rows
+from output_writer import TableWriter, FormatError, output_path, parse_format
+from compressed_input import open_input, is_compressed, decompressed_name, input_size
 
-arg = sys.argv
+# rough ratio between the memory used by the rows in a dict and their size on disk
+MEMORY_FACTOR = 6
+# upper bound of partition files open at the same time
+MAX_PARTITIONS = 512
+# number of first occurrences kept in memory once fetched for an exact comparison
+FETCH_CACHE = 4096
 
-INPUTPATH = arg[1]
 
-if INPUTPATH == "--help":
-    print("""
+class FingerprintIndex:
+    """
+    This class is an open-addressing hash table of 128-bit row digests,
+    stored in flat arrays instead of a dict of row tuples, so its memory
+    doesn't grow with the width of the rows.
+    The table is probed with the low 64 bits of a digest, its fingerprint,
+    and the high 64 bits tell apart most keys sharing a fingerprint without reading them.
+    When two digests are equal, the key is compared exactly with its first occurrence,
+    fetched from its position, and the recently fetched keys are cached.
+    Each entry records the position of the first occurrence of its key,
+    the row number of its last occurrence and its number of occurrences (0 marks an empty slot).
+    Keys whose fingerprint is taken by another key are kept in a small overflow dict.
+    """
+
+    def __init__(self, fetch, capacity: int = 1024):
+        # fetch(position) returns the encoded key of the row stored at that position, see encode_key
+        self.fetch = functools.lru_cache(maxsize=FETCH_CACHE)(fetch)
+        self.size = 0
+        self.overflow = {}
+        self.collided = set()
+        self.allocate(capacity)
+
+    def allocate(self, capacity: int):
+        self.fingerprints = array('Q', bytes(8 * capacity))
+        self.checks = array('Q', bytes(8 * capacity))
+        self.positions = array('q', bytes(8 * capacity))
+        self.lasts = array('q', bytes(8 * capacity))
+        self.counts = array('q', bytes(8 * capacity))
+        self.mask = capacity - 1
+
+    def slot(self, fingerprint: int) -> int:
+        # linear probing until the fingerprint or an empty slot
+        fingerprints = self.fingerprints
+        counts = self.counts
+        i = fingerprint & self.mask
+        while counts[i] != 0 and fingerprints[i] != fingerprint:
+            i = (i + 1) & self.mask
+        return i
+
+    def grow(self):
+        old = (self.fingerprints, self.checks, self.positions, self.lasts, self.counts)
+        self.allocate(2 * len(self.fingerprints))
+        for j in range(len(old[0])):
+            if old[4][j] != 0:
+                i = self.slot(old[0][j])
+                self.fingerprints[i] = old[0][j]
+                self.checks[i] = old[1][j]
+                self.positions[i] = old[2][j]
+                self.lasts[i] = old[3][j]
+                self.counts[i] = old[4][j]
+
+    def add(self, key: bytes, digest: int, position: int, rownum: int) -> bool:
+        """
+        This method records an occurrence of an encoded key, with its digest and position,
+        and returns whether it is the first occurrence of that key.
+        """
+        fingerprint, check = digest & 0xFFFFFFFFFFFFFFFF, digest >> 64
+        i = self.slot(fingerprint)
+        if self.counts[i] == 0:
+            # keep the table at most half full
+            if 2 * (self.size + 1) > len(self.fingerprints):
+                self.grow()
+                i = self.slot(fingerprint)
+            self.fingerprints[i] = fingerprint
+            self.checks[i] = check
+            self.positions[i] = position
+            self.lasts[i] = rownum
+            self.counts[i] = 1
+            self.size += 1
+            return True
+
+        entry = self.overflow.get(key) if fingerprint in self.collided else None
+        if entry is None and self.checks[i] == check and self.fetch(self.positions[i]) == key:
+            self.lasts[i] = rownum
+            self.counts[i] += 1
+            return False
+
+        # same fingerprint but different key
+        if entry is None:
+            self.collided.add(fingerprint)
+            self.overflow[key] = [rownum, 1]
+            return True
+        entry[0] = rownum
+        entry[1] += 1
+        return False
+
+    def lookup(self, key: bytes, digest: int) -> 'tuple[int, int]':
+        """
+        This method returns the row number of the last occurrence
+        and the number of occurrences of a recorded encoded key, with its digest.
+        """
+        fingerprint = digest & 0xFFFFFFFFFFFFFFFF
+        if fingerprint in self.collided and key in self.overflow:
+            entry = self.overflow[key]
+            return entry[0], entry[1]
+        i = self.slot(fingerprint)
+        return self.lasts[i], self.counts[i]
+
+
+def encode_key(key: tuple) -> bytes:
+    """
+    This function encodes a row key unambiguously, each value prefixed with its length,
+    so that two different keys never have the same encoding.
+    """
+    values = [value.encode('utf-8', 'surrogatepass') for value in key]
+    return b''.join(len(value).to_bytes(4, 'little') + value for value in values)
+
+
+def key_digest(key: bytes) -> int:
+    """
+    This function returns the 128-bit digest of an encoded row key.
+    """
+    return int.from_bytes(hashlib.blake2b(key, digest_size=16).digest(), 'little')
+
+
+def row_key(row: list, columns: 'list[int] | None') -> tuple:
+    """
+    This function returns the values of a row that define a duplicate.
+    """
+    if columns is None:
+        return tuple(row)
+    return tuple(row[j] if j < len(row) else '' for j in columns)
+
+
+def subset_columns(header: list, subset: 'list[str] | None') -> 'list[int] | None':
+    """
+    This function returns the indices of the subset column names in the header.
+    A ValueError is raised if a name is not a column.
+    """
+    if subset is None:
+        return None
+    return [header.index(name) for name in subset]
+
+
+def iter_records(file):
+    """
+    This function yields the byte position and the parsed values
+    of each csv record of a file opened in binary mode.
+    Records with quoted newlines span several lines.
+    """
+    while True:
+        position = file.tell()
+        line = file.readline()
+        if not line:
+            return
+        # an odd number of quotes means that a quoted field continues on the next line
+        while line.count(b'"') % 2 == 1:
+            more = file.readline()
+            if not more:
+                break
+            line += more
+        yield position, next(csv.reader([line.decode('utf-8')]))
+
+
+@contextlib.contextmanager
+def open_records(path: str):
+    """
+    This function opens a csv file and gives an iterator of the byte position and the values of its records.
+    The positions of a compressed file are None, as it can't be read at a position.
+    """
+    if is_compressed(path):
+        with open_input(path, newline='') as file:
+            yield ((None, row) for row in csv.reader(file))
+    else:
+        with open(path, 'rb') as file:
+            yield iter_records(file)
+
+
+def drop_duplicates(data: 'list[list]', columns: 'list[int] | None' = None, keep: str = 'first') -> 'list[list]':
+    """
+    This function removes the duplicate rows of a table, keeping the rows in order.
+    Duplicates are defined over the given column indices, or over all columns by default.
+    keep is 'first' or 'last' to keep that occurrence of each row, or 'none' to drop all of them.
+    """
+    # the key of each row is only built while the row is indexed or looked up
+    index = FingerprintIndex(lambda position: encode_key(row_key(data[position], columns)))
+    firsts = []
+    for rownum, row in enumerate(data):
+        key = encode_key(row_key(row, columns))
+        firsts.append(index.add(key, key_digest(key), rownum, rownum))
+    if keep == 'first':
+        return [row for row, first in zip(data, firsts) if first]
+
+    result = []
+    for rownum, row in enumerate(data):
+        key = encode_key(row_key(row, columns))
+        last, count = index.lookup(key, key_digest(key))
+        if (keep == 'last' and last == rownum) or (keep == 'none' and count == 1):
+            result.append(row)
+    return result
+
+
+def drop_duplicates_file(inputpath: str, outputpath: str, subset: 'list[str] | None' = None, keep: str = 'first',
+                         out_format: str = 'csv'):
+    """
+    This function removes the duplicate rows of a csv file while streaming it,
+    holding only the fingerprint index in memory.
+    The first occurrence of a key is read again at its byte position for the exact comparison,
+    except in a compressed file, which can't be read at a position: the encoded keys
+    of its first occurrences are kept in memory instead.
+    keep='first' needs a single pass, 'last' and 'none' read the file twice.
+    The output is written in out_format, see output_writer.py.
+    """
+    compressed = is_compressed(inputpath)
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(TableWriter(outputpath, out_format))
+        if compressed:
+            firsts = []
+            fetch = firsts.__getitem__
+        else:
+            lookup = stack.enter_context(open(inputpath, 'rb'))
+
+            def fetch(position):
+                lookup.seek(position)
+                return encode_key(row_key(next(iter_records(lookup))[1], columns))
+
+        records = stack.enter_context(open_records(inputpath))
+        header = next(records)[1]
+        columns = subset_columns(header, subset)
+        writer.write_header(header)
+        index = FingerprintIndex(fetch)
+
+        # the rows are read, indexed and written one by one, so each pass is a single stage
+        rownum = -1
+        with stage('transform' if keep == 'first' else 'statistics'):
+            for rownum, (position, row) in enumerate(records):
+                key = encode_key(row_key(row, columns))
+                first = index.add(key, key_digest(key), len(firsts) if compressed else position, rownum)
+                if first and compressed:
+                    firsts.append(key)
+                if first and keep == 'first':
+                    writer.write_row(row)
+        add_rows(rownum + 1)
+        if keep == 'first':
+            return
+
+        # second pass, now that the last occurrence and count of each key are known
+        with stage('transform'), open_records(inputpath) as records:
+            next(records)
+            for rownum, (_, row) in enumerate(records):
+                key = encode_key(row_key(row, columns))
+                last, count = index.lookup(key, key_digest(key))
+                if (keep == 'last' and last == rownum) or (keep == 'none' and count == 1):
+                    writer.write_row(row)
+
+
+def partition_rows(reader, directory: str, partitions: int, columns: 'list[int] | None' = None) -> 'list[str]':
+    """
+    This function hashes the rows of a csv reader into on-disk partitions,
+    so that all the duplicates of a row land in the same partition.
+    Each row is prefixed with its row number to restore the order later.
+    """
+    paths = [os.path.join(directory, 'partition_' + str(i) + '.csv') for i in range(partitions)]
+    files = [open(path, 'w', newline='') for path in paths]
+    try:
+        writers = [csv.writer(file) for file in files]
+        index = -1
+        for index, row in enumerate(reader):
+            writers[hash(row_key(row, columns)) % partitions].writerow([index] + row)
+        add_rows(index + 1)
+    finally:
+        for file in files:
+            file.close()
+    return paths
+
+
+def dedup_partition(path: str, columns: 'list[int] | None' = None, keep: str = 'first') -> str:
+    """
+    This function removes the duplicate rows of a partition,
+    keeping the requested occurrence of each row in row number order.
+    """
+    with open(path, newline='') as file:
+        # map each key to its kept line and count its occurrences
+        kept = {}
+        counts = {}
+        for line in csv.reader(file):
+            key = row_key(line[1:], columns)
+            if keep == 'first':
+                kept.setdefault(key, line)
+            else:
+                kept[key] = line
+                counts[key] = counts.get(key, 0) + 1
+
+    # dict keeps the insertion order, which is the row number order of the first occurrences
+    lines = list(kept.values())
+    if keep == 'last':
+        lines.sort(key=lambda line: int(line[0]))
+    elif keep == 'none':
+        lines = [line for key, line in kept.items() if counts[key] == 1]
+
+    outputpath = path + '.dedup'
+    with open(outputpath, 'w', newline='') as file:
+        csv.writer(file).writerows(lines)
+    os.remove(path)
+    return outputpath
+
+
+def drop_duplicates_external(reader, writer, directory: str, partitions: int, workers: int = 1,
+                             columns: 'list[int] | None' = None, keep: str = 'first'):
+    """
+    This function removes the duplicate rows of a csv reader that doesn't fit in memory
+    and writes the result to a TableWriter (see output_writer.py), keeping the original row order.
+    The partitions are temporarily stored in the given directory.
+    """
+    with stage('read'):
+        paths = partition_rows(reader, directory, partitions, columns)
+
+    # deduplicate each partition independently
+    dedup = partial(dedup_partition, columns=columns, keep=keep)
+    with stage('transform'):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                paths = list(pool.map(dedup, paths))
+        else:
+            paths = [dedup(path) for path in paths]
+
+    # merge the partitions back by row number
+    files = [open(path, newline='') for path in paths]
+    try:
+        with stage('write'):
+            merged = heapq.merge(*[csv.reader(file) for file in files], key=lambda line: int(line[0]))
+            writer.write_rows(line[1:] for line in merged)
+    finally:
+        for file in files:
+            file.close()
+
+
+######################################################## MAIN
+def main():
+    arg = sys.argv
+
+    INPUTPATH = arg[1]
+
+    if INPUTPATH == "--help":
+        print("""
 This program removes duplicate data in a csv file.
 The csv file should be comma-separated.
 
-Command line: [csv_path] | --help
+Command line: [csv_path] --subset=[column_names] --keep=[first|last|none] --memory=[megabytes] --workers=[integer] --out-format=[format] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is decompressed while it is read, twice with --keep=last or none.
+    --subset: Optional. Column names, separated by comma, that define a duplicate.
+        By default, two rows are duplicates only if all their columns are equal.
+        For example: --subset=Id or --subset=MSZoning,LotArea
+    --keep: Optional. Which row of each group of duplicates is kept.
+        first: keep the first occurrence (default)
+        last: keep the last occurrence
+        none: drop every row that has a duplicate
+    --memory: Optional. Memory budget in megabytes for files that don't fit in memory.
+        If the file is estimated to need more than this budget, its rows are hashed into
+        on-disk partitions next to the output file, each partition is deduplicated on its own
+        and the results are merged back in the original order.
+        For example: --memory=2048
+    --workers: Optional. Number of processes that deduplicate the partitions in parallel.
+        The memory budget is shared between the workers. The default value is 1.
+        For example: --workers=4
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A csv file identical to the input csv with the duplicates removed.
-    Output path is ''output_drop_duplicates_' + csv_path' and is not customizable.
+    A csv file identical to the input csv with the duplicates removed, in the original row order.
+    Output path is ''output_drop_duplicates_' + csv_path' and is not customizable, except for its extension.
 """)
-    quit()
-
-with open(INPUTPATH, newline='') as file:
-    # cast csv file into list of list
-    data = list(csv.reader(file))
-
-# cast each instance (row) into tuple, then add it to set
-# dict.fromkeys().keys() is a type of set that retains order
-nondup = dict.fromkeys(list(map(tuple, data[1:]))).keys()
-outputpath = 'output_drop_duplicates_' + os.path.basename(INPUTPATH)
-
-with open(outputpath, 'w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(data[0])
-    writer.writerows(nondup)
-    print('EXPORTED TO ' + outputpath)
\ No newline at end of file
+        return 0
+
+    # parse the optional duplicate definition, memory budget, worker count and output format
+    subset = None
+    keep = 'first'
+    memory = None
+    workers = 1
+    outFormat = 'csv'
+    for option in arg[2:]:
+        flag, _, value = option.partition('=')
+        try:
+            if flag == '--subset':
+                subset = value.split(',')
+            elif flag == '--keep':
+                if value not in ('first', 'last', 'none'):
+                    raise ValueError
+                keep = value
+            elif flag == '--memory':
+                memory = float(value) * 1024 * 1024
+                if memory <= 0:
+                    raise ValueError
+            elif flag == '--workers':
+                workers = int(value)
+                if workers <= 0:
+                    raise ValueError
+            elif flag == '--out-format':
+                try:
+                    parse_format(value)
+                except ValueError as error:
+                    print("INVALID OPTION " + option + ". " + str(error))
+                    return -1
+                outFormat = value
+            else:
+                raise ValueError
+        except ValueError:
+            print("INVALID OPTION " + option + ". Please use \"--help\" flag to see the documentation.")
+            return -1
+
+    outputpath = output_path('output_drop_duplicates_' + decompressed_name(INPUTPATH), outFormat)
+
+    # number of partitions so that each worker's partition fits in the memory budget
+    partitions = 1
+    if memory is not None:
+        partitions = min(math.ceil(input_size(INPUTPATH) * MEMORY_FACTOR * workers / memory), MAX_PARTITIONS)
+
+    # check the subset against the header
+    with open_input(INPUTPATH, newline='') as file:
+        header = next(csv.reader(file))
+    if subset is not None and any(name not in header for name in subset):
+        print("INVALID SUBSET " + ','.join(subset) + ". The subset must be column names of the csv file.")
+        return -1
+
+    try:
+        if partitions <= 1:
+            drop_duplicates_file(INPUTPATH, outputpath, subset, keep, outFormat)
+        else:
+            with open_input(INPUTPATH, newline='') as infile, TableWriter(outputpath, outFormat) as writer:
+                reader = csv.reader(infile)
+                writer.write_header(next(reader))
+                with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(outputpath))) as directory:
+                    drop_duplicates_external(reader, writer, directory, partitions, workers,
+                                             subset_columns(header, subset), keep)
+    except FormatError as error:
+        print("CAN'T EXPORT TO " + outputpath + ". " + str(error))
+        return -1
+    print('EXPORTED TO ' + outputpath)
+
+    return 0
+
+
+if __name__ == "__main__":
+    instrumented(main)
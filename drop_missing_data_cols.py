@@ -3,22 +3,39 @@ This program removes the columns that have more missing values than a specified
 The csv file should be comma-separated.
 The parameter must be in the correct order in order for this program to function normally.
 
-Command line: [csv_path] [percentage] | --help
+Command line: [csv_path] [percentage] --workers=[integer] --out-format=[format] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
     percentage: The percentage that decides whether or not a column will be removed if it has less than this much data.
         The number must be in range of [0, 1]
         For example: 0.5
+    --workers: Optional. Read the file with this many processes, each one reading a part of the file.
+        For example: --workers=8
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
     A csv file identical to the input csv with the instances whose percentages of missing data exceed the specified percentage removed.
-    Output path is ''output_drop_missing_data_cols_' + csv_path' and is not customizable.
+    Blank lines are not rows: they are neither counted nor written.
+    Output path is ''output_drop_missing_data_cols_' + csv_path' and is not customizable, except for its extension.
 """
-import os
+import io
 import csv
 import sys
+from array import array
+from functools import partial
+from parallel_csv import map_ranges, read_range
+from run_metrics import instrumented, stage, timed_chunks, add_rows
+from output_writer import TableWriter, FormatError, output_path, parse_format
+from compressed_input import open_input, is_compressed, decompressed_name
 
 def isNaN(value) -> bool:
     """
@@ -27,77 +44,220 @@ def isNaN(value) -> bool:
     return value != value or value is None or value == ''
 
 
-def missing(line: list, PERCENTAGE: float, n: int) -> bool:
+def count_missing_cols(rows) -> 'tuple':
     """
-    This function returns a boolean that indicates 
-    whether the current row/col has more missing data 
-    than the specified percentage.
+    This function counts the missing data of every column in one pass over the rows
+    of a table (header first), keeping only one counter per column.
+    Fields missing at the end of a short row are counted as missing data,
+    blank lines are skipped.
+    It returns the header, the array of counters and the number of data rows.
     """
+    rows = iter(rows)
+    header = next(rows, [])
+    width = len(header)
+    counts = array('Q', bytes(8 * width))
+    n = 0
+    for row in rows:
+        if not row:
+            continue
+        n += 1
+        for j, value in enumerate(row[:width]):
+            if isNaN(value):
+                counts[j] += 1
+        for j in range(len(row), width):
+            counts[j] += 1
+    return header, counts, n
 
-    count = 0
-    for e in line:
-        if isNaN(e) == False:
-            count += 1
-    return (len(line) - count) / n > PERCENTAGE
+
+def kept_columns(counts: 'array', n: int, PERCENTAGE: float) -> 'list[int]':
+    """
+    This function returns the indices of the columns
+    that don't have more missing data than the specified percentage.
+    """
+    if n == 0:
+        return list(range(len(counts)))
+    return [j for j, count in enumerate(counts) if count / n <= PERCENTAGE]
+
+
+def project(rows, kept: 'list[int]'):
+    """
+    This function yields the kept columns of every row, in order, skipping blank lines.
+    """
+    width = kept[-1] + 1 if kept else 0
+    for row in rows:
+        if not row:
+            continue
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        yield [row[j] for j in kept]
+
+
+def drop_missing_cols(data: 'list[list]', PERCENTAGE: float) -> 'list[list]':
+    """
+    This function removes the columns of a table (header included)
+    that have more missing data than the specified percentage.
+    """
+    if len(data) == 0:
+        return data
+    header, counts, n = count_missing_cols(data)
+    return list(project(data, kept_columns(counts, n, PERCENTAGE)))
+
+
+def drop_missing_cols_file(inputpath: str, outputpath: str, PERCENTAGE: float, out_format: str = 'csv') -> 'list[str]':
+    """
+    This function removes the columns of a csv file that have more missing data
+    than the specified percentage, reading the file twice so that the memory stays constant:
+    the first pass counts the missing data of every column,
+    the second pass writes only the kept columns, in the output format (see output_writer.py).
+    It returns the names of the removed columns.
+    """
+    with stage('statistics'):
+        with open_input(inputpath, newline='') as file:
+            header, counts, n = count_missing_cols(csv.reader(file))
+        kept = kept_columns(counts, n, PERCENTAGE)
+    add_rows(n)
+
+    # the rows are read, projected and written one by one, so the second pass is a single stage
+    with stage('transform'), open_input(inputpath, newline='') as file, TableWriter(outputpath, out_format) as writer:
+        rows = project(csv.reader(file), kept)
+        keptHeader = next(rows, None)
+        if keptHeader is not None:
+            writer.write_header(keptHeader)
+            writer.write_rows(rows)
+
+    keptSet = set(kept)
+    return [name for j, name in enumerate(header) if j not in keptSet]
+
+
+def count_missing_cols_range(path: str, header: bytes, start: int, end: int) -> 'tuple':
+    """
+    This function counts the missing data of every column
+    in a range of a csv file (see parallel_csv.py).
+    """
+    text = (header + read_range(path, start, end)).decode('utf-8')
+    _, counts, n = count_missing_cols(csv.reader(io.StringIO(text, newline='')))
+    return counts, n
+
+
+def project_range(path: str, header: bytes, start: int, end: int, kept: 'list[int]') -> str:
+    """
+    This function returns the kept columns of a range of a csv file as csv text.
+    """
+    text = read_range(path, start, end).decode('utf-8')
+    output = io.StringIO()
+    csv.writer(output).writerows(project(csv.reader(io.StringIO(text, newline='')), kept))
+    return output.getvalue()
+
+
+def drop_missing_cols_parallel(inputpath: str, outputpath: str, PERCENTAGE: float, workers: int,
+                               out_format: str = 'csv') -> 'list[str]':
+    """
+    This function removes the columns of a csv file like drop_missing_cols_file,
+    with several processes that each read a range of the file in both passes.
+    It returns the names of the removed columns.
+    """
+    with open(inputpath, newline='') as file:
+        header = next(csv.reader(file), [])
+    with stage('statistics'):
+        counts = array('Q', bytes(8 * len(header)))
+        n = 0
+        for rangeCounts, rangeN in map_ranges(inputpath, count_missing_cols_range, workers):
+            for j, count in enumerate(rangeCounts):
+                counts[j] += count
+            n += rangeN
+        kept = kept_columns(counts, n, PERCENTAGE)
+    add_rows(n)
+
+    with TableWriter(outputpath, out_format) as writer:
+        writer.write_header(next(project([header], kept)))
+        for text in timed_chunks(map_ranges(inputpath, partial(project_range, kept=kept), workers), 'transform'):
+            with stage('write'):
+                writer.write_text(text)
+
+    keptSet = set(kept)
+    return [name for j, name in enumerate(header) if j not in keptSet]
 
 
 ######################################################## MAIN
-arg = sys.argv
+def main():
+    arg = sys.argv
 
-INPUTPATH = arg[1]
+    INPUTPATH = arg[1]
 
-if INPUTPATH == "--help":
-    print("""
+    if INPUTPATH == "--help":
+        print("""
 This program removes the columns that have more missing values than a specified percentage in a csv file.
 The csv file should be comma-separated.
 The parameter must be in the correct order in order for this program to function normally.
 
-Command line: [csv_path] [percentage] | --help
+Command line: [csv_path] [percentage] --workers=[integer] --out-format=[format] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
     percentage: The percentage that decides whether or not a column will be removed if it has less than this much data.
         The number must be in range of [0, 1]
         For example: 0.5
+    --workers: Optional. Read the file with this many processes, each one reading a part of the file.
+        For example: --workers=8
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
     A csv file identical to the input csv with the instances whose percentages of missing data exceed the specified percentage removed.
-    Output path is ''output_drop_missing_data_cols_' + csv_path' and is not customizable.
+    Blank lines are not rows: they are neither counted nor written.
+    Output path is ''output_drop_missing_data_cols_' + csv_path' and is not customizable, except for its extension.
 """)
-    quit()
-
-PERCENTAGE = float(arg[2])
-
-with open(INPUTPATH, newline='') as file:
-    # cast csv file into list of list
-    data = list(csv.reader(file))
+        return 0
 
-# get the number of rows
-n = len(data[1:])
+    PERCENTAGE = float(arg[2])
 
-# init removal list
-waitingForRemoval = []
+    workers = 0
+    outFormat = 'csv'
+    for option in arg[3:]:
+        if option.startswith('--workers='):
+            try:
+                workers = int(option.split('=')[1])
+                if workers <= 0:
+                    raise ValueError
+            except ValueError:
+                print("The number of workers must be a positive integer.")
+                return -1
+        elif option.startswith('--out-format='):
+            outFormat = option.split('=', 1)[1]
+            try:
+                parse_format(outFormat)
+            except ValueError as error:
+                print("INVALID OPTION " + option + ". " + str(error))
+                return -1
+        else:
+            print("Invalid command line arguments. Please use \"--help\" flag to see the documentation.")
+            return -1
 
-for j in range(len(data[0])):
-    # get the current column
-    col = [data[i][j] for i in range(n)]
+    outputpath = output_path('output_drop_missing_data_cols_' + decompressed_name(INPUTPATH), outFormat)
 
-    # if the current column is counted as missing
-    if missing(col, PERCENTAGE, n):
+    # a compressed file can only be read in order, so it is read in a single process
+    if is_compressed(INPUTPATH):
+        workers = 0
 
-        # append that column to removal list
-        waitingForRemoval.append(j)
+    try:
+        if workers > 0:
+            drop_missing_cols_parallel(INPUTPATH, outputpath, PERCENTAGE, workers, outFormat)
+        else:
+            drop_missing_cols_file(INPUTPATH, outputpath, PERCENTAGE, outFormat)
+    except FormatError as error:
+        print("CAN'T EXPORT TO " + outputpath + ". " + str(error))
+        return -1
+    print('EXPORTED TO ' + outputpath)
 
-# remove elements using list comprehension
-data = [[row[coli] 
-        for coli in range(len(row)) 
-        if coli not in waitingForRemoval] 
-        for row in data]
+    return 0
 
-outputpath = 'output_drop_missing_data_cols_' + os.path.basename(INPUTPATH)
 
-with open(outputpath, 'w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerows(data)
-    print('EXPORTED TO ' + outputpath)
\ No newline at end of file
+if __name__ == "__main__":
+    instrumented(main)
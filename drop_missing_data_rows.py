@@ -2,49 +2,107 @@
 This program removes the rows that have more missing values than a specified percentage in a csv file.
 The csv file should be comma-separated.
 
-Command line: --in=[input_path] --out=[output_path] --percent=[integer] | --help
+Command line: --in=[input_path] --out=[output_path] --percent=[integer] --chunksize=[integer] --workers=[integer] --out-format=[format] | --help
     --in: Path to the input csv file for this program to check.
         For example: --in=a.csv, --in="a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
     --out: Path to the output csv file after the missing rows have been removed.
         For example: --out=a.csv, --out="a b c.csv"
         If not specified, the default will be "output_drop_missing_data_rows_" + input_file_name + ".csv".
+        The extension is changed to the one of the output format.
     --percent: The percentage for the number of columns with missing data that is required for a row to be removed.
         Must be an integer in the range [0,100].
         If --percent=0 the program will remove any row with at least a missing column.
         If --percent=100 the program will only remove rows that don't contain any data
+    --chunksize: Stream the file in chunks of this many rows instead of loading it whole.
+        The memory usage then depends on the chunk size, not on the file size,
+        and the values are written exactly as they are in the input file.
+        For example: --chunksize=100000
+    --workers: Stream the file with this many processes, each one reading a part of the file.
+        The values are then written exactly as they are in the input file, as with --chunksize.
+        For example: --workers=8
+    --out-format: Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy, see output_writer.py.
+        For example: --out-format=csv.gz:1
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A csv file with data from the input file that has the rows missing a percentage of columns removed.
+    A csv file, or a file of the output format, with data from the input file that has the rows missing
+    a percentage of columns removed.
 """
 
 import sys
 import os
+from functools import partial
 import pandas as pd
-from list_missing_cols import list_missing_cols
+from missing_mask import missing_mask, missing_per_row
+from columnar_cache import read_table
+from parallel_csv import map_ranges, range_frame, read_range
+from run_metrics import instrumented, stage, timed_chunks, add_rows
+from output_writer import TableWriter, FormatError, output_path, parse_format, write_table
+from compressed_input import read_csv, is_compressed, decompressed_name
+from column_profile import CHUNKSIZE
 
 
-def drop_missing_rows(data: 'list[list]', percent: int) -> 'list[list]':
+def drop_missing_rows(data: 'pd.DataFrame | list[list]', percent: int) -> 'pd.DataFrame | list[list]':
     """Remove rows with number of missing datas exceeds the percentage.
 
     Returns:
-        list[list]: 2D list of the data table after removing the missing rows.
+        pandas.DataFrame | list[list]: The data table after removing the missing rows.
+            A data frame keeps its original column types.
     """
     if len(data) == 0:
-        return None
-    columnNum = len(data[0])
-    result = []
-    for row in data:
-        # Get number of missing data columns in a row
-        missingNum = len(list_missing_cols([row], None))
-        missingPercent = (float(missingNum) / columnNum) * 100
-        if missingPercent >= percent and percent != 0:
-            continue
-        elif missingPercent > 0 and percent == 0:
-            continue
+        return data if isinstance(data, pd.DataFrame) else None
+    columnNum = len(data.columns) if isinstance(data, pd.DataFrame) else len(data[0])
+    # Get number of missing data columns of every row from the missing mask
+    with stage("statistics"):
+        missingPercent = (missing_per_row(missing_mask(data)).astype(float) / columnNum) * 100
+    with stage("transform"):
+        if percent != 0:
+            kept = missingPercent < percent
         else:
-            result.append(row)
-    return result
+            kept = missingPercent == 0
+        if isinstance(data, pd.DataFrame):
+            # Select the kept rows with a boolean index
+            return data[kept]
+        return [row for row, keep in zip(data, kept) if keep]
+
+
+def drop_missing_rows_chunks(inputpath: str, outputpath: str, percent: int, chunksize: int, out_format: str = "csv"):
+    """Remove the missing rows of a csv file chunk by chunk, appending the kept rows to the output file.
+    The values are read and written back as text, so they are written exactly as in the input file.
+    """
+    with TableWriter(outputpath, out_format) as writer:
+        for chunk in timed_chunks(read_csv(inputpath, chunksize=chunksize, dtype=str)):
+            add_rows(len(chunk))
+            chunk = drop_missing_rows(chunk, percent)
+            with stage("write"):
+                writer.write_frame(chunk)
+
+
+def drop_missing_rows_range(path: str, header: bytes, start: int, end: int, percent: int) -> 'tuple[str, int]':
+    """Remove the missing rows of a range of a csv file (see parallel_csv.py),
+    returning the kept rows as csv text without the header, and the number of rows of the range.
+    """
+    chunk = range_frame(header, read_range(path, start, end), dtype=str)
+    return drop_missing_rows(chunk, percent).to_csv(index=False, header=False), len(chunk)
+
+
+def drop_missing_rows_parallel(inputpath: str, outputpath: str, percent: int, workers: int, out_format: str = "csv"):
+    """Remove the missing rows of a csv file with several processes, each one reading a range of the file.
+    The kept rows of the ranges are written in the original order, exactly as with drop_missing_rows_chunks.
+    """
+    with TableWriter(outputpath, out_format) as writer:
+        writer.write_frame(pd.read_csv(inputpath, nrows=0, dtype=str))
+        # The ranges are read and filtered by the workers while the results are waited for
+        for text, rows in timed_chunks(map_ranges(inputpath, partial(drop_missing_rows_range, percent=percent),
+                                                  workers), "transform"):
+            add_rows(rows)
+            with stage("write"):
+                writer.write_text(text)
 
 
 def main():
@@ -54,32 +112,51 @@ def main():
 This program removes the rows that have more missing values than a specified percentage in a csv file.
 The csv file should be comma-separated.
 
-Command line: --in=[input_path] --out=[output_path] --percent=[integer] | --help
+Command line: --in=[input_path] --out=[output_path] --percent=[integer] --chunksize=[integer] --workers=[integer] --out-format=[format] | --help
     --in: Path to the input csv file for this program to check.
         For example: --in=a.csv, --in="a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
     --out: Path to the output csv file after the missing rows have been removed.
         For example: --out=a.csv, --out="a b c.csv"
         If not specified, the default will be "output_drop_missing_data_rows_" + input_file_name + ".csv".
+        The extension is changed to the one of the output format.
     --percent: The percentage for the number of columns with missing data that is required for a row to be removed.
         Must be an integer in the range [0,100].
         If --percent=0 the program will remove any row with at least a missing column.
         If --percent=100 the program will only remove rows that don't contain any data.
         The default value is 0.
+    --chunksize: Stream the file in chunks of this many rows instead of loading it whole.
+        The memory usage then depends on the chunk size, not on the file size,
+        and the values are written exactly as they are in the input file.
+        For example: --chunksize=100000
+    --workers: Stream the file with this many processes, each one reading a part of the file.
+        The values are then written exactly as they are in the input file, as with --chunksize.
+        For example: --workers=8
+    --out-format: Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy, see output_writer.py.
+        For example: --out-format=csv.gz:1
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A csv file with data from the input file that has the rows missing a percentage of columns removed.
+    A csv file, or a file of the output format, with data from the input file that has the rows missing
+    a percentage of columns removed.
 """
     # Initialize a dictionary that specify the command line arguments
     spec = {
         "--in": str(),
         "--out": "hold",
         "--percent": 0,
+        "--chunksize": 0,
+        "--workers": 0,
+        "--out-format": "csv",
         "--help": help_msg
     }
 
     # Parse the command line arguments
-    if len(args) < 2 or len(args) > 4:
+    if len(args) < 2 or len(args) > 7:
         print(parse_error)
         return -1
     for arg in args[1:]:
@@ -108,7 +185,8 @@ Output:
             print(specVal)
             return 0
         elif flag == "--in" or flag == "--out":
-            if os.path.splitext(flagVal)[1] == ".csv":
+            # The input file can be compressed, see compressed_input.py
+            if os.path.splitext(decompressed_name(flagVal) if flag == "--in" else flagVal)[1] == ".csv":
                 spec[flag] = flagVal
         elif flag == "--percent":
             try:
@@ -120,6 +198,22 @@ Output:
                 print(
                     "Invalid percentage values, please check the documentation using --help then try again.")
                 return -1
+        elif flag == "--chunksize" or flag == "--workers":
+            try:
+                spec[flag] = int(flagVal)
+                if spec[flag] <= 0:
+                    raise ValueError
+            except ValueError:
+                print("The chunk size must be a positive integer." if flag == "--chunksize" else
+                      "The number of workers must be a positive integer.")
+                return -1
+        elif flag == "--out-format":
+            try:
+                parse_format(flagVal)
+            except ValueError as error:
+                print(str(error) + ". Please try again")
+                return -1
+            spec[flag] = flagVal
         else:
             print(parse_error)
             return -1
@@ -129,20 +223,43 @@ Output:
         print("Invalid input file path. Please try again")
         return -1
 
-    # Read the data file and separate it into data and headers
-    df = pd.read_csv(spec["--in"])
+    if spec["--out"] == "hold":
+        spec["--out"] = "output_drop_missing_data_rows_" + decompressed_name(spec["--in"])
+    spec["--out"] = output_path(spec["--out"], spec["--out-format"])
 
-    # Fill in the missing values
-    df = pd.DataFrame(drop_missing_rows(df.to_numpy().tolist(), spec["--percent"]), columns=df.columns)
+    # A compressed file can only be read in order, so it is streamed in a single process
+    if spec["--workers"] > 0 and is_compressed(spec["--in"]):
+        spec["--workers"] = 0
+        spec["--chunksize"] = spec["--chunksize"] or CHUNKSIZE
 
-    if spec["--out"] == "hold":
-        spec["--out"] = "output_drop_missing_data_rows_" + os.path.basename(spec["--in"])
+    try:
+        if spec["--workers"] > 0:
+            drop_missing_rows_parallel(spec["--in"], spec["--out"], spec["--percent"], spec["--workers"],
+                                       spec["--out-format"])
+            return 0
 
-    # Output the dataframe to csv
-    df.to_csv(spec["--out"], index=False)
+        if spec["--chunksize"] > 0:
+            drop_missing_rows_chunks(spec["--in"], spec["--out"], spec["--percent"], spec["--chunksize"],
+                                     spec["--out-format"])
+            return 0
+
+        # Read the data file and separate it into data and headers
+        with stage("read"):
+            df = read_table(spec["--in"])
+        add_rows(len(df))
+
+        # Remove the missing rows, keeping the column types
+        df = drop_missing_rows(df, spec["--percent"])
+
+        # Output the dataframe in the output format
+        with stage("write"):
+            write_table(df, spec["--out"], spec["--out-format"])
+    except FormatError as error:
+        print("Can't export to " + spec["--out"] + ". " + str(error))
+        return -1
 
     return 0
 
 
 if __name__ == "__main__":
-    main()
+    instrumented(main)
@@ -0,0 +1,347 @@
+"""This module parses arithmetic equations over the columns of a data table
+and evaluates them on whole columns at a time with NumPy.
+
+An equation is parsed once into a small tree of tuples, which only allows:
+    - column names, resolved exactly against the columns of the table.
+      Names that are not plain words (for example with spaces) can be quoted with backticks: `Lot Area`
+    - numbers, for example 2, 0.5 or 1e-3
+    - arithmetic: + - * / // % ** and parentheses
+    - comparisons: < <= > >= == !=, giving 1 when true and 0 when false
+    - the functions listed in FUNCTIONS, for example log(LotArea) or where(YearBuilt < 1950, 1, 0)
+
+Missing values propagate: any operation on a missing value gives a missing value.
+Floor division and modulo by zero give missing values, on integer and float columns alike,
+while true division by zero gives an infinity.
+
+Several named equations can be parsed together, each one referencing the results of the
+previous ones by name. Subtrees shared between them are evaluated only once.
+"""
+
+import re
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+
+# Tokens, tried in order. Numbers must not be followed by a name character,
+# so column names that start with digits (for example 1stFlrSF) stay names.
+TOKEN_REGEX = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?(?![A-Za-z0-9_.]))
+  | (?P<name>[A-Za-z0-9_.]+)
+  | `(?P<quoted>[^`]+)`
+  | (?P<op>\*\*|//|<=|>=|==|!=|[-+*/%<>(),])
+""", re.VERBOSE)
+
+COMPARISONS = ("<", "<=", ">", ">=", "==", "!=")
+
+
+def where(cond, a, b):
+    """Element-wise a where cond is true, else b. Missing conditions give missing values."""
+    cond = np.asarray(cond)
+    result = np.where(cond != 0, a, b)
+    if cond.dtype.kind == "f" and np.isnan(cond).any():
+        result = np.where(np.isnan(cond), np.nan, result)
+    return result
+
+
+# Whitelist of the callable functions, mapped to (implementation, number of arguments)
+FUNCTIONS = {
+    "abs": (np.abs, 1),
+    "sqrt": (np.sqrt, 1),
+    "log": (np.log, 1),
+    "log10": (np.log10, 1),
+    "exp": (np.exp, 1),
+    "floor": (np.floor, 1),
+    "ceil": (np.ceil, 1),
+    "round": (np.round, 1),
+    "min": (np.minimum, 2),
+    "max": (np.maximum, 2),
+    "where": (where, 3),
+}
+
+
+def tokenize(text: str) -> 'list[tuple]':
+    """Split an equation into (kind, value) tokens.
+
+    Raises:
+        ValueError: If the equation contains an unknown character
+    """
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = TOKEN_REGEX.match(text, pos)
+        if match is None:
+            raise ValueError("Unexpected character '" + text[pos] + "' at position " + str(pos))
+        kind = match.lastgroup
+        if kind == "quoted":
+            tokens.append(("name", match.group(kind)))
+        elif kind != "space":
+            tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    tokens.append(("end", ""))
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser of an equation, following Python's operator precedence.
+
+    The parsed tree is made of hashable tuples:
+        ("num", value), ("col", name), ("neg", operand),
+        ("binop", operator, left, right), ("call", function_name, arguments)
+    """
+
+    def __init__(self, text: str, columns: 'list[str]', definitions: 'dict | None' = None):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.columns = set(columns)
+        # trees of the previously named equations, inlined where they are referenced
+        self.definitions = definitions if definitions is not None else {}
+
+    def peek(self) -> 'tuple':
+        return self.tokens[self.pos]
+
+    def take(self, value: 'str | None' = None) -> 'tuple':
+        token = self.tokens[self.pos]
+        if value is not None and token[1] != value:
+            raise ValueError("Expected '" + value + "' but found '" + token[1] + "'")
+        self.pos += 1
+        return token
+
+    def parse(self) -> 'tuple':
+        node = self.comparison()
+        if self.peek()[0] != "end":
+            raise ValueError("Unexpected '" + self.peek()[1] + "'")
+        return node
+
+    def comparison(self) -> 'tuple':
+        node = self.additive()
+        if self.peek()[1] in COMPARISONS:
+            op = self.take()[1]
+            node = ("binop", op, node, self.additive())
+        return node
+
+    def additive(self) -> 'tuple':
+        node = self.term()
+        while self.peek()[1] in ("+", "-"):
+            op = self.take()[1]
+            node = ("binop", op, node, self.term())
+        return node
+
+    def term(self) -> 'tuple':
+        node = self.unary()
+        while self.peek()[1] in ("*", "/", "//", "%"):
+            op = self.take()[1]
+            node = ("binop", op, node, self.unary())
+        return node
+
+    def unary(self) -> 'tuple':
+        if self.peek()[1] == "-":
+            self.take()
+            return ("neg", self.unary())
+        if self.peek()[1] == "+":
+            self.take()
+            return self.unary()
+        return self.power()
+
+    def power(self) -> 'tuple':
+        node = self.primary()
+        if self.peek()[1] == "**":
+            self.take()
+            node = ("binop", "**", node, self.unary())
+        return node
+
+    def primary(self) -> 'tuple':
+        kind, value = self.take()
+        if kind == "number":
+            return ("num", float(value) if any(c in value for c in ".eE") else int(value))
+        if kind == "name":
+            # named equations take precedence over column names, then function names
+            if value in self.definitions:
+                return self.definitions[value]
+            if value in self.columns:
+                return ("col", value)
+            if value in FUNCTIONS and self.peek()[1] == "(":
+                return self.call(value)
+            raise ValueError("Unknown column or function: " + value)
+        if value == "(":
+            node = self.comparison()
+            self.take(")")
+            return node
+        raise ValueError("Unexpected '" + value + "'" if value else "Unexpected end of equation")
+
+    def call(self, name: str) -> 'tuple':
+        self.take("(")
+        args = [self.comparison()]
+        while self.peek()[1] == ",":
+            self.take()
+            args.append(self.comparison())
+        self.take(")")
+        if len(args) != FUNCTIONS[name][1]:
+            raise ValueError(name + "() takes " + str(FUNCTIONS[name][1]) + " argument(s)")
+        return ("call", name, tuple(args))
+
+
+def parse_expression(text: str, columns: 'list[str]') -> 'tuple':
+    """Parse an equation once into a tree, resolving the names against the columns.
+
+    Args:
+        text (str): The equation
+        columns (list[str]): The column names that can be referenced
+
+    Returns:
+        tuple: The parsed tree
+
+    Raises:
+        ValueError: If the equation is invalid
+    """
+    return Parser(text, list(columns)).parse()
+
+
+def parse_expressions(named: 'list[tuple]', columns: 'list[str]') -> 'list[tuple]':
+    """Parse several named equations in order. Each equation can reference
+    the names of the previous ones, whose trees are inlined so that they can be shared.
+
+    Args:
+        named (list[tuple]): The (name, equation) pairs
+        columns (list[str]): The column names that can be referenced
+
+    Returns:
+        list[tuple]: The (name, parsed tree) pairs
+
+    Raises:
+        ValueError: If an equation is invalid
+    """
+    definitions = {}
+    result = []
+    for name, text in named:
+        try:
+            tree = Parser(text, list(columns), definitions).parse()
+        except ValueError as error:
+            raise ValueError(name + ": " + str(error))
+        definitions[name] = tree
+        result.append((name, tree))
+    return result
+
+
+def shared_subtrees(trees: 'list[tuple]') -> 'set':
+    """Find the subtrees that appear more than once across the trees,
+    which are worth keeping once evaluated. Numbers and plain columns are cheap and skipped.
+    """
+    counts = Counter()
+
+    def visit(node):
+        if node[0] in ("num", "col"):
+            return
+        counts[node] += 1
+        # a repeated subtree is counted once, its children are already shared with it
+        if counts[node] > 1:
+            return
+        if node[0] == "neg":
+            visit(node[1])
+        elif node[0] == "binop":
+            visit(node[2])
+            visit(node[3])
+        else:
+            for arg in node[2]:
+                visit(arg)
+
+    for tree in trees:
+        visit(tree)
+    return {node for node, count in counts.items() if count > 1}
+
+
+def column_values(df: 'pd.DataFrame', name: str) -> 'np.ndarray':
+    """Get a column as a numeric NumPy array, with missing values as NaN."""
+    column = df[name]
+    if not pd.api.types.is_numeric_dtype(column.dtype):
+        raise ValueError("Column " + name + " is not numeric")
+    if column.dtype.kind in "iuf":
+        values = column.to_numpy()
+        # compact columns (see table_schema.py) are widened so the arithmetic can't overflow
+        if values.dtype.itemsize < 8:
+            values = values.astype(np.float64 if values.dtype.kind == "f" else np.int64)
+        return values
+    return column.to_numpy(dtype=float, na_value=np.nan)
+
+
+def binop(op: str, a, b):
+    """Apply an arithmetic or comparison operator on arrays or scalars."""
+    if op == "+":
+        return np.add(a, b)
+    if op == "-":
+        return np.subtract(a, b)
+    if op == "*":
+        return np.multiply(a, b)
+    if op == "/":
+        return np.true_divide(a, b)
+    if op in ("//", "%"):
+        divide = np.floor_divide if op == "//" else np.mod
+        zero = np.asarray(b) == 0
+        # NumPy gives 0 on integers, and an infinity or NaN on floats, those rows are missing instead
+        if zero.any():
+            return np.where(zero, np.nan, divide(a, np.where(zero, 1, b)).astype(float))
+        return divide(a, b)
+    if op == "**":
+        # integers can't be raised to negative integer powers
+        if np.asarray(b).dtype.kind in "iu" and (np.asarray(b) < 0).any():
+            a = np.asarray(a, dtype=float)
+        return np.power(a, b)
+    result = {
+        "<": np.less, "<=": np.less_equal, ">": np.greater,
+        ">=": np.greater_equal, "==": np.equal, "!=": np.not_equal,
+    }[op](a, b).astype(float)
+    # a comparison with a missing value is missing
+    return np.where(np.isnan(np.asarray(a, dtype=float)) | np.isnan(np.asarray(b, dtype=float)), np.nan, result)
+
+
+def evaluate(node: 'tuple', df: 'pd.DataFrame', cache: 'dict | None' = None, shared: 'set' = frozenset()):
+    """Evaluate a parsed tree on whole columns of the data frame.
+
+    Args:
+        node (tuple): The parsed tree, see parse_expression
+        df (pandas.DataFrame): The data frame holding the referenced columns
+        cache (dict | None): Results of the shared subtrees already evaluated, filled while evaluating
+        shared (set): The subtrees to keep in the cache, see shared_subtrees
+
+    Returns:
+        numpy.ndarray | scalar: The result of each row, or a scalar if no column is referenced
+    """
+    if cache is not None and node in cache:
+        return cache[node]
+
+    kind = node[0]
+    if kind == "num":
+        return node[1]
+    if kind == "col":
+        return column_values(df, node[1])
+    if kind == "neg":
+        result = np.negative(evaluate(node[1], df, cache, shared))
+    elif kind == "binop":
+        left = evaluate(node[2], df, cache, shared)
+        right = evaluate(node[3], df, cache, shared)
+        with np.errstate(all="ignore"):
+            result = binop(node[1], left, right)
+    else:
+        args = [evaluate(arg, df, cache, shared) for arg in node[2]]
+        with np.errstate(all="ignore"):
+            result = FUNCTIONS[node[1]][0](*args)
+
+    if cache is not None and node in shared:
+        cache[node] = result
+    return result
+
+
+def evaluate_all(trees: 'list[tuple]', df: 'pd.DataFrame') -> 'list':
+    """Evaluate several parsed trees on the data frame, evaluating their shared subtrees once.
+
+    Args:
+        trees (list[tuple]): The parsed trees
+        df (pandas.DataFrame): The data frame holding the referenced columns
+
+    Returns:
+        list: The result of each tree, see evaluate
+    """
+    shared = shared_subtrees(trees)
+    cache = {}
+    return [evaluate(tree, df, cache, shared) for tree in trees]
@@ -1,39 +1,93 @@
 """
-This program normalizes/standardizes a column in a csv file.
+This program normalizes/standardizes one or more columns in a csv file.
 The csv file should be comma-separated.
 The parameter must be in the correct order in order for this program to function normally.
+The file is streamed twice in chunks: the first pass computes the statistics of each column,
+the second pass writes the scaled values, so the memory usage doesn't depend on the number of rows.
+If the file has a valid cached profile (see column_profile.py), the statistics are taken from it instead,
+else from its columnar cache (see columnar_cache.py) if it has one.
 
-Command line: [csv_path] [attribute] [include] | --help
+Command line: [csv_path] [attribute] [include] --chunksize=[integer] --out-format=[format] --fit=[params_path] | --transform=[params_path] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
-    attribute: The attribute that need to be normalized/standardized
-        For example: att1
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+    attribute: The attribute(s) that need to be normalized/standardized, separated by comma.
+        The "all-numeric" keyword can be used to specify every numeric attribute.
+        For example: att1 or att1,att2 or all-numeric
     include: The needed method for output, including:
         zscore: Standardize the column using Z Score method.
         minmaxscale: Normalize the column using Min-Max Scaling method
         all: both
+    --chunksize: Optional. The number of rows read at a time. The default value is 100000.
+        For example: --chunksize=10000
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
+    --fit: Optional. Save the statistics computed on this file to a parameter file,
+        to scale other files the same way with --transform.
+        For example: --fit=scaler.json
+    --transform: Optional. Scale with the statistics of a parameter file saved by --fit
+        instead of computing them, so the file is only read once.
+        The attributes must be in the parameter file, "all-numeric" selects all of them.
+        For example: --transform=scaler.json
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
+Missing values are ignored when computing the statistics and stay missing in the output.
+A column whose values are all equal is scaled to 0.
+
 Output:
     A csv file where the first column store the original value, the next column(s) store the value after being normalized/standardized.
-    Output path is ''output_feature_scaling_' + csv_path' and is not customizable.
+    With several attributes, the scaled columns of each attribute follow it and are prefixed with its name.
+    Output path is ''output_feature_scaling_' + attribute + '_' + csv_path' and is not customizable, except for its extension.
 """
 
-import os
+import numpy as np
 import pandas as pd 
 import sys
+from fitted_params import save_params, load_params
+from column_profile import column_stats, merge_stats, load_profile
+from columnar_cache import load_meta, open_columns
+from run_metrics import instrumented, stage, timed_chunks, add_rows
+from compressed_input import decompressed_name
+from table_schema import read_csv
+from output_writer import TableWriter, FormatError, output_path, parse_format
+
+# default number of rows read at a time
+CHUNKSIZE = 100000
+
+########################################################
+def scale_values(values, stats: dict, INCLUDE: str) -> 'dict | None':
+    """
+    This function returns the scaled versions of the values requested by INCLUDE,
+    mapped by their output column names, using the statistics of the whole column,
+    or None if INCLUDE is not a valid option.
+    """
+    values = np.asarray(values, dtype=float)
+    result = {}
+    if INCLUDE in ('all', 'minmaxscale'):
+        # min-max scaling (Normalization)
+        span = stats['max'] - stats['min']
+        result['Min-max Scaling'] = (values - stats['min']) / span if span > 0 else values * 0.0
+    if INCLUDE in ('all', 'zscore'):
+        # population standard deviation (do lech chuan)
+        pstdev = (stats['m2'] / stats['count']) ** (1 / 2) if stats['count'] > 0 else 0.0
+        # z scores normalization (Standardization)
+        result['Z-Score'] = (values - stats['mean']) / pstdev if pstdev > 0 else values * 0.0
+    if len(result) == 0:
+        return None
+    return result
 
+########################################################
 def minmax(a: list) -> list:  
     """
     This function returns a list of values that 
     have been normalized.
     """
-    Min = min(a)
-    Max = max(a)
-    
-    # min-max scaling (Normalization)
-    return [(x - Min) / (Max - Min) for x in a]
+    return scale_values(a, column_stats(a), 'minmaxscale')['Min-max Scaling'].tolist()
 
 ########################################################
 def zscore(a: list) -> list:
@@ -41,76 +95,270 @@ def zscore(a: list) -> list:
     This function returns a list of values that 
     have been standardized.
     """
-    mean = sum(a) / len(a)
-    
-    # population standard deviation (do lech chuan)
-    sum_temp = 0
-    # a for loop is utilized instead of list comprehension to conserve memory
-    for i in a:
-        sum_temp += (i - mean) ** 2
+    return scale_values(a, column_stats(a), 'zscore')['Z-Score'].tolist()
 
-    pstdev = (sum_temp / len(a)) ** (1 / 2)
-    
-    # z scores normalization (Standardization)
-    return [(x - mean) / pstdev for x in a]
+########################################################
+def scale_column(column: list, INCLUDE: str) -> 'dict | None':
+    """
+    This function returns the scaled versions of a column
+    requested by INCLUDE, mapped by their output column names,
+    or None if INCLUDE is not a valid option.
+    """
+    return scale_values(column, column_stats(column), INCLUDE)
+
+########################################################
+def is_scalable(dtype) -> bool:
+    """
+    This function tells whether a column type can be scaled.
+    """
+    return dtype.kind in 'iuf'
+
+########################################################
+def fit_stats(INPUTPATH: str, attributes: 'list[str] | None', chunksize: int) -> dict:
+    """
+    This function streams the csv file once and returns the statistics of each attribute.
+    If attributes is None, every column that is numeric in the whole file is used.
+    A KeyError is raised if an attribute is not a column of the file,
+    a ValueError if it is not numeric.
+    """
+    stats = {}
+    excluded = set()
+    for chunk in timed_chunks(read_csv(INPUTPATH, usecols=attributes, chunksize=chunksize)):
+        with stage('statistics'):
+            for name in chunk.columns:
+                if name in excluded or not is_scalable(chunk[name].dtype):
+                    if attributes is not None:
+                        raise ValueError(name + ' is not numeric')
+                    excluded.add(name)
+                    continue
+                stats[name] = merge_stats(stats.get(name, column_stats([])), column_stats(chunk[name]))
+    if attributes is None:
+        return {name: value for name, value in stats.items() if name not in excluded}
+    missing = [name for name in attributes if name not in stats]
+    if len(missing) > 0:
+        raise KeyError(','.join(missing))
+    # keep the order of the attributes given by the user
+    return {name: stats[name] for name in attributes}
+
+########################################################
+def profile_stats(profile: dict, attributes: 'list[str] | None', chunksize: int) -> 'dict | None':
+    """
+    This function returns the statistics of each attribute from the cached profile
+    of the csv file (see column_profile.py), raising the same errors as fit_stats,
+    or None if the profile can't give the same statistics as fit_stats.
+    """
+    if profile['chunksize'] != chunksize:
+        return None
+    columns = {column['name']: column for column in profile['columns']}
+    names = list(columns) if attributes is None else attributes
+    if any(name in columns and columns[name]['kind'] == 'mixed' for name in names):
+        return None
+    missing = [name for name in names if name not in columns]
+    if len(missing) > 0:
+        raise KeyError(','.join(missing))
+    stats = {}
+    for name in names:
+        if columns[name]['kind'] == 'numeric':
+            stats[name] = {key: columns[name][key] for key in ('count', 'mean', 'm2', 'min', 'max')}
+        elif attributes is not None:
+            raise ValueError(name + ' is not numeric')
+    return stats
+
+########################################################
+def cache_stats(INPUTPATH: str, attributes: 'list[str] | None', chunksize: int) -> 'dict | None':
+    """
+    This function returns the statistics of each attribute from the columnar cache
+    of the csv file (see columnar_cache.py), raising the same errors as profile_stats,
+    or None if the file has no valid cache.
+    The memory-mapped columns are not copied, and their statistics are merged
+    chunk by chunk like in fit_stats, so they are identical.
+    """
+    meta = load_meta(INPUTPATH)
+    if meta is None or meta['rows'] == 0:
+        return None
+    columns = open_columns(INPUTPATH, meta)
+    names = list(columns) if attributes is None else attributes
+    missing = [name for name in names if name not in columns]
+    if len(missing) > 0:
+        raise KeyError(','.join(missing))
+    stats = {}
+    with stage('statistics'):
+        for name in names:
+            # nominal columns are (codes, distinct values) pairs
+            if isinstance(columns[name], tuple) or not is_scalable(columns[name].dtype):
+                if attributes is not None:
+                    raise ValueError(name + ' is not numeric')
+                continue
+            stats[name] = column_stats([])
+            for start in range(0, meta['rows'], chunksize):
+                stats[name] = merge_stats(stats[name], column_stats(columns[name][start:start + chunksize]))
+    return stats
+
+########################################################
+def transform_file(INPUTPATH: str, outputpath: str, stats: dict, INCLUDE: str, chunksize: int,
+                   out_format: str = 'csv'):
+    """
+    This function streams the csv file again and writes each attribute
+    followed by its scaled versions, chunk by chunk, in the output format (see output_writer.py).
+    """
+    with TableWriter(outputpath, out_format) as writer:
+        for chunk in timed_chunks(read_csv(INPUTPATH, usecols=list(stats.keys()), chunksize=chunksize)):
+            add_rows(len(chunk))
+            with stage('transform'):
+                out = {}
+                for name, columnStats in stats.items():
+                    out[name] = chunk[name]
+                    for method, values in scale_values(chunk[name], columnStats, INCLUDE).items():
+                        # a single attribute keeps the plain method names
+                        out[method if len(stats) == 1 else name + ' ' + method] = values
+                out = pd.DataFrame(out)
+            with stage('write'):
+                writer.write_frame(out)
 
 ######################################################## MAIN
-arg = sys.argv
+def main():
+    arg = sys.argv
 
-INPUTPATH = arg[1]
+    INPUTPATH = arg[1]
 
-if INPUTPATH == "--help":
-    print("""
-This program normalizes/standardizes a column in a csv file.
+    if INPUTPATH == "--help":
+        print("""
+This program normalizes/standardizes one or more columns in a csv file.
 The csv file should be comma-separated.
 The parameter must be in the correct order in order for this program to function normally.
+The file is streamed twice in chunks: the first pass computes the statistics of each column,
+the second pass writes the scaled values, so the memory usage doesn't depend on the number of rows.
+If the file has a valid cached profile (see column_profile.py), the statistics are taken from it instead,
+else from its columnar cache (see columnar_cache.py) if it has one.
 
-Command line: [csv_path] [attribute] [include] | --help
+Command line: [csv_path] [attribute] [include] --chunksize=[integer] --out-format=[format] --fit=[params_path] | --transform=[params_path] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
-    attribute: The attribute that need to be normalized/standardized
-        For example: att1
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+    attribute: The attribute(s) that need to be normalized/standardized, separated by comma.
+        The "all-numeric" keyword can be used to specify every numeric attribute.
+        For example: att1 or att1,att2 or all-numeric
     include: The needed method for output, including:
         zscore: Standardize the column using Z Score method.
         minmaxscale: Normalize the column using Min-Max Scaling method
         all: both
+    --chunksize: Optional. The number of rows read at a time. The default value is 100000.
+        For example: --chunksize=10000
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
+    --fit: Optional. Save the statistics computed on this file to a parameter file,
+        to scale other files the same way with --transform.
+        For example: --fit=scaler.json
+    --transform: Optional. Scale with the statistics of a parameter file saved by --fit
+        instead of computing them, so the file is only read once.
+        The attributes must be in the parameter file, "all-numeric" selects all of them.
+        For example: --transform=scaler.json
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
+Missing values are ignored when computing the statistics and stay missing in the output.
+A column whose values are all equal is scaled to 0.
+
 Output:
     A csv file where the first column store the original value, the next column(s) store the value after being normalized/standardized.
-    Output path is ''output_feature_scaling_' + csv_path' and is not customizable.
+    With several attributes, the scaled columns of each attribute follow it and are prefixed with its name.
+    Output path is ''output_feature_scaling_' + attribute + '_' + csv_path' and is not customizable, except for its extension.
 """)
-    quit()
+        return 0
 
-ATTRIBUTE = arg[2]
-INCLUDE = arg[3]
+    if len(arg) < 4:
+        print("INVALID CONSTRUCTION.\n CLOSING PROGRAM..")
+        return -1
 
-column = list(pd.read_csv(INPUTPATH)[ATTRIBUTE])
-colNames = [ATTRIBUTE]
-result = zip()
-    
-# handling INCLUDE option
-    
-if INCLUDE == 'all':
-    colNames.extend(['Min-max Scaling', 'Z-Score'])
-    result = zip(column, minmax(column), zscore(column))
-    
-elif INCLUDE == 'zscore':
-    colNames.append('Z-Score')
-    result = zip(column, zscore(column))
-    
-elif INCLUDE == 'minmaxscale':    
-    colNames.append('Min-max Scaling')
-    result = zip(column, minmax(column))
-    
-else:
-    print("INVALID CONSTRUCTION.\n CLOSING PROGRAM..")
-    quit()
+    ATTRIBUTE = arg[2]
+    INCLUDE = arg[3]
+
+    chunksize = CHUNKSIZE
+    fitpath = None
+    transformpath = None
+    outFormat = 'csv'
+    for option in arg[4:]:
+        flag, _, value = option.partition('=')
+        try:
+            if flag == '--chunksize':
+                chunksize = int(value)
+                if chunksize <= 0:
+                    raise ValueError
+            elif flag == '--fit' and len(value) > 0:
+                fitpath = value
+            elif flag == '--transform' and len(value) > 0:
+                transformpath = value
+            elif flag == '--out-format':
+                try:
+                    parse_format(value)
+                except ValueError as error:
+                    print("INVALID OPTION " + option + ". " + str(error) + ".\n CLOSING PROGRAM..")
+                    return -1
+                outFormat = value
+            else:
+                raise ValueError
+        except ValueError:
+            print("INVALID OPTION " + option + ".\n CLOSING PROGRAM..")
+            return -1
+    if fitpath is not None and transformpath is not None:
+        print("--fit AND --transform CAN'T BE USED TOGETHER.\n CLOSING PROGRAM..")
+        return -1
+
+    if INCLUDE not in ('all', 'zscore', 'minmaxscale'):
+        print("INVALID CONSTRUCTION.\n CLOSING PROGRAM..")
+        return -1
+
+    attributes = None if ATTRIBUTE == 'all-numeric' else ATTRIBUTE.split(',')
+
+    if transformpath is not None:
+        # the statistics were fitted on another file
+        try:
+            stats = load_params(transformpath, 'feature_scaling')
+            if attributes is not None:
+                stats = {name: stats[name] for name in attributes}
+        except (OSError, ValueError) as error:
+            print("INVALID PARAMETER FILE " + str(error) + ".\n CLOSING PROGRAM..")
+            return -1
+        except KeyError as error:
+            print("ATTRIBUTE " + str(error) + " IS NOT IN THE PARAMETER FILE.\n CLOSING PROGRAM..")
+            return -1
+    else:
+        # first pass: statistics of each attribute, unless the cached profile or columnar cache of the file has them
+        profile = load_profile(INPUTPATH)
+        try:
+            stats = None if profile is None else profile_stats(profile, attributes, chunksize)
+            if stats is None:
+                stats = cache_stats(INPUTPATH, attributes, chunksize)
+            if stats is None:
+                stats = fit_stats(INPUTPATH, attributes, chunksize)
+        except (KeyError, ValueError) as error:
+            print("INVALID ATTRIBUTE " + str(error) + ".\n CLOSING PROGRAM..")
+            return -1
+        if fitpath is not None:
+            save_params(fitpath, 'feature_scaling', stats)
+            print('SAVED PARAMETERS TO ' + fitpath)
+    if len(stats) == 0:
+        print("NO NUMERIC ATTRIBUTE.\n CLOSING PROGRAM..")
+        return -1
+
+    # second pass: scaled values
+    outputpath = output_path('output_feature_scaling_' + ATTRIBUTE + '_' + decompressed_name(INPUTPATH), outFormat)
+    try:
+        transform_file(INPUTPATH, outputpath, stats, INCLUDE, chunksize, outFormat)
+    except FormatError as error:
+        print("CAN'T EXPORT TO " + outputpath + ". " + str(error) + ".\n CLOSING PROGRAM..")
+        return -1
+    except ValueError as error:
+        print("INVALID ATTRIBUTE " + str(error) + ".\n CLOSING PROGRAM..")
+        return -1
+    print('EXPORTED TO ' + outputpath)
+
+    return 0
 
-# create a new DataFrame that stores the results
-df = pd.DataFrame(result,columns = colNames)
 
-outputpath = 'output_feature_scaling_' + ATTRIBUTE + '_' + os.path.basename(INPUTPATH)
-df.to_csv(outputpath, index = False)
-print('EXPORTED TO ' + outputpath)
\ No newline at end of file
+if __name__ == "__main__":
+    instrumented(main)
@@ -5,11 +5,13 @@ If the attribute is nominal, the filling method is by the mode of the attribute.
 If the attribute is numeric, user can select between the mean or the median of the attribute.
 This program assumes that all data have equal weights of 1.
 
-Command line: --in=[csv_path] --out=[output_path] --attributes=[attribute_indices] --num_method=[mean|median] | --help
+Command line: --in=[csv_path] --out=[output_path] --attributes=[attribute_indices] --num_method=[mean|median] --median_error=[float] --chunksize=[integer] --out-format=[format] --fit=[params_path] | --transform=[params_path] | --help
     --in: Path to the input csv file for this program to check.
         For example: --in=a.csv, --in="a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
     --out: Path to the output csv file after the data has been filled.
         If not specified, the default will be "output_fill_missing_values_" + input_file_name + ".csv".
+        The extension is changed to the one of the output format.
         For example: --in=a.csv, --in="a b c.csv"
     --attributes: List of attribute indices to check, separated by comma, with no space inbetween.
         The "all" keyword can be used to specify all attributes detected as missing data.
@@ -17,23 +19,59 @@ Command line: --in=[csv_path] --out=[output_path] --attributes=[attribute_indice
     --num_method: Specify the filling method for numeric attributes.
         By default, the filling method is "mean".
         For example: --num_method=mean or --num_method=median
+    --median_error: Estimate the medians with a mergeable quantile sketch of this rank error instead of exactly.
+        The achieved rank error is printed. Only used with --num_method=median.
+        With --chunksize, medians are always estimated, by default with a rank error of 0.001.
+        For example: --median_error=0.001
+    --chunksize: Stream the file twice in chunks of this many rows instead of loading it whole.
+        The first pass finds the columns with missing data and computes the filling values,
+        the second pass fills the chunks and appends them to the output file.
+        The memory usage then depends on the chunk size and the number of distinct nominal values.
+        If the file has a valid cached profile (see column_profile.py), the first pass is skipped
+        and the modes and means are taken from it.
+        With --transform, the first pass only finds the numeric columns that have to be written as floats.
+        For example: --chunksize=100000
+    --out-format: Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy, see output_writer.py.
+        For example: --out-format=csv.gz:1
+    --fit: Save the filling values computed on this file to a parameter file,
+        to fill other files the same way with --transform.
+        For example: --fit=imputer.json
+    --transform: Fill with the values of a parameter file saved by --fit instead of computing them.
+        The attributes must be in the parameter file, "all" selects all of them.
+        For example: --transform=imputer.json
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A csv file identical to the input csv with all the missing data filled.
+    A csv file, or a file of the output format, identical to the input csv with all the missing data filled.
 """
 
 import sys
 import os
+import numpy as np
 import pandas as pd
-from list_missing_cols import isNaN, list_missing_cols
-
-
-def mean(data: 'list') -> 'float':
+from list_missing_cols import list_missing_cols
+from missing_mask import missing_mask
+from fitted_params import save_params, load_params
+from quantile_sketch import QuantileSketch
+from column_profile import load_profile
+from columnar_cache import read_table
+from run_metrics import instrumented, stage, timed_chunks, add_rows
+from compressed_input import read_csv, decompressed_name
+import table_schema
+from output_writer import TableWriter, FormatError, output_path, parse_format, write_table
+
+# Default rank error of the medians estimated while streaming
+MEDIAN_ERROR = 0.001
+
+
+def mean(data: 'list | np.ndarray') -> 'float':
     """Calculate mean value of a numeric list, assuming all values have equal weights of 1.
 
     Args:
-        data (list): Iterable numeric value list
+        data (list | numpy.ndarray): Iterable numeric value list
 
     Returns:
         float: The mean value of the list
@@ -41,52 +79,151 @@ def mean(data: 'list') -> 'float':
     # If the data list is empty, mean is 0
     if len(data) == 0:
         return 0
-    total: float = sum(data)
-    return total / len(data)
+    return float(np.mean(np.asarray(data, dtype=float)))
 
 
-def median(data: 'list') -> 'float':
+def median(data: 'list | np.ndarray') -> 'float':
     """Calculate median value of a numeric list, assuming all values have equal weights of 1.
+    The middle values are found by selection (introselect) in O(n) time, without sorting or changing the list.
 
     Args:
-        data (list): Iterable numeric value list
+        data (list | numpy.ndarray): Iterable numeric value list
 
     Returns:
         float: The median value of the list
     """
-    # Sort the list in ascending order first
-    data.sort()
-    # If number of elements is odd, return the middle value
-    size = len(data)
+    values = np.asarray(data, dtype=float)
+    size = len(values)
     # If the data list is empty, median is 0
+    if size == 0:
+        return 0
+    half = size // 2
+    # If number of elements is odd, return the middle value
     if size % 2 == 1:
-        return data[int(size / 2)]
-    else:
-        # If the number of elements is even, return the average of 2 middle values, assuming it's 0-based index
-        half = int(size / 2)
-        return (data[half] + data[half - 1]) / float(2)
+        return float(np.partition(values, half)[half])
+    # If the number of elements is even, return the average of 2 middle values, assuming it's 0-based index
+    middle = np.partition(values, [half - 1, half])
+    return (middle[half] + middle[half - 1]) / float(2)
 
 
-def modeNominal(data: 'list') -> 'str':
+def sketch_median(error: float, reports: 'list') -> 'callable':
+    """Make a filling method that estimates the median with a quantile sketch, see quantile_sketch.py.
+    The sketch runs in one pass with bounded memory, at the cost of a bounded rank error.
+
+    Args:
+        error (float): Target rank error of the estimated median, as a fraction of the number of values
+        reports (list): List to which the achieved rank error of each estimated median is appended
+
+    Returns:
+        callable: The filling method, taking a numeric value list and returning its estimated median
+    """
+    def estimate(data: 'list | np.ndarray') -> 'float':
+        # If the data list is empty, median is 0
+        if len(data) == 0:
+            return 0
+        sketch = QuantileSketch(error).update(data)
+        reports.append(sketch.rank_error())
+        return sketch.median()
+    return estimate
+
+
+def count_values(data: 'list | np.ndarray | pd.Categorical') -> 'tuple[np.ndarray, np.ndarray]':
+    """Count the distinct values of a nominal list, in order of first appearance.
+    A categorical list (see table_schema.py) is counted over its integer codes, without hashing its values.
+
+    Args:
+        data (list | numpy.ndarray | pandas.Categorical): Iterable nominal value list, without missing values
+
+    Returns:
+        tuple: The distinct values and the number of occurrences of each one
+    """
+    if isinstance(data, pd.Categorical):
+        codes = data.codes
+        counts = np.bincount(codes, minlength=len(data.categories))
+        # The first position of each code is the minimum of its positions
+        firsts = np.full(len(counts), len(codes))
+        np.minimum.at(firsts, codes, np.arange(len(codes)))
+        order = np.argsort(firsts, kind="stable")[:np.count_nonzero(counts)]
+        return data.categories.to_numpy(dtype=object)[order], counts[order]
+    # Encode the values as integer codes in order of appearance, then count the codes
+    codes, uniques = pd.factorize(np.asarray(data, dtype=object))
+    return uniques, np.bincount(codes, minlength=len(uniques))
+
+
+def column_values(column: 'pd.Series') -> 'np.ndarray | pd.Categorical':
+    """Get the values of a column as an array, keeping the codes of a categorical column, see count_values."""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.array
+    return column.to_numpy()
+
+
+def modeNominal(data: 'list | np.ndarray | pd.Categorical') -> 'str':
     """Get the mode value of a nominal list, assuming all values have equal weights of 1.
+    If several values have the highest frequency, the first one to appear in the list is chosen.
 
     Args:
-        data (list): Iterable nominal value list
+        data (list | numpy.ndarray | pandas.Categorical): Iterable nominal value list
 
     Returns:
         str: The string value that has the most frequency in the list
     """
-    counter = {}
-    for value in data:
-        count = counter.get(value, 0)
-        if count == 0:
-            counter.setdefault(value, 1)
-        else:
-            counter[value] += 1
     # If the data list is empty, we don't know the mode, just give "Unknown"
-    if len(counter) == 0:
+    if len(data) == 0:
         return "Unknown"
-    return max(counter, key=counter.get)
+    uniques, counts = count_values(data)
+    return uniques[counts.argmax()]
+
+
+def compute_fillers(data: 'pd.DataFrame', attrIndex: 'list', numeric_fill=mean, mask=None) -> 'dict':
+    """Compute the filling value of each specified attribute.
+    If the data is nominal, it's the mode of the attribute.
+    If the data is numeric, it's either mean or median of the attribute, specified by numeric_fill
+
+    Returns:
+        dict: The filling value of each attribute, keyed by column name
+    """
+    with stage("statistics"):
+        if mask is None:
+            mask = missing_mask(data)
+        fillers = {}
+        # Iterate through each column in the specified attribute list
+        for colIndex in attrIndex:
+            available = column_values(data.iloc[:, colIndex])[~mask[:, colIndex]]
+            # If the attribute is nominal, get the mode value of the column
+            # By default, pandas read string values from csv as 'object' type
+            if not pd.api.types.is_numeric_dtype(data.dtypes.iloc[colIndex]):
+                fillers[data.columns[colIndex]] = modeNominal(available)
+            else:
+                # If the attribute is numeric, use the specified filling method from the parameter
+                fillers[data.columns[colIndex]] = numeric_fill(available)
+    return fillers
+
+
+def apply_fillers(data: 'pd.DataFrame', fillers: 'dict', mask=None) -> 'pd.DataFrame':
+    """Replace the missing data of each column in fillers with its filling value.
+
+    Returns:
+        pandas.DataFrame: The data frame, with filled data
+    """
+    if mask is None:
+        with stage("statistics"):
+            mask = missing_mask(data)
+    # Replace the missing elements of every column with its filler, then update all the columns at once
+    with stage("transform"):
+        filled = {}
+        for name, filler in fillers.items():
+            colMask = mask[:, data.columns.get_loc(name)]
+            if colMask.any():
+                column = data[name]
+                # A compact column (see table_schema.py) is widened so it can hold the filler as it is
+                if isinstance(column.dtype, pd.CategoricalDtype) and filler not in column.cat.categories:
+                    column = column.cat.add_categories([filler])
+                elif column.dtype.kind == "f" and column.dtype.itemsize < 8:
+                    column = column.astype(float)
+                filled[name] = column.mask(colMask, filler)
+        if len(filled) > 0:
+            data[list(filled.keys())] = pd.DataFrame(filled, index=data.index)
+    return data
 
 
 def fill_missing_values(data: 'pd.DataFrame', attrIndex: 'list', numeric_fill=mean) -> 'pd.DataFrame':
@@ -98,23 +235,163 @@ def fill_missing_values(data: 'pd.DataFrame', attrIndex: 'list', numeric_fill=me
     Returns:
         pandas.DataFrame: A copy of the original data frame, with filled data
     """
-    # Iterate through each column in the specified attribute list
+    # Build the missing mask of the whole table once
+    with stage("statistics"):
+        mask = missing_mask(data)
+    return apply_fillers(data, compute_fillers(data, attrIndex, numeric_fill, mask), mask)
+
+
+def scan_fillers(path: str, chunksize: int, attrIndex: 'list | str', useMedian: bool,
+                 error: float, reports: 'list') -> 'tuple[dict, set]':
+    """Compute the filling values while streaming a csv file chunk by chunk.
+    Nominal attributes keep a running count of their values, numeric attributes keep a running sum
+    or a quantile sketch for the median, so the whole file is never loaded.
+
+    Args:
+        path (str): Path to the csv file
+        chunksize (int): Number of rows of each chunk
+        attrIndex (list | str): List of attribute indices, or "all" for the attributes with missing data
+        useMedian (bool): Fill numeric attributes with their median instead of their mean
+        error (float): Target rank error of the estimated medians
+        reports (list): List to which the achieved rank error of each estimated median is appended
+
+    Returns:
+        tuple: The filling value of each attribute keyed by column name,
+            and the set of numeric columns that must be written as floats, attributes or not
+
+    Raises:
+        TypeError: If an attribute has numeric values in a chunk and nominal values in another
+    """
+    colnames = None
+    missingCounts = None
+    floatCols = set()
+    stats = {}
+    for chunk in timed_chunks(table_schema.read_csv(path, chunksize=chunksize)):
+        with stage("statistics"):
+            if colnames is None:
+                colnames = chunk.columns.tolist()
+                missingCounts = np.zeros(len(colnames), dtype=np.int64)
+            mask = missing_mask(chunk)
+            missingCounts += mask.sum(axis=0)
+            # A column is read as floats from the whole file if it is in any chunk
+            floatCols.update(name for name, dtype in chunk.dtypes.items() if dtype.kind == "f")
+            for colIndex in (range(len(colnames)) if attrIndex == "all" else attrIndex):
+                name = colnames[colIndex]
+                column = chunk.iloc[:, colIndex]
+                available = column_values(column)[~mask[:, colIndex]]
+                stat = stats.setdefault(name, {"count": 0, "sum": 0.0, "sketch": None, "modes": None})
+                if stat["modes"] is None and pd.api.types.is_numeric_dtype(column.dtype):
+                    stat["count"] += len(available)
+                    stat["sum"] += float(np.sum(available, dtype=float))
+                    if useMedian:
+                        if stat["sketch"] is None:
+                            stat["sketch"] = QuantileSketch(error)
+                        stat["sketch"].update(available)
+                else:
+                    # Values seen before this chunk can't be counted anymore
+                    if stat["modes"] is None and stat["count"] > 0:
+                        raise TypeError(name)
+                    if stat["modes"] is None:
+                        stat["modes"] = {}
+                    # Count the values of the chunk, in order of appearance, and add them to the running counts
+                    for value, count in zip(*count_values(available)):
+                        stat["modes"][value] = stat["modes"].get(value, 0) + int(count)
+
+    if colnames is None:
+        return {}, floatCols
+    if attrIndex == "all":
+        attrIndex = [i for i in range(len(colnames)) if missingCounts[i] > 0]
+
+    fillers = {}
     for colIndex in attrIndex:
-        # If the attribute is nominal, get the mode value of the column
-        # By default, pandas read string values from csv as 'object' type
-        filler = 0
-        if data.dtypes[colIndex] == object:
-            filler = modeNominal(
-                [x for x in data.iloc[:, colIndex].tolist() if not isNaN(x)])
+        name = colnames[colIndex]
+        stat = stats[name]
+        if stat["modes"] is not None:
+            # The first value to appear wins the ties, as in modeNominal
+            fillers[name] = max(stat["modes"], key=stat["modes"].get) if len(stat["modes"]) > 0 else "Unknown"
+        elif stat["count"] == 0:
+            fillers[name] = 0
+        elif useMedian:
+            fillers[name] = stat["sketch"].median()
+            reports.append(stat["sketch"].rank_error())
         else:
-            # If the attribute is numeric, use the specified filling method from the parameter
-            filler = numeric_fill(
-                [x for x in data.iloc[:, colIndex].tolist() if not isNaN(x)])
-        # Iterate through elements in the column, if an element is missing value, replace it with the filler
-        for i in range(data.shape[0]):
-            if isNaN(data.iloc[i, colIndex]):
-                data.iat[i, colIndex] = filler
-    return data
+            fillers[name] = stat["sum"] / stat["count"]
+    return fillers, floatCols
+
+
+def profile_fillers(profile: 'dict', attrIndex: 'list | str') -> 'tuple[dict, set] | None':
+    """Get the filling values from the cached profile of a csv file (see column_profile.py),
+    with the mode of nominal attributes and the mean of numeric attributes, without reading the file.
+
+    Args:
+        profile (dict): The profile of the csv file
+        attrIndex (list | str): List of attribute indices, or "all" for the attributes with missing data
+
+    Returns:
+        tuple | None: The filling values and the set of numeric columns that must be written as floats,
+            as in scan_fillers, or None if the profile doesn't hold the values of an attribute
+            or doesn't tell how pandas reads a column
+    """
+    columns = profile["columns"]
+    # pandas reads a mixed column as floats or as strings depending on its missing strings
+    if any(column["kind"] == "mixed" for column in columns):
+        return None
+    floatCols = {column["name"] for column in columns if column["kind"] == "numeric" and column["float"]}
+    if attrIndex == "all":
+        attrIndex = [i for i, column in enumerate(columns) if column["missing"] > 0]
+    fillers = {}
+    for colIndex in attrIndex:
+        column = columns[colIndex]
+        name = column["name"]
+        if column["kind"] == "numeric":
+            fillers[name] = column["mean"] if column["count"] > 0 else 0
+        elif column["kind"] == "nominal" and column["values"] is not None:
+            # The first value to appear wins the ties, as in modeNominal
+            fillers[name] = max(column["values"], key=column["values"].get)
+        else:
+            return None
+    return fillers, floatCols
+
+
+def float_columns(path: str, chunksize: int) -> 'set':
+    """Find the numeric columns of a csv file that are read as floats when the whole file is loaded,
+    from its cached profile if it is valid, else by streaming it chunk by chunk.
+
+    Args:
+        path (str): Path to the csv file
+        chunksize (int): Number of rows of each chunk
+
+    Returns:
+        set: The names of the columns
+    """
+    profile = load_profile(path)
+    cached = profile_fillers(profile, []) if profile is not None else None
+    if cached is not None:
+        return cached[1]
+    return scan_fillers(path, chunksize, [], False, MEDIAN_ERROR, [])[1]
+
+
+def fill_chunks(path: str, outputpath: str, chunksize: int, fillers: 'dict', floatCols: 'set',
+                out_format: str = "csv"):
+    """Fill the missing data of a csv file chunk by chunk and append the chunks to the output file.
+
+    Args:
+        path (str): Path to the input csv file
+        outputpath (str): Path to the output file
+        chunksize (int): Number of rows of each chunk
+        fillers (dict): The filling value of each attribute, keyed by column name
+        floatCols (set): Numeric columns written as floats in every chunk, like when the whole file is loaded
+        out_format (str): Format of the output file, see output_writer.py
+    """
+    with TableWriter(outputpath, out_format) as writer:
+        for chunk in timed_chunks(table_schema.read_csv(path, chunksize=chunksize)):
+            add_rows(len(chunk))
+            for name in floatCols:
+                if pd.api.types.is_numeric_dtype(chunk[name].dtype):
+                    chunk[name] = chunk[name].astype(float)
+            chunk = apply_fillers(chunk, fillers)
+            with stage("write"):
+                writer.write_frame(chunk)
 
 
 def main():
@@ -128,11 +405,13 @@ If the attribute is nominal, the filling method is by the 'mode' of the attribut
 If the attribute is numeric, user can select between the 'mean' or the 'median' of the attribute.
 This program assumes that all data have equal weights of 1.
 
-Command line: --in=[csv_path] --out=[output_path] --attributes=[attribute_indices] --num_method=[mean|median] | --help
+Command line: --in=[csv_path] --out=[output_path] --attributes=[attribute_indices] --num_method=[mean|median] --median_error=[float] --chunksize=[integer] --out-format=[format] --fit=[params_path] | --transform=[params_path] | --help
     --in: Path to the input csv file for this program to check.
         For example: --in=a.csv, --in="a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
     --out: Path to the output csv file after the data has been filled.
         If not specified, the default will be "output.csv".
+        The extension is changed to the one of the output format.
         For example: --out=a.csv, --out="a b c.csv"
     --attributes: List of attribute indices to check, separated by comma, with no space inbetween.
         The "all" keyword can be used to specify all attributes by default.
@@ -140,10 +419,33 @@ Command line: --in=[csv_path] --out=[output_path] --attributes=[attribute_indice
     --num_method: Specify the filling method for numeric attributes.
         By default, the filling method is "mean".
         For example: --num_method=mean or --num_method=median
+    --median_error: Estimate the medians with a mergeable quantile sketch of this rank error instead of exactly.
+        The achieved rank error is printed. Only used with --num_method=median.
+        With --chunksize, medians are always estimated, by default with a rank error of 0.001.
+        For example: --median_error=0.001
+    --chunksize: Stream the file twice in chunks of this many rows instead of loading it whole.
+        The first pass finds the columns with missing data and computes the filling values,
+        the second pass fills the chunks and appends them to the output file.
+        The memory usage then depends on the chunk size and the number of distinct nominal values.
+        If the file has a valid cached profile (see column_profile.py), the first pass is skipped
+        and the modes and means are taken from it.
+        With --transform, the first pass only finds the numeric columns that have to be written as floats.
+        For example: --chunksize=100000
+    --out-format: Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy, see output_writer.py.
+        For example: --out-format=csv.gz:1
+    --fit: Save the filling values computed on this file to a parameter file,
+        to fill other files the same way with --transform.
+        For example: --fit=imputer.json
+    --transform: Fill with the values of a parameter file saved by --fit instead of computing them.
+        The attributes must be in the parameter file, "all" selects all of them.
+        For example: --transform=imputer.json
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A csv file identical to the input csv with all the missing data filled.
+    A csv file, or a file of the output format, identical to the input csv with all the missing data filled.
 """
     # Initialize a dictionary that specify the command line arguments
     spec = {
@@ -151,11 +453,16 @@ Output:
         "--out": "hold",
         "--attributes": "all",
         "--num_method": mean,
+        "--median_error": 0.0,
+        "--chunksize": 0,
+        "--out-format": "csv",
+        "--fit": str(),
+        "--transform": str(),
         "--help": help_msg
     }
 
     # Parse the command line arguments
-    if len(args) < 2 or len(args) > 5:
+    if len(args) < 2 or len(args) > 9:
         print(parse_error)
         return -1
     for arg in args[1:]:
@@ -177,14 +484,15 @@ Output:
             print(parse_error)
             return -1
         # If the flag has already been used
-        elif (flag == "--in" and len(specVal) != 0) or (flag == "--out" and specVal != "hold") or (flag == "--attributes" and specVal == "all"):
+        elif (flag == "--in" and len(specVal) != 0) or (flag == "--out" and specVal != "hold") or (flag == "--attributes" and specVal != "all"):
             print("Can't use a flag twice. Please try again")
             return -1
         elif flag == "--help":
             print(specVal)
             return 0
         elif flag == "--in" or flag == "--out":
-            if os.path.splitext(flagVal)[1] == ".csv":
+            # The input file can be compressed, see compressed_input.py
+            if os.path.splitext(decompressed_name(flagVal) if flag == "--in" else flagVal)[1] == ".csv":
                 spec[flag] = flagVal
         elif flag == "--attributes":
             if flagVal != "all":
@@ -195,6 +503,34 @@ Output:
                     print(
                         "Invalid attribute index values, please check the documentation using --help then try again.")
                     return -1
+        elif flag == "--fit" or flag == "--transform":
+            if len(specVal) != 0:
+                print("Can't use a flag twice. Please try again")
+                return -1
+            spec[flag] = flagVal
+        elif flag == "--chunksize":
+            try:
+                spec[flag] = int(flagVal)
+                if spec[flag] <= 0:
+                    raise ValueError
+            except ValueError:
+                print("The chunk size must be a positive integer.")
+                return -1
+        elif flag == "--out-format":
+            try:
+                parse_format(flagVal)
+            except ValueError as error:
+                print(str(error) + ". Please try again")
+                return -1
+            spec[flag] = flagVal
+        elif flag == "--median_error":
+            try:
+                spec[flag] = float(flagVal)
+                if spec[flag] <= 0 or spec[flag] >= 1:
+                    raise ValueError
+            except ValueError:
+                print("The median rank error must be a number in range (0,1).")
+                return -1
         elif flag == "--num_method":
             if flagVal == "median":
                 spec[flag] = median
@@ -211,25 +547,104 @@ Output:
         print("Invalid input file path. Please try again")
         return -1
 
-    # Read the data file and separate it into data and headers
-    df = pd.read_csv(spec["--in"])
+    if len(spec["--fit"]) != 0 and len(spec["--transform"]) != 0:
+        print("Can't use --fit and --transform together. Please try again")
+        return -1
 
-    # If attribute flag is specified as "all"
-    if spec["--attributes"] == "all":
-        spec["--attributes"] = [x[0]
-                                for x in list_missing_cols(df.to_numpy().tolist(), df.columns.tolist())]
+    if spec["--out"] == "hold":
+        spec["--out"] = "output_fill_missing_values_" + decompressed_name(spec["--in"])
+    spec["--out"] = output_path(spec["--out"], spec["--out-format"])
+
+    chunksize = spec["--chunksize"]
+    df = None
+    if chunksize == 0:
+        # Read the data file and separate it into data and headers
+        with stage("read"):
+            df = read_table(spec["--in"])
+        add_rows(len(df))
+        colnames = df.columns.tolist()
+    else:
+        colnames = read_csv(spec["--in"], nrows=0).columns.tolist()
 
-    # Fill in the missing values
-    df = fill_missing_values(df, spec["--attributes"], spec["--num_method"])
+    if spec["--attributes"] != "all" and any(i < 0 or i >= len(colnames) for i in spec["--attributes"]):
+        print("Invalid attribute index values, please check the documentation using --help then try again.")
+        return -1
 
-    if spec["--out"] == "hold":
-        spec["--out"] = "output_fill_missing_values_" + os.path.basename(spec["--in"])
+    if len(spec["--transform"]) != 0:
+        # The filling values were fitted on another file
+        try:
+            fitted = load_params(spec["--transform"], "fill_missing_values")
+        except (OSError, ValueError) as error:
+            print("Invalid parameter file: " + str(error))
+            return -1
+        if spec["--attributes"] == "all":
+            names = [name for name in fitted if name in colnames]
+        else:
+            names = [colnames[i] for i in spec["--attributes"]]
+        if any(name not in fitted for name in names):
+            print("Some attributes are not in the parameter file. Please try again")
+            return -1
+        fillers = {name: fitted[name]["filler"] for name in names}
+        if chunksize > 0:
+            floatCols = float_columns(spec["--in"], chunksize)
+            floatCols |= {name for name, filler in fillers.items() if isinstance(filler, float)}
+    else:
+        # Estimate the medians with a sketch if a rank error is given, or if the file is streamed
+        reports = []
+        useMedian = spec["--num_method"] == median
+        if useMedian and (spec["--median_error"] > 0 or chunksize > 0):
+            spec["--num_method"] = sketch_median(spec["--median_error"] or MEDIAN_ERROR, reports)
+
+        # The cached profile of the file knows the missing columns, the modes and the means
+        profile = load_profile(spec["--in"])
+        if chunksize == 0:
+            # If attribute flag is specified as "all"
+            if spec["--attributes"] == "all" and profile is not None:
+                spec["--attributes"] = [i for i, column in enumerate(profile["columns"]) if column["missing"] > 0]
+            elif spec["--attributes"] == "all":
+                with stage("statistics"):
+                    spec["--attributes"] = [x[0]
+                                            for x in list_missing_cols(df, colnames)]
+            fillers = compute_fillers(df, spec["--attributes"], spec["--num_method"])
+        else:
+            cached = None
+            if profile is not None and not useMedian:
+                cached = profile_fillers(profile, spec["--attributes"])
+            if cached is not None:
+                fillers, floatCols = cached
+            else:
+                # First pass: find the missing columns and accumulate their statistics
+                try:
+                    fillers, floatCols = scan_fillers(spec["--in"], chunksize, spec["--attributes"],
+                                                      useMedian, spec["--median_error"] or MEDIAN_ERROR, reports)
+                except TypeError as error:
+                    print("Attribute " + str(error) + " mixes numeric and nominal values, please fill it without --chunksize.")
+                    return -1
 
-    # Output the dataframe to csv
-    df.to_csv(spec["--out"], index=False)
+        if len(reports) > 0:
+            print("Achieved median rank error:", max(reports))
+
+        if len(spec["--fit"]) != 0:
+            save_params(spec["--fit"], "fill_missing_values",
+                        {name: {"filler": filler} for name, filler in fillers.items()})
+
+    try:
+        if chunksize == 0:
+            # Fill in the missing values
+            df = apply_fillers(df, fillers)
+
+            # Output the dataframe in the output format
+            with stage("write"):
+                write_table(df, spec["--out"], spec["--out-format"])
+        else:
+            # Second pass: fill the chunks and append them to the output
+            fill_chunks(spec["--in"], spec["--out"], chunksize, fillers, floatCols, spec["--out-format"])
+    except FormatError as error:
+        print("Can't export to " + spec["--out"] + ". " + str(error))
+        return -1
 
     return 0
 
 
 if __name__ == "__main__":
-    main()
+    instrumented(main)
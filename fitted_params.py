@@ -0,0 +1,61 @@
+"""This module saves and loads the parameters fitted by a program on a reference csv file,
+so that other files can be transformed with the same parameters without computing them again.
+
+The parameters are stored per column in a small versioned JSON file:
+    {
+        "format_version": 1,
+        "tool": "feature_scaling",
+        "columns": {"LotArea": {...}, ...}
+    }
+"""
+
+import json
+
+FORMAT_VERSION = 1
+
+
+def to_builtin(value):
+    """Convert NumPy scalars to plain Python values so they can be written as JSON."""
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def save_params(path: str, tool: str, columns: 'dict'):
+    """Save the fitted parameters of each column.
+
+    Args:
+        path (str): Path to the parameter file to write
+        tool (str): Name of the program that fitted the parameters
+        columns (dict): The parameters of each column, as a dict of plain values
+    """
+    content = {
+        "format_version": FORMAT_VERSION,
+        "tool": tool,
+        "columns": {name: {key: to_builtin(value) for key, value in params.items()}
+                    for name, params in columns.items()},
+    }
+    with open(path, "w") as file:
+        json.dump(content, file, indent=4)
+
+
+def load_params(path: str, tool: str) -> 'dict':
+    """Load the fitted parameters of each column.
+
+    Args:
+        path (str): Path to the parameter file
+        tool (str): Name of the program that expects the parameters
+
+    Returns:
+        dict: The parameters of each column
+
+    Raises:
+        ValueError: If the file is not a parameter file of this tool or has an unsupported version
+    """
+    with open(path) as file:
+        content = json.load(file)
+    if not isinstance(content, dict) or content.get("format_version") != FORMAT_VERSION:
+        raise ValueError("Unsupported parameter file version in " + path)
+    if content.get("tool") != tool:
+        raise ValueError(path + " holds parameters of " + str(content.get("tool")) + ", not " + tool)
+    return content["columns"]
@@ -1,17 +1,39 @@
 """This program lists out the columns that have missing data in a csv file.
 The csv file should be comma-separated.
+The file is streamed once in chunks to compute its column profile, which is cached
+so that the next programs run on the same file answer without reading it again (see column_profile.py).
 
-Command line: [csv_path] | --help
+Command line: [csv_path] --chunksize=[integer] --workers=[integer] | --help
     csv_path: Path to the csv file for this program to check
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
+    --chunksize: Optional. The number of rows read at a time when the file is profiled.
+        The default value is 100000.
+        For example: --chunksize=10000
+    --workers: Optional. Count the missing data with this many processes, each reading a part of the file,
+        instead of profiling the file. A valid cached profile is still used.
+        For example: --workers=8
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A list of columns that have missing data
+    A list of columns that have missing data, with the number of missing cells of each column
 """
 
 import sys
 import os
+import numpy as np
 import pandas as pd
+from missing_mask import missing_mask, missing_cols
+from column_profile import get_profile, load_profile, CHUNKSIZE
+from parallel_csv import count_missing_parallel
+from run_metrics import instrumented, stage, add_rows
+from compressed_input import is_compressed
+
+# The counts of the last successful run, aggregated by batch.py over many files
+summary = None
 
 
 def isNaN(value):
@@ -21,13 +43,13 @@ def isNaN(value):
         value: A data value or data cell in data frame
 
     Returns:
-        True: If the value is NaN or none
+        True: If the value is NaN, none or an empty string
         False: If the value is available
     """
-    return value != value or value is None
+    return value != value or value is None or value == ''
 
 
-def list_missing_cols(data: 'list[list]', colnames: 'list[str] | None') -> 'list[tuple]':
+def list_missing_cols(data: 'pd.DataFrame | list[list]', colnames: 'list[str] | None') -> 'list[tuple]':
     """List out columns with missing data
 
     Returns:
@@ -36,21 +58,19 @@ def list_missing_cols(data: 'list[list]', colnames: 'list[str] | None') -> 'list
     # Result is a list of tuple of column index - column name
     result: list[tuple] = []
 
-    # Iterate through each column
-    for col_index in range(len(data[0])):
-        # Iterate through each element in column
-        for row_index in range(len(data)):
-            if isNaN(data[row_index][col_index]):
-                if colnames is not None:
-                    result.append((col_index, colnames[col_index]))
-                else:
-                    result.append((col_index, ""))
-                break
+    # Build the missing mask once and reduce it along the rows
+    for col_index in missing_cols(missing_mask(data)):
+        col_index = int(col_index)
+        if colnames is not None:
+            result.append((col_index, colnames[col_index]))
+        else:
+            result.append((col_index, ""))
 
     return result
 
 
 def main():
+    global summary
     args = sys.argv
     filepath = args[1]
 
@@ -59,13 +79,26 @@ def main():
         print("""
 This program lists out the columns that have missing data in a csv file.
 The csv file should be comma-separated.
+The file is streamed once in chunks to compute its column profile, which is cached
+so that the next programs run on the same file answer without reading it again (see column_profile.py).
 
-Command line: [csv_path] | --help
+Command line: [csv_path] --chunksize=[integer] --workers=[integer] | --help
     csv_path: Path to the csv file for this program to check
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        A compressed file is read in a single process, without --workers.
+    --chunksize: Optional. The number of rows read at a time when the file is profiled.
+        The default value is 100000.
+        For example: --chunksize=10000
+    --workers: Optional. Count the missing data with this many processes, each reading a part of the file,
+        instead of profiling the file. A valid cached profile is still used.
+        For example: --workers=8
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
-    A list of columns that have missing data
+    A list of columns that have missing data, with the number of missing cells of each column
 """)
         return 0
 
@@ -73,24 +106,54 @@ Output:
     if not os.path.exists(filepath):
         print("Invalid file path: " + filepath + " - Please try again")
         return -1
-    df = pd.read_csv(filepath)
-
-    # Get column names and dataset sizes
-    colnames = df.columns.tolist()
-    mat = df.to_numpy().tolist()
 
-    result = list_missing_cols(mat, colnames)
+    # Parse the optional chunk size and number of workers
+    chunksize = None
+    workers = None
+    for arg in args[2:]:
+        flag, _, value = arg.partition("=")
+        if flag not in ("--chunksize", "--workers"):
+            print("Invalid command line arguments. Please use \"--help\" flag to see the documentation.")
+            return -1
+        try:
+            if int(value) <= 0:
+                raise ValueError
+        except ValueError:
+            print("The chunk size must be a positive integer." if flag == "--chunksize" else
+                  "The number of workers must be a positive integer.")
+            return -1
+        if flag == "--chunksize":
+            chunksize = int(value)
+        else:
+            workers = int(value)
+
+    # A compressed file can only be read in order, so it is profiled instead of counted in parallel
+    if is_compressed(filepath):
+        workers = None
+
+    # Answer from the cached profile of the file, profiling it in one streaming pass if needed,
+    # or count in parallel if there is no cached profile and several workers are asked
+    with stage("statistics"):
+        profile = load_profile(filepath) if workers is not None else get_profile(filepath, chunksize or CHUNKSIZE)
+        if profile is None:
+            colnames, colCounts, _, _ = count_missing_parallel(filepath, workers)
+        else:
+            colnames = [column["name"] for column in profile["columns"]]
+            colCounts = np.array([column["missing"] for column in profile["columns"]], dtype=np.int64)
+            add_rows(profile["rows"])
 
     # Print the result to the console
-    if (len(result) == 0):
+    if not colCounts.any():
         print("No column has missing data!")
     else:
-        print("Columns with missing data (index - name):")
-        for col in result:
-            print(col[0], '-', col[1])
+        print("Columns with missing data (index - name - missing count):")
+        for col_index in range(len(colnames)):
+            if colCounts[col_index] > 0:
+                print(col_index, '-', colnames[col_index], '-', colCounts[col_index])
+    summary = {"missing": dict(zip(colnames, colCounts.tolist()))}
 
     return 0
 
 
 if __name__ == "__main__":
-    main()
+    instrumented(main)
@@ -0,0 +1,58 @@
+"""This module builds the boolean missing-data mask of a data table.
+It is shared by the programs that need to know where the missing data cells are,
+so the table is scanned only once and every question is answered by reducing the mask.
+
+A data cell is considered missing if it is NaN, None or an empty string.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def missing_mask(data: 'pd.DataFrame | list[list]') -> 'np.ndarray':
+    """Build a boolean mask of the missing data cells in a table.
+
+    Args:
+        data (pandas.DataFrame | list[list]): The data table, either as a data frame or as a 2D list
+
+    Returns:
+        numpy.ndarray: A 2D boolean array with the same shape as the table, True where the cell is missing
+    """
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(data)
+
+    # NaN and None are detected by pandas in a single vectorized pass
+    mask = data.isna().to_numpy()
+
+    # Empty strings can only appear in non-numeric columns
+    for col_index in range(data.shape[1]):
+        column = data.iloc[:, col_index]
+        if not pd.api.types.is_numeric_dtype(column.dtype):
+            mask[:, col_index] |= (column == '').to_numpy(dtype=bool, na_value=False)
+
+    return mask
+
+
+def missing_cols(mask: 'np.ndarray') -> 'np.ndarray':
+    """Get the indices of the columns that have at least one missing data cell.
+
+    Args:
+        mask (numpy.ndarray): The missing data mask, see missing_mask
+
+    Returns:
+        numpy.ndarray: Ascending column indices
+    """
+    return np.flatnonzero(mask.any(axis=0))
+
+
+def missing_per_row(mask: 'np.ndarray') -> 'np.ndarray':
+    """Count the number of missing data cells in each row.
+
+    Args:
+        mask (numpy.ndarray): The missing data mask, see missing_mask
+
+    Returns:
+        numpy.ndarray: The number of missing cells of each row
+    """
+    return mask.sum(axis=1)
+
@@ -0,0 +1,251 @@
+"""This module writes the output tables of the programs in the format chosen with --out-format:
+    csv: plain csv text, as before (default)
+    csv.gz: csv text compressed with gzip while it is written, with an optional compression level
+        from 1 (fastest) to 9 (smallest) after a colon, by default 6. For example: csv.gz:1
+    parquet, feather: columnar files, which need the optional pyarrow package.
+        The columns must keep their type from one chunk to the next.
+    npy: a 2D float64 NumPy array, missing values are NaN. Only for outputs whose columns are all numeric,
+        the column names are not kept.
+
+The output is written in parts, so the streaming programs never hold the whole table:
+data frames, rows of text values (batched by BUFFER_ROWS instead of written one at a time)
+or csv text. Rows and csv text written to a columnar file or array are read back as text,
+with empty fields as missing values.
+
+Only the standard library is imported until a data frame or a non-csv format is written,
+so the programs that don't need pandas don't import it.
+"""
+
+import io
+import os
+import csv
+import gzip
+import struct
+import importlib.util
+
+# Default gzip compression level of csv.gz outputs
+GZIP_LEVEL = 6
+
+# Number of rows written at a time by write_row
+BUFFER_ROWS = 10000
+
+# Size of the buffer of the output file, in bytes
+BUFFER_BYTES = 1024 * 1024
+
+# File extension of each format
+FORMATS = {"csv": ".csv", "csv.gz": ".csv.gz", "parquet": ".parquet", "feather": ".feather", "npy": ".npy"}
+
+# Size of the header of npy outputs, reserved before the number of rows is known
+NPY_HEADER_BYTES = 128
+
+
+class FormatError(ValueError):
+    """Raised when a table can't be written in the chosen format, for example text columns in npy."""
+
+
+def parse_format(value: str) -> 'tuple[str, int]':
+    """Parse the value of the --out-format option.
+
+    Args:
+        value (str): The format, with an optional compression level for csv.gz, for example "csv.gz:9"
+
+    Returns:
+        tuple: The format name and the gzip compression level
+
+    Raises:
+        ValueError: If the format is unknown, the level is invalid or pyarrow is needed but not installed
+    """
+    name, _, level = value.partition(":")
+    if name not in FORMATS:
+        raise ValueError("Unknown output format " + value + ", expected one of " + ", ".join(FORMATS))
+    if len(level) > 0:
+        if name != "csv.gz" or not level.isdigit() or not 1 <= int(level) <= 9:
+            raise ValueError("The compression level must be an integer from 1 to 9, only for csv.gz")
+    if name in ("parquet", "feather") and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("The " + name + " format needs the pyarrow package")
+    return name, int(level) if len(level) > 0 else GZIP_LEVEL
+
+
+def output_path(path: str, out_format: str) -> str:
+    """Get the path of an output file in a format, replacing its .csv extension by the one of the format.
+    csv outputs keep their path.
+    """
+    name = parse_format(out_format)[0]
+    if name == "csv":
+        return path
+    if path.endswith(".csv"):
+        path = path[:-len(".csv")]
+    return path + FORMATS[name]
+
+
+class TableWriter:
+    """
+    This class writes a table to an output file in parts, in one of the formats of the module.
+    It is used as a context manager, or closed with close() to finish the file.
+    """
+
+    def __init__(self, path: str, out_format: str = "csv"):
+        self.path = path
+        self.format, self.level = parse_format(out_format)
+        self.columns = None
+        self.rows = []
+        self.writer = None
+        if self.format == "csv":
+            self.file = open(path, "w", newline="", buffering=BUFFER_BYTES)
+        elif self.format == "csv.gz":
+            self.file = gzip.open(path, "wt", compresslevel=self.level, newline="")
+        else:
+            self.file = open(path, "wb")
+        if self.format == "npy":
+            self.count = 0
+            self.file.write(bytes(NPY_HEADER_BYTES))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write_frame(self, df: 'pd.DataFrame'):
+        """Write the rows of a data frame. The first one gives the header of the table."""
+        self.flush()
+        first = self.columns is None
+        if first:
+            self.columns = [str(name) for name in df.columns]
+        if self.format in ("csv", "csv.gz"):
+            df.to_csv(self.file, index=False, header=first)
+        elif self.format == "npy":
+            self.write_array(df)
+        else:
+            self.write_arrow(df)
+
+    def write_header(self, header: 'list[str]'):
+        """Write the header of a table whose rows are written with write_row, write_rows or write_text."""
+        self.columns = [str(name) for name in header]
+        if self.format in ("csv", "csv.gz"):
+            self.csv_writer().writerow(header)
+
+    def write_row(self, row: 'list[str]'):
+        """Write a row of text values. The rows are buffered and written BUFFER_ROWS at a time."""
+        self.rows.append(row)
+        if len(self.rows) >= BUFFER_ROWS:
+            self.flush()
+
+    def write_rows(self, rows):
+        """Write rows of text values, see write_row."""
+        for row in rows:
+            self.write_row(row)
+
+    def write_text(self, text: str):
+        """Write csv records, without the header."""
+        self.flush()
+        if self.format in ("csv", "csv.gz"):
+            self.file.write(text)
+        else:
+            self.rows = list(csv.reader(io.StringIO(text, newline="")))
+            self.flush()
+
+    def flush(self):
+        """Write the buffered rows."""
+        if len(self.rows) == 0:
+            return
+        rows = self.rows
+        self.rows = []
+        if self.format in ("csv", "csv.gz"):
+            self.csv_writer().writerows(rows)
+            return
+        import pandas as pd
+        # The values are text, empty fields are missing values
+        width = len(self.columns)
+        df = pd.DataFrame([[value if value != "" else None for value in row[:width]] + [None] * (width - len(row))
+                           for row in rows], columns=self.columns, dtype=object)
+        if self.format == "npy":
+            self.write_array(df)
+        else:
+            self.write_arrow(df)
+
+    def csv_writer(self):
+        if self.writer is None:
+            self.writer = csv.writer(self.file)
+        return self.writer
+
+    def write_array(self, df: 'pd.DataFrame'):
+        import numpy as np
+        import pandas as pd
+        values = np.empty((len(df), len(df.columns)), dtype="<f8")
+        for colIndex in range(len(df.columns)):
+            try:
+                values[:, colIndex] = pd.to_numeric(df.iloc[:, colIndex]).to_numpy(dtype=float, na_value=np.nan)
+            except (ValueError, TypeError):
+                raise FormatError("The npy format needs numeric columns, but " + str(df.columns[colIndex])
+                                 + " is not numeric")
+        self.file.write(values.tobytes())
+        self.count += len(df)
+
+    def write_arrow(self, df: 'pd.DataFrame'):
+        import pyarrow
+        from table_schema import widen
+        # Compact columns are written with their default types, which every part of the table fits in
+        df = widen(df)
+        if self.writer is None:
+            schema = pyarrow.Schema.from_pandas(df, preserve_index=False)
+            # A column without any value in the first part is typed as text
+            for index, field in enumerate(schema):
+                if pyarrow.types.is_null(field.type):
+                    schema = schema.set(index, pyarrow.field(field.name, pyarrow.string()))
+            if self.format == "parquet":
+                import pyarrow.parquet
+                self.writer = pyarrow.parquet.ParquetWriter(self.file, schema)
+            else:
+                # Feather version 2 is the Arrow IPC file format
+                self.writer = pyarrow.ipc.new_file(self.file, schema)
+        table = pyarrow.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        """Write the buffered rows and finish the file."""
+        if self.file is None:
+            return
+        try:
+            self.flush()
+        except BaseException:
+            self.discard()
+            raise
+        try:
+            if self.format in ("parquet", "feather"):
+                if self.writer is None:
+                    # A table without rows still has its columns
+                    import pandas as pd
+                    self.write_arrow(pd.DataFrame({name: pd.Series([], dtype=object) for name in self.columns or []}))
+                self.writer.close()
+            elif self.format == "npy":
+                self.file.seek(0)
+                self.file.write(npy_header(self.count, len(self.columns or [])))
+        finally:
+            self.file.close()
+            self.file = None
+
+    def discard(self):
+        """Close and remove an output file that couldn't be written whole."""
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        os.remove(self.path)
+
+
+def npy_header(rows: int, columns: int) -> bytes:
+    """Build the header of a 2D float64 npy file of version 1.0, padded to NPY_HEADER_BYTES."""
+    header = repr({"descr": "<f8", "fortran_order": False, "shape": (rows, columns)})
+    size = NPY_HEADER_BYTES - len(b"\x93NUMPY") - 4
+    header = header.ljust(size - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", size) + header.encode("latin1")
+
+
+def write_table(df: 'pd.DataFrame', path: str, out_format: str = "csv"):
+    """Write a whole data frame to an output file, see TableWriter."""
+    with TableWriter(path, out_format) as writer:
+        writer.write_frame(df)
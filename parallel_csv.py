@@ -0,0 +1,205 @@
+"""This module processes a large csv file in parallel, by splitting it into byte ranges
+that are handled by a pool of worker processes.
+
+The ranges are aligned to record boundaries: a range only starts right after a newline
+that is outside of any quoted field, so records with quoted newlines are never cut.
+Whether a newline is quoted is known from the parity of the number of quotes before it
+(an escaped quote "" counts twice). The quotes of every block of the file are counted in parallel,
+and a prefix sum of the counts gives the parity at the start of each block.
+
+Every range is parsed on its own with the header of the file, and the partial results
+(counters, kept rows, ...) are given back in the original order of the ranges,
+so they can be merged or written as if the file was read sequentially.
+"""
+
+import io
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from missing_mask import missing_mask
+from run_metrics import add_rows
+
+# Approximate size of a range. Each worker holds about one range in memory
+RANGE_BYTES = 64 * 1024 * 1024
+
+# Size of the blocks scanned by the workers while looking for the record boundaries
+BLOCKSIZE = 16 * 1024 * 1024
+
+
+def scan_block(path: str, start: int, end: int, offsets: 'list[int]') -> 'tuple[int, list[tuple]]':
+    """Count the quotes of a block of a csv file and find the candidate record boundaries after some offsets.
+    Whether a newline is quoted depends on the parity of the quotes before the block, which is not known yet,
+    so the first newline after an offset is found for both parities.
+
+    Args:
+        path (str): Path to the csv file
+        start (int): Byte offset of the block
+        end (int): Byte offset of the end of the block
+        offsets (list[int]): Ascending offsets in the block, relative to its start
+
+    Returns:
+        tuple: The number of quotes of the block, and for each offset the position of the first newline after it
+            that is unquoted if an even and if an odd number of quotes come before the block (None if there is none)
+    """
+    block = read_range(path, start, end)
+    candidates = []
+    quotes = 0
+    counted = 0
+    for offset in offsets:
+        quotes += block.count(b'"', counted, offset)
+        counted = offset
+        found = [None, None]
+        position = offset
+        parity = quotes
+        while True:
+            newline = block.find(b"\n", position)
+            if newline == -1:
+                break
+            parity += block.count(b'"', position, newline)
+            # the newline is unquoted if the quotes before the block have the same parity as the ones in it
+            if found[parity % 2] is None:
+                found[parity % 2] = newline
+                if None not in found:
+                    break
+            # the newlines before the next quote have the same parity
+            position = block.find(b'"', newline)
+            if position == -1:
+                break
+            parity += block.count(b'"', newline, position)
+        candidates.append(tuple(found))
+    quotes += block.count(b'"', counted)
+    return quotes, candidates
+
+
+def record_boundaries(path: str, step: int = RANGE_BYTES, pool: 'Executor | None' = None) -> 'list[int]':
+    """Find record boundaries about every step bytes of a csv file.
+    The file is scanned in blocks, in parallel if a pool is given: each block is scanned on its own
+    (see scan_block), then the parity of the quotes before each block is found by a prefix sum
+    of the quote counts of the blocks, which tells which newlines are unquoted.
+
+    Args:
+        path (str): Path to the csv file
+        step (int): Approximate number of bytes between two boundaries
+        pool (concurrent.futures.Executor | None): Pool that scans the blocks, they are scanned in this process if None
+
+    Returns:
+        list[int]: Ascending byte offsets, starting with the end of the header and ending with the file size
+    """
+    size = os.path.getsize(path)
+    starts = list(range(0, size, BLOCKSIZE)) or [0]
+    ends = starts[1:] + [size]
+    # The first target is the end of the header, the next ones are about every step bytes.
+    # The start of every block is also scanned, for the records that go on from the previous block
+    targets = [[0] for _ in starts]
+    for target in range(step, size, step):
+        if target % BLOCKSIZE != 0:
+            targets[target // BLOCKSIZE].append(target % BLOCKSIZE)
+    scans = list((pool.map if pool is not None else map)(scan_block, [path] * len(starts), starts, ends, targets))
+
+    parities = []
+    quotes = 0
+    for blockQuotes, _ in scans:
+        parities.append(quotes % 2)
+        quotes += blockQuotes
+
+    boundaries = []
+    for index, offsets in enumerate(targets):
+        for position, offset in enumerate(offsets):
+            if (starts[index] + offset) % step != 0:
+                # the start of the block is only scanned for the records of the previous blocks
+                continue
+            block = index
+            newline = scans[block][1][position][parities[block]]
+            # A record that goes on after the block ends at the first unquoted newline of a next block
+            while newline is None and block + 1 < len(starts):
+                block += 1
+                newline = scans[block][1][0][parities[block]]
+            boundary = size if newline is None else starts[block] + newline + 1
+            if len(boundaries) == 0 or boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    if len(boundaries) == 0 or boundaries[-1] != size:
+        boundaries.append(size)
+    return boundaries
+
+
+def read_range(path: str, start: int, end: int) -> bytes:
+    """Read the bytes of a range of a file."""
+    with open(path, "rb") as file:
+        file.seek(start)
+        return file.read(end - start)
+
+
+def range_frame(header: bytes, data: bytes, **options) -> 'pd.DataFrame':
+    """Parse the records of a range with the header of the file.
+
+    Args:
+        header (bytes): The header record of the file
+        data (bytes): The records of the range
+        **options: Options of pandas.read_csv
+
+    Returns:
+        pandas.DataFrame: The records of the range
+    """
+    return pd.read_csv(io.BytesIO(header + data), **options)
+
+
+def count_missing_range(path: str, header: bytes, start: int, end: int) -> 'tuple[np.ndarray, int, int]':
+    """Count the missing data of a range of a csv file, see missing_mask.py.
+
+    Returns:
+        tuple: The number of missing cells of each column, the number of rows with missing data
+            and the number of rows
+    """
+    mask = missing_mask(range_frame(header, read_range(path, start, end)))
+    return mask.sum(axis=0), int(mask.any(axis=1).sum()), len(mask)
+
+
+def map_ranges(path: str, task, workers: int, step: int = RANGE_BYTES):
+    """Run a task on every range of a csv file in a pool of processes.
+    At most two ranges per worker are in flight, so the memory stays bounded
+    even if the results are consumed slower than they are produced.
+
+    Args:
+        path (str): Path to the csv file
+        task (callable): Picklable function taking (path, header, start, end) and returning the partial result
+        workers (int): Number of worker processes
+        step (int): Approximate number of bytes of each range
+
+    Yields:
+        The partial result of each range, in the order of the ranges in the file
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        boundaries = record_boundaries(path, step, pool)
+        header = read_range(path, 0, boundaries[0])
+        ranges = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+        # A file without data records is processed as a single empty range
+        if len(ranges) == 0:
+            ranges = [(boundaries[0], boundaries[0])]
+        pending = []
+        for start, end in ranges:
+            pending.append(pool.submit(task, path, header, start, end))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def count_missing_parallel(path: str, workers: int, step: int = RANGE_BYTES) -> 'tuple[list, np.ndarray, int, int]':
+    """Count the missing data of a csv file in parallel, see missing_mask.py.
+
+    Returns:
+        tuple: The column names, the number of missing cells of each column,
+            the number of rows with missing data and the number of rows
+    """
+    colnames = pd.read_csv(path, nrows=0).columns.tolist()
+    colCounts = np.zeros(len(colnames), dtype=np.int64)
+    rowCount = 0
+    rowTotal = 0
+    for counts, rows, total in map_ranges(path, count_missing_range, workers, step):
+        colCounts += counts
+        rowCount += rows
+        rowTotal += total
+        add_rows(total)
+    return colnames, colCounts, rowCount, rowTotal
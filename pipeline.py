@@ -0,0 +1,188 @@
+"""
+This program runs a sequence of preprocessing steps on a csv file in a single process.
+The input file is parsed once, the table is passed in memory from one step to the next
+and only the final result is written. The time spent in each stage is printed.
+
+Command line: [spec_path] | --help
+    spec_path: Path to the pipeline specification, in JSON (.json) or YAML (.yaml, .yml) format.
+        YAML specifications require the PyYAML package.
+        For example: nightly.json
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
+    --help: See this documentation
+
+Specification:
+    input: Path to the input csv file.
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+    output: Path to the output csv file.
+        If not specified, the default will be "output_pipeline_" + input_file_name.
+    output_format: Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+    steps: The ordered list of steps. Each step is a mapping with a "step" name and its parameters:
+        drop_duplicates: subset (a list of column names, default all columns),
+            keep ("first", "last" or "none", default "first")
+        drop_missing_data_cols: percentage (in range [0, 1])
+        drop_missing_data_rows: percent (integer in range [0, 100], default 0)
+        fill_missing_values: attributes ("all" or a list of attribute indices, default "all"),
+            num_method ("mean" or "median", default "mean")
+        feature_scaling: attribute, include ("zscore", "minmaxscale" or "all")
+        solve_equation: equation, name (the result column name, default is the equation itself)
+            or expressions (a mapping of result column names to equations, computed together,
+            where an equation can use the names of the previous ones)
+    The steps are the functions of preprocessing.py, which work on the values of the table:
+    drop_duplicates and drop_missing_data_cols can differ from the programs of the same name,
+    which work on the text of the csv fields, on "NA", "NULL", ... fields and on numbers written
+    differently, such as 1 and 1.0.
+
+    For example:
+        {
+            "input": "house-prices.csv",
+            "output": "clean.csv",
+            "steps": [
+                {"step": "drop_duplicates"},
+                {"step": "drop_missing_data_cols", "percentage": 0.5},
+                {"step": "fill_missing_values", "num_method": "median"},
+                {"step": "solve_equation", "equation": "LotArea*2", "name": "DoubleLotArea"}
+            ]
+        }
+
+Output:
+    A csv file, or a file of the output format, with the result of the last step, and the timing of each stage printed to the console.
+"""
+
+import sys
+import os
+import json
+import time
+import pandas as pd
+import preprocessing
+from columnar_cache import read_table
+from run_metrics import instrumented, stage, add_rows
+from compressed_input import decompressed_name
+from output_writer import FormatError, output_path, parse_format, write_table
+
+
+# Map each step name of the specification to its function
+STEPS = {
+    "drop_duplicates": preprocessing.drop_duplicates,
+    "drop_missing_data_cols": preprocessing.drop_missing_data_cols,
+    "drop_missing_data_rows": preprocessing.drop_missing_data_rows,
+    "fill_missing_values": preprocessing.fill_missing_values,
+    "feature_scaling": preprocessing.feature_scaling,
+    "solve_equation": preprocessing.solve_equation,
+}
+
+
+def load_spec(path: str) -> 'dict':
+    """Load a pipeline specification from a JSON or YAML file.
+
+    Args:
+        path (str): Path to the specification file
+
+    Returns:
+        dict: The specification
+    """
+    with open(path) as file:
+        if os.path.splitext(path)[1] in (".yaml", ".yml"):
+            # PyYAML is only needed for YAML specifications
+            import yaml
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+def run_steps(df: 'pd.DataFrame', steps: 'list[dict]', timings: 'list[tuple]') -> 'pd.DataFrame':
+    """Run the steps of a pipeline in order on an in-memory data frame.
+
+    Args:
+        df (pandas.DataFrame): The input data frame
+        steps (list[dict]): The steps of the specification
+        timings (list[tuple]): List to which the (stage name, seconds) of each step is appended
+
+    Returns:
+        pandas.DataFrame: The data frame after the last step
+    """
+    for index, step in enumerate(steps):
+        params = dict(step)
+        name = params.pop("step", None)
+        if name not in STEPS:
+            raise ValueError("Unknown step: " + str(name))
+        start = time.perf_counter()
+        with stage("transform"):
+            df = STEPS[name](df, **params)
+        timings.append((str(index + 1) + ". " + name, time.perf_counter() - start))
+    return df
+
+
+def main():
+    args = sys.argv
+    parse_error = "Invalid command line arguments. Please use \"--help\" flag to see the documentation."
+
+    if len(args) != 2:
+        print(parse_error)
+        return -1
+
+    # Print the documentation of this file if the user ask for help
+    if args[1] == "--help":
+        print(__doc__)
+        return 0
+
+    if not os.path.exists(args[1]):
+        print("Invalid specification file path: " + args[1] + " - Please try again")
+        return -1
+    try:
+        spec = load_spec(args[1])
+    except ImportError:
+        print("YAML specifications require the PyYAML package. Please use a JSON specification instead.")
+        return -1
+    except ValueError as error:
+        print("Invalid specification file: " + str(error))
+        return -1
+
+    inputpath = spec.get("input", "")
+    if not os.path.exists(inputpath):
+        print("Invalid input file path. Please try again")
+        return -1
+    outFormat = str(spec.get("output_format", "csv"))
+    try:
+        parse_format(outFormat)
+    except ValueError as error:
+        print("Invalid output format in the specification: " + str(error))
+        return -1
+    outputpath = output_path(spec.get("output", "output_pipeline_" + decompressed_name(inputpath)), outFormat)
+
+    timings = []
+
+    # Parse the input once
+    start = time.perf_counter()
+    with stage("read"):
+        df = read_table(inputpath)
+    timings.append(("read", time.perf_counter() - start))
+    add_rows(len(df))
+
+    try:
+        df = run_steps(df, spec.get("steps", []), timings)
+    except (ValueError, TypeError, KeyError) as error:
+        print("Invalid step in the specification: " + str(error))
+        return -1
+
+    # Write only the final result
+    start = time.perf_counter()
+    try:
+        with stage("write"):
+            write_table(df, outputpath, outFormat)
+    except FormatError as error:
+        print("Can't export to " + outputpath + ". " + str(error))
+        return -1
+    timings.append(("write", time.perf_counter() - start))
+
+    for name, seconds in timings:
+        print("{:<32} {:10.4f} s".format(name, seconds))
+    print("{:<32} {:10.4f} s".format("total", sum(t[1] for t in timings)))
+    print('EXPORTED TO ' + outputpath)
+
+    return 0
+
+
+if __name__ == "__main__":
+    instrumented(main)
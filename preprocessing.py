@@ -0,0 +1,165 @@
+"""This module exposes every preprocessing operation as a function on an in-memory table,
+so they can be called in-process without writing csv files.
+
+The tables can be pandas data frames, NumPy arrays or Arrow tables, and every function
+returns a table of the same type as its input:
+    - a data frame is used as is
+    - a 2D array becomes a data frame without copying, with columns named "0", "1", ...
+      (refer to them in equations with backticks, for example `0` + `1`),
+      a structured array becomes a data frame with the names of its fields
+    - an Arrow table (pyarrow.Table) is converted to a data frame and back, which only copies
+      the columns that Arrow can't share with NumPy. This needs the optional pyarrow package.
+The input table is never modified: the result shares the unchanged columns with it.
+
+The functions are also the steps of pipeline.py, with the same parameters as in a pipeline specification.
+
+The functions work on the values of the table, while drop_duplicates.py and drop_missing_data_cols.py
+work on the text of the csv fields, so on a table read with the defaults of pandas.read_csv they differ:
+    - drop_missing_data_cols counts the missing cells of missing_mask.py, which include the "NA", "NULL", ...
+      fields that pandas reads as NaN, while drop_missing_data_cols.py only counts the empty fields
+    - drop_duplicates compares the values, so 1 and 1.0 in a float column are duplicates,
+      while drop_duplicates.py compares the text of the fields
+Both give the same rows and columns as the programs on a table read with
+pandas.read_csv(path, dtype=str, keep_default_na=False).
+"""
+
+import numpy as np
+import pandas as pd
+from missing_mask import missing_mask, missing_cols
+from drop_missing_data_rows import drop_missing_rows
+from fill_missing_values import compute_fillers, apply_fillers, mean, median
+from feature_scaling import scale_column
+from solve_equation import solve_equation as solve, solve_equations
+
+
+def is_arrow(data) -> bool:
+    """Tell whether a table is an Arrow table, without importing pyarrow."""
+    return type(data).__module__.split(".")[0] == "pyarrow" and hasattr(data, "to_pandas")
+
+
+def to_frame(data) -> 'pd.DataFrame':
+    """Get a table as a data frame, without copying it when possible, see the module documentation.
+
+    Args:
+        data (pandas.DataFrame | numpy.ndarray | pyarrow.Table): The table
+
+    Returns:
+        pandas.DataFrame: The table as a data frame
+
+    Raises:
+        TypeError: If the table has another type, or is an array that isn't 2D or structured
+    """
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, np.ndarray):
+        if data.dtype.names is not None:
+            return pd.DataFrame({name: data[name] for name in data.dtype.names}, copy=False)
+        if data.ndim == 2:
+            return pd.DataFrame(data, columns=[str(i) for i in range(data.shape[1])], copy=False)
+        raise TypeError("Expected a 2D or structured array but found " + str(data.ndim) + " dimensions")
+    if is_arrow(data):
+        # Separate blocks let the columns without missing values share their Arrow memory
+        return data.to_pandas(split_blocks=True)
+    raise TypeError("Expected a pandas.DataFrame, numpy.ndarray or pyarrow.Table but found " + type(data).__name__)
+
+
+def like(df: 'pd.DataFrame', data) -> 'pd.DataFrame | np.ndarray | pyarrow.Table':
+    """Convert a result data frame to the type of the input table, see to_frame.
+
+    Args:
+        df (pandas.DataFrame): The result
+        data (pandas.DataFrame | numpy.ndarray | pyarrow.Table): The input table
+
+    Returns:
+        pandas.DataFrame | numpy.ndarray | pyarrow.Table: The result, as the type of the input table
+    """
+    if isinstance(data, pd.DataFrame):
+        return df
+    if isinstance(data, np.ndarray):
+        if data.dtype.names is not None:
+            return df.to_records(index=False)
+        return df.to_numpy()
+    import pyarrow
+    return pyarrow.Table.from_pandas(df, preserve_index=False)
+
+
+def count_missing_rows(data) -> int:
+    """Count the rows that have at least one missing data cell."""
+    return int(missing_mask(to_frame(data)).any(axis=1).sum())
+
+
+def list_missing_cols(data) -> 'list[tuple]':
+    """List the columns with missing data as (index, name) tuples."""
+    df = to_frame(data)
+    return [(int(colIndex), df.columns[colIndex]) for colIndex in missing_cols(missing_mask(df))]
+
+
+def drop_duplicates(data, subset: 'list[str] | None' = None, keep: str = "first"):
+    """Remove the duplicate rows over the subset columns, keeping the first, last or none of each group.
+    The rows are compared by value, see the module documentation.
+    """
+    if keep not in ("first", "last", "none"):
+        raise ValueError("Invalid keep option: " + str(keep))
+    df = to_frame(data)
+    return like(df.drop_duplicates(subset=subset, keep=False if keep == "none" else keep, ignore_index=True), data)
+
+
+def drop_missing_data_cols(data, percentage: float):
+    """Remove the columns whose ratio of missing data exceeds the percentage.
+    The missing cells are those of missing_mask.py, see the module documentation.
+    """
+    df = to_frame(data)
+    if len(df) == 0:
+        return data
+    missingRatio = missing_mask(df).sum(axis=0) / len(df)
+    return like(df.iloc[:, missingRatio <= float(percentage)], data)
+
+
+def drop_missing_data_rows(data, percent: int = 0):
+    """Remove the rows whose percentage of missing columns reaches the percent."""
+    df = to_frame(data)
+    return like(drop_missing_rows(df, int(percent)).reset_index(drop=True), data)
+
+
+def fill_missing_values(data, attributes='all', num_method: str = "mean"):
+    """Fill the missing data of the attributes, a list of column indices or "all" for the columns
+    with missing data, with their mode, mean or median.
+    """
+    if num_method not in ("mean", "median"):
+        raise ValueError("Invalid numeric filling method: " + str(num_method))
+    df = to_frame(data)
+    # The missing mask is built once, for finding the attributes, computing and applying the fillers
+    mask = missing_mask(df)
+    if attributes == "all":
+        attributes = missing_cols(mask)
+    fillers = compute_fillers(df, [int(x) for x in attributes], median if num_method == "median" else mean, mask)
+    return like(apply_fillers(df.copy(deep=False), fillers, mask), data)
+
+
+def feature_scaling(data, attribute: str, include: str):
+    """Append the normalized/standardized versions of the attribute as new columns."""
+    df = to_frame(data)
+    scaled = scale_column(df[attribute].to_numpy(), include)
+    if scaled is None:
+        raise ValueError("Invalid feature scaling option: " + str(include))
+    df = df.copy(deep=False)
+    for name, values in scaled.items():
+        df[attribute + ' ' + name] = values
+    return like(df, data)
+
+
+def solve_equation(data, equation: 'str | None' = None, name: 'str | None' = None,
+                   expressions: 'dict | None' = None):
+    """Append the result of the equation, or of each named expression, as a new column."""
+    df = to_frame(data)
+    if expressions is not None:
+        df = df.copy(deep=False)
+        for column, values in solve_equations(df, list(expressions.items())):
+            df[column] = values
+        return like(df, data)
+    if equation is None:
+        raise ValueError("solve_equation needs an equation or expressions")
+    result = solve(df, equation)
+    df = df.copy(deep=False)
+    df.insert(len(df.columns), equation if name is None else name, result)
+    return like(df, data)
@@ -0,0 +1,131 @@
+"""This module implements a mergeable quantile sketch, to estimate the median or other quantiles
+of a numeric column in one pass with bounded memory, for example while reading a file chunk by chunk.
+
+The sketch is a stack of compactors (as in the KLL/MRL sketches): level h holds values of weight 2^h.
+When a level is full, it is sorted and every other value, starting at a random offset,
+is promoted to the next level with twice the weight.
+A compaction of weight w shifts the rank of any value by at most w, and by zero on average,
+so the sketch keeps track of the rank error it has actually introduced.
+"""
+
+import math
+import numpy as np
+
+# Probability that the reported rank error is exceeded
+FAILURE_PROBABILITY = 0.001
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a configurable rank error.
+
+    Args:
+        error (float): Target rank error, as a fraction of the number of values. For example 0.001
+        seed (int | None): Seed of the random compaction offsets
+    """
+
+    def __init__(self, error: float = 0.001, seed: 'int | None' = None):
+        if not 0 < error < 1:
+            raise ValueError("The rank error must be in range (0, 1)")
+        # the rank error grows like 1/k, with a constant that covers the failure probability
+        self.k = 2 * math.ceil(3 / error)
+        self.levels = [np.empty(0)]
+        self.count = 0
+        # sums of the weights and squared weights of the compactions, for the error bound
+        self.weightSum = 0.0
+        self.weightSquares = 0.0
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values) -> 'QuantileSketch':
+        """Add values to the sketch. Missing values are ignored.
+
+        Args:
+            values (Iterable): Numeric values
+
+        Returns:
+            QuantileSketch: The sketch itself
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Add the values summarized by another sketch to this sketch.
+
+        Args:
+            other (QuantileSketch): Another sketch
+
+        Returns:
+            QuantileSketch: The sketch itself
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, values in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], values])
+        self.count += other.count
+        self.weightSum += other.weightSum
+        self.weightSquares += other.weightSquares
+        self.compress()
+        return self
+
+    def compress(self):
+        """Compact every level that holds at least k values."""
+        h = 0
+        while h < len(self.levels):
+            values = self.levels[h]
+            if len(values) >= self.k:
+                values = np.sort(values)
+                # an odd value out stays at this level
+                kept = values[len(values) - len(values) % 2:]
+                promoted = values[self.rng.integers(2):len(values) - len(values) % 2:2]
+                self.levels[h] = kept
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.weightSum += 2 ** h
+                self.weightSquares += 4 ** h
+            h += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile of the values.
+
+        Args:
+            q (float): The quantile, in range [0, 1]. 0.5 is the median
+
+        Returns:
+            float: The estimated quantile, or NaN if the sketch is empty
+        """
+        if self.count == 0:
+            return float("nan")
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h, dtype=float) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(values[order][min(index, len(values) - 1)])
+
+    def median(self) -> float:
+        """Estimate the median of the values. While nothing has been compacted,
+        the sketch still holds every value and the exact median is returned.
+
+        Returns:
+            float: The estimated median, or NaN if the sketch is empty
+        """
+        if self.count > 0 and self.weightSum == 0:
+            return float(np.median(self.levels[0]))
+        return self.quantile(0.5)
+
+    def rank_error(self) -> float:
+        """Get the rank error introduced so far, as a fraction of the number of values.
+        It holds for any given quantile with probability 1 - FAILURE_PROBABILITY (Hoeffding bound),
+        and never exceeds the worst case of all compactions going the same way.
+
+        Returns:
+            float: The achieved rank error
+        """
+        if self.count == 0:
+            return 0.0
+        hoeffding = math.sqrt(2 * math.log(2 / FAILURE_PROBABILITY) * self.weightSquares)
+        return min(self.weightSum, hoeffding) / self.count
@@ -0,0 +1,233 @@
+"""This module records the metrics of a program run, for the --profile and --metrics-json options
+that every program accepts:
+    - the time spent in each stage: "read", "statistics" (missing data mask, statistics, profiles),
+      "transform" and "write", and the time spent outside of the stages
+    - the number of rows processed and the throughput in rows per second
+    - the peak memory (resident set size) of the process and of its worker processes
+
+The programs mark their stages with the stage context manager, or time the reads of a chunked loop
+with timed_chunks. The stages of the same name are summed, and the time of a stage run inside another one
+is only counted in the inner stage. When no option is given, marking a stage costs almost nothing.
+
+Options, removed from the command line before the program parses it:
+    --profile: Print the time of each stage and the functions that took the most time to the standard error.
+        The functions are profiled with cProfile only inside the stages, the hot section of the program.
+    --profile=[pstats_path]: Also save the cProfile statistics to this file, to be read with pstats.
+        For example: --profile=run.pstats
+    --metrics-json=[json_path]: Save the metrics to this JSON file:
+        {"program": ..., "args": [...], "started": ..., "exit_code": ..., "seconds": ...,
+         "stages": {name: {"seconds": ..., "calls": ...}}, "other_seconds": ..., "rows": ...,
+         "rows_per_second": ..., "peak_rss_mb": ..., "children_peak_rss_mb": ...}
+        The memory is None on platforms without the resource module, like Windows.
+        For example: --metrics-json=metrics.json
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import cProfile
+import pstats
+import datetime
+import contextlib
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# Number of functions printed by --profile
+TOP_FUNCTIONS = 20
+
+# The metrics of the current run, None when they are not recorded
+current = None
+
+# Marks the end of an iteration in timed_chunks
+END = object()
+
+
+class RunMetrics:
+    """The metrics of a program run, see the module documentation."""
+
+    def __init__(self, profile: bool):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.rows = 0
+        # Stack of the running stages: [name, start time, time spent in inner stages]
+        self.running = []
+        self.profiler = cProfile.Profile() if profile else None
+
+    def enter(self, name: str):
+        if len(self.running) == 0 and self.profiler is not None:
+            self.profiler.enable()
+        self.running.append([name, time.perf_counter(), 0.0])
+
+    def exit(self):
+        name, start, inner = self.running.pop()
+        seconds = time.perf_counter() - start
+        if len(self.running) > 0:
+            self.running[-1][2] += seconds
+        elif self.profiler is not None:
+            self.profiler.disable()
+        stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        stage["seconds"] += seconds - inner
+        stage["calls"] += 1
+
+    def report(self, program: str, args: 'list[str]', started: str, code) -> 'dict':
+        """Get the metrics of the finished run."""
+        seconds = time.perf_counter() - self.start
+        peak = children = None
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+            unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+            peak = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1)
+            children = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1)
+        return {
+            "program": program,
+            "args": args,
+            "started": started,
+            "exit_code": code,
+            "seconds": round(seconds, 6),
+            "stages": {name: {"seconds": round(stage["seconds"], 6), "calls": stage["calls"]}
+                       for name, stage in self.stages.items()},
+            "other_seconds": round(seconds - sum(stage["seconds"] for stage in self.stages.values()), 6),
+            "rows": self.rows,
+            "rows_per_second": round(self.rows / seconds, 1) if seconds > 0 else None,
+            "peak_rss_mb": peak,
+            "children_peak_rss_mb": children,
+        }
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Count the time of the block in a stage of the current run, if its metrics are recorded.
+
+    Args:
+        name (str): The stage name: "read", "statistics", "transform" or "write"
+    """
+    run = current
+    if run is None:
+        yield
+        return
+    run.enter(name)
+    try:
+        yield
+    finally:
+        run.exit()
+
+
+def timed_chunks(chunks, name: str = "read"):
+    """Count the time taken to produce each chunk of an iterable in a stage, see stage.
+
+    Args:
+        chunks (Iterable): The chunks, for example the reader of pandas.read_csv with a chunk size
+        name (str): The stage name
+
+    Yields:
+        The chunks
+    """
+    iterator = iter(chunks)
+    while True:
+        with stage(name):
+            chunk = next(iterator, END)
+        if chunk is END:
+            return
+        yield chunk
+
+
+def add_rows(count: int):
+    """Add rows to the number of rows processed by the current run, if its metrics are recorded."""
+    if current is not None:
+        current.rows += int(count)
+
+
+def parse_options(args: 'list[str]') -> 'tuple[list[str], dict | None]':
+    """Remove the metrics options from a command line.
+
+    Args:
+        args (list[str]): The command line arguments
+
+    Returns:
+        tuple: The remaining arguments, and the options ("profile": None, True or a pstats path,
+            "json": None or a JSON path), or None if no metrics option is given
+
+    Raises:
+        ValueError: If an option has no value where one is needed
+    """
+    options = {"profile": None, "json": None}
+    remaining = []
+    for arg in args:
+        flag, equal, value = arg.partition("=")
+        if flag == "--profile":
+            if equal and len(value) == 0:
+                raise ValueError("--profile needs a file path after =")
+            options["profile"] = value if equal else True
+        elif flag == "--metrics-json":
+            if len(value) == 0:
+                raise ValueError("--metrics-json needs a file path")
+            options["json"] = value
+        else:
+            remaining.append(arg)
+    if options["profile"] is None and options["json"] is None:
+        return remaining, None
+    return remaining, options
+
+
+def print_report(metrics: 'dict', profiler: 'cProfile.Profile'):
+    """Print the stage timings and the most expensive functions to the standard error."""
+    print("{:<32} {:>10} {:>8}".format("stage", "seconds", "calls"), file=sys.stderr)
+    for name, stage in metrics["stages"].items():
+        print("{:<32} {:10.4f} {:8d}".format(name, stage["seconds"], stage["calls"]), file=sys.stderr)
+    print("{:<32} {:10.4f}".format("other", metrics["other_seconds"]), file=sys.stderr)
+    print("{:<32} {:10.4f}".format("total", metrics["seconds"]), file=sys.stderr)
+    print("rows: {}, rows per second: {}, peak memory: {} MB".format(
+        metrics["rows"], metrics["rows_per_second"], metrics["peak_rss_mb"]), file=sys.stderr)
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    if stats.total_calls > 0:
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        print(text.getvalue(), file=sys.stderr)
+
+
+def instrumented(main):
+    """Run the main function of a program, recording its metrics if the command line asks for them.
+    The metrics options are removed from sys.argv before main parses it.
+
+    Args:
+        main (callable): The main function of the program
+
+    Returns:
+        The return value of main
+    """
+    global current
+    try:
+        sys.argv, options = parse_options(sys.argv)
+    except ValueError as error:
+        print(str(error) + ". Please use \"--help\" flag to see the documentation.")
+        return -1
+    if options is None:
+        return main()
+
+    started = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    current = RunMetrics(options["profile"] is not None)
+    code = None
+    failed = True
+    try:
+        code = main()
+        failed = False
+        return code
+    finally:
+        run = current
+        current = None
+        # The metrics are saved even if the program failed with an exception, with a None exit code
+        metrics = run.report(os.path.splitext(os.path.basename(sys.argv[0]))[0], sys.argv[1:], started,
+                             None if failed else 0 if code is None else code)
+        if options["json"] is not None:
+            with open(options["json"], "w") as file:
+                json.dump(metrics, file, indent=4)
+        if options["profile"] is not None:
+            print_report(metrics, run.profiler)
+            if options["profile"] is not True:
+                run.profiler.dump_stats(options["profile"])
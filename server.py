@@ -0,0 +1,275 @@
+"""
+This program is an optional long-lived local server that runs the preprocessing programs
+on behalf of client.py, so that repeated runs don't pay the start-up cost again:
+pandas and the programs are imported once, and the recently read tables are kept in memory.
+
+The tables read whole by the programs (see columnar_cache.read_table) are kept in a least recently
+used cache bounded by memory, and are reused while their file is unchanged (see table_cache.py).
+The requests are run one at a time, in the working directory of the client, so the outputs are written
+where they would be if the program was run directly.
+The server listens on a Unix socket that only the user running it can connect to,
+and the clients only connect to a socket owned by their user. Unix systems only.
+
+Command line: --socket=[socket_path] --memory=[megabytes] | --help
+    --socket: Optional. Path to the Unix socket. The default is a file in the runtime directory of the user
+        ($XDG_RUNTIME_DIR), or else in a directory of the temporary directory that only the user can access,
+        which client.py uses by default too.
+        For example: --socket=cleanup.sock
+    --memory: Optional. Memory budget of the cached tables in megabytes. The default value is 1024.
+        For example: --memory=4096
+    --help: See this documentation
+
+Output:
+    The server runs until client.py --stop is used or it is interrupted.
+"""
+
+import sys
+import os
+import io
+import json
+import stat
+import socket
+import tempfile
+import importlib
+import contextlib
+import traceback
+
+# The programs that can be run by the server
+PROGRAMS = ("count_missing_rows", "list_missing_cols", "drop_duplicates", "drop_missing_data_cols",
+            "drop_missing_data_rows", "fill_missing_values", "feature_scaling", "solve_equation",
+            "pipeline", "columnar_cache", "table_schema")
+
+# Default memory budget of the cached tables, in megabytes
+MEMORY = 1024
+
+
+def default_socket() -> str:
+    """Get the default path of the socket, one per user: in the runtime directory of the user if there is one,
+    else in a directory of the temporary directory that only the user can access (see private_directory).
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR", "")
+    if len(runtime) > 0 and os.path.isdir(runtime):
+        return os.path.join(runtime, "preprocessing_data.sock")
+    return os.path.join(tempfile.gettempdir(), "preprocessing_data_" + str(os.getuid()), "server.sock")
+
+
+def private_directory(path: str):
+    """Create a directory that only the user can access, or check that an existing one is.
+
+    Raises:
+        PermissionError: If the directory is a link, belongs to another user or can be accessed by other users
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    status = os.lstat(path)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077 != 0:
+        raise PermissionError("The directory " + path + " must belong to the user and be private to them")
+
+
+def check_owner(path: str):
+    """Check that a socket belongs to the user, so that the requests are never sent to another user's server.
+
+    Raises:
+        PermissionError: If the socket belongs to another user
+    """
+    if os.stat(path).st_uid != os.getuid():
+        raise PermissionError("The socket " + path + " belongs to another user")
+
+
+def read_message(connection: 'socket.socket') -> 'dict | None':
+    """Read a JSON message, sent as a single line, from a connection.
+
+    Returns:
+        dict | None: The message, or None if the connection was closed before a full message
+    """
+    data = bytearray()
+    while not data.endswith(b"\n"):
+        block = connection.recv(65536)
+        if not block:
+            return None
+        data += block
+    return json.loads(data.decode("utf-8"))
+
+
+def send_message(connection: 'socket.socket', message: 'dict'):
+    """Send a JSON message as a single line on a connection."""
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def send_request(path: str, request: 'dict') -> 'dict':
+    """Send a request to the server and wait for its response.
+
+    Args:
+        path (str): Path to the socket of the server
+        request (dict): The request, see handle_request
+
+    Returns:
+        dict: The response
+
+    Raises:
+        OSError: If the server can't be reached or its socket belongs to another user
+    """
+    check_owner(path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        send_message(connection, request)
+        response = read_message(connection)
+    if response is None:
+        raise ConnectionError("The server closed the connection")
+    return response
+
+
+def run_program(program: str, args: 'list[str]', cwd: str) -> 'dict':
+    """Run a program in a working directory, capturing what it prints.
+    Any error is caught, so that it only fails this request.
+
+    Returns:
+        dict: The exit code, and the standard output and error of the program
+    """
+    from run_metrics import instrumented
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    previous = os.getcwd()
+    argv = sys.argv
+    try:
+        module = importlib.import_module(program)
+        os.chdir(cwd)
+        sys.argv = [program + ".py"] + args
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            code = instrumented(module.main)
+        code = 0 if code is None else code
+    except (Exception, SystemExit):
+        code = -1
+        stderr.write(traceback.format_exc())
+    finally:
+        sys.argv = argv
+        os.chdir(previous)
+    return {"code": code, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+
+def handle_request(request: 'dict', cache) -> 'tuple[dict, bool]':
+    """Answer a request of a client.
+
+    Args:
+        request (dict): One of {"program": name, "args": [...], "cwd": directory}, {"status": true}
+            or {"stop": true}
+        cache (table_cache.TableCache): The cached tables
+
+    Returns:
+        tuple: The response, and whether the server must stop
+    """
+    if request.get("stop"):
+        return {"code": 0, "stdout": "SERVER STOPPED\n", "stderr": ""}, True
+    if request.get("status"):
+        return {"code": 0, "stdout": json.dumps(cache.status(), indent=4) + "\n", "stderr": ""}, False
+    program = request.get("program")
+    if program not in PROGRAMS:
+        return {"code": -1, "stdout": "", "stderr": "Unknown program: " + str(program) + "\n"}, False
+    return run_program(program, [str(arg) for arg in request.get("args", [])], request.get("cwd", os.getcwd())), False
+
+
+def serve(path: str, memory: float):
+    """Serve the requests of the clients on a Unix socket until a stop request.
+
+    Args:
+        path (str): Path to the socket
+        memory (float): Memory budget of the cached tables, in megabytes
+    """
+    import columnar_cache
+    from table_cache import TableCache
+
+    # Import the programs now rather than on the first request
+    for program in PROGRAMS:
+        importlib.import_module(program)
+    cache = TableCache(int(memory * 1024 * 1024))
+    columnar_cache.memory_cache = cache
+
+    # Only the user can connect to the socket
+    umask = os.umask(0o077)
+    try:
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+    finally:
+        os.umask(umask)
+    try:
+        listener.listen()
+        print("LISTENING ON " + path, flush=True)
+        stop = False
+        while not stop:
+            connection, _ = listener.accept()
+            with connection:
+                try:
+                    request = read_message(connection)
+                    if request is None:
+                        continue
+                    response, stop = handle_request(request, cache)
+                    send_message(connection, response)
+                except (OSError, ValueError) as error:
+                    # A broken request or a client that left doesn't stop the server
+                    print("REQUEST FAILED: " + str(error), file=sys.stderr, flush=True)
+    finally:
+        listener.close()
+        columnar_cache.memory_cache = None
+        os.remove(path)
+
+
+def main():
+    args = sys.argv
+    parse_error = "Invalid command line arguments. Please use \"--help\" flag to see the documentation."
+
+    path = None
+    memory = MEMORY
+    for arg in args[1:]:
+        flag, _, value = arg.partition("=")
+        if flag == "--help":
+            print(__doc__)
+            return 0
+        elif flag == "--socket" and len(value) > 0:
+            path = value
+        elif flag == "--memory":
+            try:
+                memory = float(value)
+                if memory < 0:
+                    raise ValueError
+            except ValueError:
+                print("The memory budget must be a non-negative number of megabytes.")
+                return -1
+        else:
+            print(parse_error)
+            return -1
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("The server needs Unix sockets, which this system doesn't have.")
+        return -1
+    if path is None:
+        path = default_socket()
+        try:
+            private_directory(os.path.dirname(path))
+        except PermissionError as error:
+            print(str(error))
+            return -1
+
+    if os.path.exists(path):
+        # A socket left by a server that didn't stop cleanly is replaced, a running server is not
+        try:
+            send_request(path, {"status": True})
+            print("A server is already running on " + path)
+            return -1
+        except PermissionError as error:
+            print(str(error))
+            return -1
+        except (OSError, ValueError):
+            os.remove(path)
+
+    try:
+        serve(path, memory)
+    except KeyboardInterrupt:
+        print("SERVER STOPPED")
+
+    return 0
+
+
+if __name__ == "__main__":
+    main()
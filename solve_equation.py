@@ -3,76 +3,187 @@ This program solves a specified equation from the data in a csv file.
 The csv file should be comma-separated.
 The parameter must be in the correct order in order for this program to function normally.
 
-Command line: [csv_path] [equation] | --help
+Command line: [csv_path] [equation] --out-format=[format] | [csv_path] --expr [name]=[equation] ... --out-format=[format] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+    --expr: Compute several named equations in one run, each one stored in a column with its name.
+        Can be repeated. An equation can use the names of the previous equations.
+        Subexpressions shared by the equations are only computed once.
+        For example: --expr TotalSF=TotalBsmtSF+1stFlrSF+2ndFlrSF --expr "SFPerRoom=TotalSF/TotRmsAbvGrd"
     equation: The equation that needed to be solved.
-        The variables must be columns' name.
+        The variables must be columns' name, matched exactly.
+        Names that are not plain words can be quoted with backticks, for example `att 1`.
+        Allowed operators: + - * / // % ** ( ) and comparisons < <= > >= == != (1 if true, 0 if false).
+        Allowed functions: abs, sqrt, log, log10, exp, floor, ceil, round, min(a, b), max(a, b), where(cond, a, b).
+        Missing values give a missing result.
         Random spacing are acceptable.
         For example: att1 + att2 -      att3*att4
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
     A csv file identical to the input csv with a new column in the end that stores the equation's result.
-    Output path is ''output_solve_equation_' + csv_path' and is not customizable.
+    With --expr, one column per named equation, or the column is replaced if the name already exists.
+    Output path is ''output_solve_equation_' + csv_path' and is not customizable, except for its extension.
 """
 
-import os
-import pandas as pd
+import re
+import numpy as np
 import sys
+from expression import parse_expression, parse_expressions, evaluate, evaluate_all
+from columnar_cache import read_table
+from run_metrics import instrumented, stage, add_rows
+from compressed_input import decompressed_name
+from output_writer import FormatError, output_path, parse_format, write_table
+
+# a named equation is "name=equation", where "=" is not part of a comparison operator
+NAMED_EQUATION = re.compile(r"^\s*(`[^`]+`|[A-Za-z0-9_.]+)\s*=(?!=)(.*)$", re.DOTALL)
 
 def solve_equation(df, EQUATION):
     """
-    This function solves the equation on columns from the User's input 
-    using eval().
+    This function solves the equation on columns from the User's input.
+    The equation is parsed once, then evaluated on whole columns at a time.
+    A ValueError is raised if the equation is invalid.
     """
 
-    # find all the attributes that involved in the function
-    atts = [att for att in list(df.columns) if att in EQUATION]
+    # parse the equation, resolving the column names exactly
+    tree = parse_expression(EQUATION, df.columns)
 
-    # init result list
-    calc = []
+    # a result that doesn't depend on any column is repeated on every row
+    return np.broadcast_to(evaluate(tree, df), (len(df),)).copy()
 
-    for i in range(len(df)):
-        # the dictionary comprehension is applied to 
-        # map each variable in the equation into its current row's value
-        calc.append(eval(EQUATION, {att : df.loc[i, att] for att in atts}))
+def solve_equations(df, named):
+    """
+    This function solves several (name, equation) pairs on the columns in one go.
+    An equation can use the names of the previous ones, and the subexpressions
+    they share are only computed once.
+    It returns the (name, result) pairs. A ValueError is raised if an equation is invalid.
+    """
+    parsed = parse_expressions(named, df.columns)
+    results = evaluate_all([tree for _, tree in parsed], df)
+    return [(name, np.broadcast_to(result, (len(df),)).copy())
+            for (name, _), result in zip(parsed, results)]
 
-    return calc
+def parse_named_equation(text):
+    """
+    This function splits "name=equation" into a (name, equation) pair.
+    A ValueError is raised if there is no name.
+    """
+    match = NAMED_EQUATION.match(text)
+    if match is None:
+        raise ValueError("Expected name=equation but found " + text)
+    return match.group(1).strip('`'), match.group(2)
 
 ######################################################## MAIN
-arg = sys.argv
+def main():
+    arg = sys.argv
 
-INPUTPATH = arg[1]
+    INPUTPATH = arg[1]
 
-if INPUTPATH == "--help":
-    print("""
+    if INPUTPATH == "--help":
+        print("""
 This program solves a specified equation from the data in a csv file.
 The csv file should be comma-separated.
 The parameter must be in the correct order in order for this program to function normally.
 
-Command line: [csv_path] [equation] | --help
+Command line: [csv_path] [equation] --out-format=[format] | [csv_path] --expr [name]=[equation] ... --out-format=[format] | --help
     csv_path: Path to the csv file for this program to check.
         For example: a.csv, "a b c.csv"
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+    --expr: Compute several named equations in one run, each one stored in a column with its name.
+        Can be repeated. An equation can use the names of the previous equations.
+        Subexpressions shared by the equations are only computed once.
+        For example: --expr TotalSF=TotalBsmtSF+1stFlrSF+2ndFlrSF --expr "SFPerRoom=TotalSF/TotRmsAbvGrd"
     equation: The equation that needed to be solved.
-        The variables must be columns' name.
+        The variables must be columns' name, matched exactly.
+        Names that are not plain words can be quoted with backticks, for example `att 1`.
+        Allowed operators: + - * / // % ** ( ) and comparisons < <= > >= == != (1 if true, 0 if false).
+        Allowed functions: abs, sqrt, log, log10, exp, floor, ceil, round, min(a, b), max(a, b), where(cond, a, b).
+        Missing values give a missing result.
         Random spacing are acceptable.
         For example: att1 + att2 -      att3*att4
+    --out-format: Optional. Format of the output file: csv (default), csv.gz[:level], parquet, feather or npy,
+        see output_writer.py. The extension of the output path is changed to the one of the format.
+        For example: --out-format=csv.gz:1
     
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
     --help: See this documentation
 
 Output:
     A csv file identical to the input csv with a new column in the end that stores the equation's result.
-    Output path is ''output_solve_equation_' + csv_path' and is not customizable.
+    With --expr, one column per named equation, or the column is replaced if the name already exists.
+    Output path is ''output_solve_equation_' + csv_path' and is not customizable, except for its extension.
 """)
-    quit()
-
-EQUATION = "".join(arg[2:]) # combine all remaining arguments to the equation
-
-df = pd.read_csv(INPUTPATH) 
-df.insert(len(df.columns), EQUATION, solve_equation(df,EQUATION))
-
-outputpath = 'output_solve_equation_' + os.path.basename(INPUTPATH)
-df.to_csv(outputpath, index = False)
-print('EXPORTED TO ' + outputpath)
\ No newline at end of file
+        return 0
+
+    # the output format can be given anywhere after the csv path
+    outFormat = 'csv'
+    for option in arg[2:]:
+        if option.startswith('--out-format='):
+            outFormat = option[len('--out-format='):]
+            try:
+                parse_format(outFormat)
+            except ValueError as error:
+                print("INVALID OPTION " + option + ". " + str(error))
+                return -1
+    arg = [option for option in arg if not option.startswith('--out-format=')]
+
+    # collect the named equations given with --expr
+    named = []
+    i = 2
+    try:
+        while i < len(arg):
+            if arg[i] == "--expr" and i + 1 < len(arg):
+                named.append(parse_named_equation(arg[i + 1]))
+                i += 2
+            elif arg[i].startswith("--expr="):
+                named.append(parse_named_equation(arg[i][len("--expr="):]))
+                i += 1
+            elif len(named) > 0:
+                raise ValueError("Unexpected argument " + arg[i])
+            else:
+                break
+    except ValueError as error:
+        print("INVALID EQUATION: " + str(error))
+        return -1
+
+    EQUATION = "".join(arg[2:]) # combine all remaining arguments to the equation
+
+    with stage("read"):
+        df = read_table(INPUTPATH)
+    add_rows(len(df))
+    try:
+        with stage("transform"):
+            if len(named) == 0:
+                df.insert(len(df.columns), EQUATION, solve_equation(df,EQUATION))
+            else:
+                # all the results are added before the single output pass
+                for name, result in solve_equations(df, named):
+                    df[name] = result
+    except ValueError as error:
+        print("INVALID EQUATION: " + str(error))
+        return -1
+
+    outputpath = output_path('output_solve_equation_' + decompressed_name(INPUTPATH), outFormat)
+    try:
+        with stage("write"):
+            write_table(df, outputpath, outFormat)
+    except FormatError as error:
+        print("CAN'T EXPORT TO " + outputpath + ". " + str(error))
+        return -1
+    print('EXPORTED TO ' + outputpath)
+
+    return 0
+
+
+if __name__ == "__main__":
+    instrumented(main)
@@ -0,0 +1,64 @@
+"""This module keeps recently read tables in memory, for a long-lived process that runs
+the programs many times on the same files (see server.py).
+
+The tables are kept in least recently used order within a memory budget.
+A cached table is valid only while the key of its file is unchanged (see column_profile.file_key),
+and every read gets its own copy, so a program can change its table without changing the cached one.
+"""
+
+from collections import OrderedDict
+import pandas as pd
+from column_profile import file_key
+
+
+class TableCache:
+    """
+    This class is a least recently used cache of data frames keyed by file path, bounded by memory.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # path -> (file key, data frame, size in bytes), least recently used first
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, load) -> 'pd.DataFrame':
+        """Get a copy of the table of a file, loading and caching it if needed.
+
+        Args:
+            path (str): Path to the file
+            load (callable): Function reading the table of a file path
+
+        Returns:
+            pandas.DataFrame: A copy of the cached table
+        """
+        key = file_key(path)
+        entry = self.entries.get(key["path"])
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            self.entries.move_to_end(key["path"])
+            return entry[1].copy()
+        self.misses += 1
+        self.remove(key["path"])
+        df = load(path)
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        # A table over the budget is not cached
+        if size <= self.max_bytes:
+            self.entries[key["path"]] = (key, df.copy(), size)
+            self.size += size
+            while self.size > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+        return df
+
+    def remove(self, path: str):
+        """Remove the table of a file from the cache, if it is cached."""
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def status(self) -> 'dict':
+        """Get the content and the hit counts of the cache."""
+        return {"tables": list(self.entries.keys()), "bytes": self.size, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
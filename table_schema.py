@@ -0,0 +1,272 @@
+"""
+This program infers the compact schema of a csv file, which the other programs use to hold its table
+in less memory than with the default types of pandas.read_csv (int64, float64 and Python strings):
+    - integer columns are downcast to the smallest integer type holding their values (int8, int16 or int32)
+    - float columns whose values are all whole numbers of at most 2**24 in magnitude, typically integer
+      columns with missing values, are downcast to float32, so they are written exactly as before
+    - nominal columns with few distinct values become categoricals: each distinct value is stored once
+      and the rows only hold small integer codes
+
+The schema is inferred from a sample of the first SAMPLE_ROWS rows. It only gives the compact type
+of each column: a table or chunk is downcast only where its values fit, else a wider type is used,
+so values beyond the sample are never changed. The tables have the same values as with the default types.
+
+The schema is cached with the profiles of the files (see column_profile.py) while the file is unchanged,
+so the sample is only read once. Set the environment variable PREPROCESSING_SCHEMA to 0 to read
+the tables with the default types.
+
+Command line: [csv_path] | --help
+    csv_path: Path to the csv file.
+        The file can be compressed with gzip, bzip2 or xz (.gz, .bz2, .xz), see compressed_input.py.
+        For example: a.csv, "a b c.csv"
+    --profile, --metrics-json: Optional. Record the time of each stage, the number of rows processed and the peak memory,
+        printed with --profile or saved to a JSON file with --metrics-json=[json_path], see run_metrics.py.
+        For example: --metrics-json=metrics.json
+    --help: See this documentation
+
+Output:
+    The compact type of each column, and the memory of the table with the default types and with the schema.
+"""
+
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+import column_profile
+from column_profile import file_key
+from compressed_input import read_csv as read_input
+from run_metrics import instrumented, stage, add_rows
+
+FORMAT_VERSION = 1
+
+# Whether the programs read the tables with the schema
+SCHEMA = os.environ.get("PREPROCESSING_SCHEMA", "1") != "0"
+
+# Number of rows sampled to infer the schema
+SAMPLE_ROWS = 10000
+
+# Nominal columns become categoricals if they have at most this many distinct values in the sample,
+# and at most one distinct value every CATEGORY_RATIO rows
+MAX_CATEGORIES = 1000
+CATEGORY_RATIO = 2
+
+# Integer types from the narrowest, and the largest magnitude of the whole numbers float32 holds exactly
+INTEGER_TYPES = ("int8", "int16", "int32")
+FLOAT32_LIMIT = 2 ** 24
+
+
+def integer_type(values: 'np.ndarray', narrowest: str = "int8") -> 'str | None':
+    """Get the narrowest integer type, not narrower than the given one, holding all the values,
+    or None if only int64 does."""
+    if len(values) == 0:
+        return narrowest
+    low, high = values.min(), values.max()
+    for name in INTEGER_TYPES[INTEGER_TYPES.index(narrowest):]:
+        info = np.iinfo(name)
+        if info.min <= low and high <= info.max:
+            return name
+    return None
+
+
+def fits_float32(values: 'np.ndarray') -> bool:
+    """Tell whether float values are all missing or whole numbers that float32 holds exactly."""
+    values = values[~np.isnan(values)]
+    return bool(np.all(np.abs(values) <= FLOAT32_LIMIT) and np.all(values == np.floor(values)))
+
+
+def infer_schema(path: str) -> 'dict':
+    """Infer the compact type of each column of a csv file from a sample of its first rows.
+
+    Args:
+        path (str): Path to the csv file
+
+    Returns:
+        dict: The number of sampled rows and the compact type of each column that has one, keyed by name
+    """
+    sample = read_input(path, nrows=SAMPLE_ROWS)
+    columns = {}
+    for name in sample.columns:
+        column = sample[name]
+        if column.dtype.kind == "i":
+            compact = integer_type(column.to_numpy())
+        elif column.dtype.kind == "f":
+            compact = "float32" if fits_float32(column.to_numpy()) else None
+        elif column.dtype == object:
+            distinct = column.nunique()
+            compact = "category" if distinct <= min(MAX_CATEGORIES, len(column) / CATEGORY_RATIO) else None
+        else:
+            compact = None
+        if compact is not None:
+            columns[name] = compact
+    return {"rows": len(sample), "columns": columns}
+
+
+def schema_path(path: str) -> str:
+    """Get the path of the cached schema of a file, next to its cached profile."""
+    return os.path.splitext(column_profile.cache_path(path))[0] + ".schema.json"
+
+
+def load_schema(path: str) -> 'dict | None':
+    """Load the cached schema of a csv file if it is still valid, see column_profile.load_profile."""
+    if not column_profile.CACHE_DIR:
+        return None
+    try:
+        with open(schema_path(path)) as file:
+            cached = json.load(file)
+        if cached.get("format_version") != FORMAT_VERSION or cached.get("key") != file_key(path):
+            return None
+        # Mark the schema as recently used for the eviction
+        os.utime(schema_path(path))
+    except (OSError, ValueError):
+        return None
+    return cached["schema"]
+
+
+def save_schema(path: str, schema: 'dict'):
+    """Cache the schema of a csv file, see column_profile.save_profile."""
+    if not column_profile.CACHE_DIR:
+        return
+    try:
+        os.makedirs(column_profile.CACHE_DIR, exist_ok=True)
+        temppath = schema_path(path) + ".tmp"
+        with open(temppath, "w") as file:
+            json.dump({"format_version": FORMAT_VERSION, "key": file_key(path), "schema": schema}, file)
+        os.replace(temppath, schema_path(path))
+        column_profile.evict(column_profile.CACHE_MAX_BYTES)
+    except OSError:
+        pass
+
+
+def get_schema(path: str) -> 'dict':
+    """Get the schema of a csv file from the cache, or infer and cache it.
+
+    Args:
+        path (str): Path to the csv file
+
+    Returns:
+        dict: The schema, see infer_schema
+    """
+    schema = load_schema(path)
+    if schema is None:
+        schema = infer_schema(path)
+        save_schema(path, schema)
+    return schema
+
+
+def compact_type(values, dtype: str) -> 'str | None':
+    """Get the type a column, or a chunk of it, is downcast to from its type in the schema,
+    or None if its values don't fit in that type.
+    Integer columns are downcast to the narrowest type holding their values that isn't narrower than the
+    schema, and float columns are downcast to float32 only if it holds all their values exactly.
+
+    Args:
+        values (pandas.Series | numpy.ndarray): The column, with the default types of pandas.read_csv
+        dtype (str): The type of the column in the schema, see infer_schema
+
+    Returns:
+        str | None: The compact type of the column
+    """
+    if dtype in INTEGER_TYPES and values.dtype.kind == "i":
+        return integer_type(np.asarray(values), dtype)
+    if dtype == "float32" and values.dtype.kind == "f":
+        return dtype if fits_float32(np.asarray(values)) else None
+    if dtype == "category" and values.dtype == object:
+        return dtype
+    return None
+
+
+def apply_schema(df: 'pd.DataFrame', schema: 'dict') -> 'pd.DataFrame':
+    """Downcast the columns of a table, or of a chunk of it, to their compact types where their values fit,
+    see compact_type. The other columns are not copied.
+
+    Args:
+        df (pandas.DataFrame): The table, with the default types of pandas.read_csv
+        schema (dict): The schema, see infer_schema
+
+    Returns:
+        pandas.DataFrame: The table with compact columns
+    """
+    compact = {}
+    for name, dtype in schema["columns"].items():
+        if name not in df.columns:
+            continue
+        dtype = compact_type(df[name], dtype)
+        if dtype is not None:
+            compact[name] = dtype
+    return df.astype(compact, copy=False) if len(compact) > 0 else df
+
+
+def widen(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """Convert the compact columns of a table back to the default types of pandas.read_csv."""
+    types = {}
+    for name, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            types[name] = object
+        elif dtype.kind == "i" and dtype.itemsize < 8:
+            types[name] = "int64"
+        elif dtype.kind == "f" and dtype.itemsize < 8:
+            types[name] = "float64"
+    return df.astype(types) if len(types) > 0 else df
+
+
+def read_csv(path: str, **options):
+    """Read a csv file like compressed_input.read_csv, with the compact types of its schema.
+    The default types are kept if the schema is disabled or if the types are given with a dtype option.
+
+    Args:
+        path (str): Path to the csv file
+        **options: Options of pandas.read_csv
+
+    Returns:
+        pandas.DataFrame | Iterable[pandas.DataFrame]: The table, or its chunks with a chunk size
+    """
+    if not SCHEMA or "dtype" in options:
+        return read_input(path, **options)
+    schema = get_schema(path)
+    # Categoricals are parsed directly, numbers are downcast once they are parsed
+    categories = {name: "category" for name, dtype in schema["columns"].items() if dtype == "category"}
+    result = read_input(path, dtype=categories, **options)
+    if options.get("chunksize") is None:
+        return apply_schema(result, schema)
+    return (apply_schema(chunk, schema) for chunk in result)
+
+
+def main():
+    args = sys.argv
+
+    if len(args) != 2:
+        print("Invalid command line arguments. Please use \"--help\" flag to see the documentation.")
+        return -1
+
+    # Print the documentation of this file if the user ask for help
+    if args[1] == "--help":
+        print(__doc__)
+        return 0
+
+    if not os.path.exists(args[1]):
+        print("Invalid file path: " + args[1] + " - Please try again")
+        return -1
+
+    with stage("statistics"):
+        schema = get_schema(args[1])
+    print("Compact types inferred from the first " + str(schema["rows"]) + " rows:")
+    for name, dtype in schema["columns"].items():
+        print(name, '-', dtype)
+
+    # Compare the memory of the whole table with the default types and with the schema
+    with stage("read"):
+        df = read_input(args[1])
+    add_rows(len(df))
+    with stage("transform"):
+        default = df.memory_usage(index=True, deep=True).sum()
+        df = apply_schema(df, schema)
+        compact = df.memory_usage(index=True, deep=True).sum()
+    print("Memory with the default types: {:.2f} MB".format(default / 1024 / 1024))
+    print("Memory with the schema: {:.2f} MB".format(compact / 1024 / 1024))
+
+    return 0
+
+
+if __name__ == "__main__":
+    instrumented(main)
@@ -0,0 +1,7 @@
+"""The tests import the programs from the root of the repository."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,69 @@
+"""Tests of batch.py: the summary over the files matches the counts of the whole table."""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import batch
+import column_profile
+import drop_missing_data_rows
+from missing_mask import missing_mask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def parts(tmp_path, monkeypatch):
+    """Split house-prices.csv into files of 400 rows, and add a file that can't be read."""
+    monkeypatch.setenv("PREPROCESSING_CACHE_DIR", "")
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.chdir(tmp_path)
+    directory = tmp_path / "parts"
+    directory.mkdir()
+    with open(os.path.join(ROOT, "house-prices.csv")) as file:
+        lines = file.readlines()
+    for index, start in enumerate(range(1, len(lines), 400)):
+        (directory / ("part" + str(index) + ".csv")).write_text(''.join(lines[:1] + lines[start:start + 400]))
+    (directory / "zbroken.csv").write_text("")
+    return directory
+
+
+def run_batch(monkeypatch, capsys, *args) -> 'tuple[int, list[str]]':
+    monkeypatch.setattr(sys, "argv", ["batch.py", "--workers=2", "--out-dir=out"] + list(args))
+    code = batch.main()
+    return code, capsys.readouterr().out.splitlines()
+
+
+def test_count_summary_matches_whole_table(parts, monkeypatch, capsys):
+    code, lines = run_batch(monkeypatch, capsys, "count_missing_rows", str(parts))
+    df = pd.read_csv(os.path.join(ROOT, "house-prices.csv"))
+    assert code == -1
+    files = len(os.listdir(parts))
+    assert "Files processed: " + str(files - 1) + " of " + str(files) in lines
+    assert "Total number of rows: " + str(len(df)) in lines
+    assert "Total number of rows with missing data: " + str(int(missing_mask(df).any(axis=1).sum())) in lines
+    assert lines[-1].strip().endswith("zbroken.csv")
+
+
+def test_missing_cols_summary_matches_whole_table(parts, monkeypatch, capsys):
+    code, lines = run_batch(monkeypatch, capsys, "list_missing_cols", str(parts / "part*.csv"))
+    df = pd.read_csv(os.path.join(ROOT, "house-prices.csv"))
+    counts = missing_mask(df).sum(axis=0)
+    assert code == 0
+    start = lines.index("Columns with missing data over all files (name - missing count):")
+    assert lines[start + 1:] == [name + " - " + str(count) for name, count in zip(df.columns, counts) if count > 0]
+
+
+def test_outputs_match_single_runs(parts, monkeypatch, capsys):
+    code, _ = run_batch(monkeypatch, capsys, "drop_missing_data_rows", str(parts / "part*.csv"), "--percent=5")
+    assert code == 0
+    for name in sorted(os.listdir(parts)):
+        if name.startswith("part"):
+            monkeypatch.setattr(sys, "argv", ["drop_missing_data_rows.py", "--in=" + str(parts / name),
+                                              "--out=single.csv", "--percent=5"])
+            assert drop_missing_data_rows.main() == 0
+            with open("single.csv", "rb") as single, open(os.path.join("out", "output_drop_missing_data_rows_" + name),
+                                                           "rb") as batched:
+                assert batched.read() == single.read()
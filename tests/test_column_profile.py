@@ -0,0 +1,69 @@
+"""Tests of the profile cache of column_profile.py."""
+
+import os
+
+import pytest
+
+import column_profile
+from column_profile import cache_path, evict, file_key, load_profile, save_profile
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    directory = tmp_path / "cache"
+    monkeypatch.setattr(column_profile, "CACHE_DIR", str(directory))
+    return directory
+
+
+def write_csv(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_key_catches_rewrite_with_same_size_and_mtime(tmp_path):
+    path = write_csv(tmp_path / "a.csv", "x,y\n1,2\n")
+    key = file_key(path)
+    info = os.stat(path)
+    write_csv(tmp_path / "a.csv", "x,y\n3,4\n")
+    os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns))
+    changed = file_key(path)
+    assert (changed["size"], changed["mtime"]) == (key["size"], key["mtime"])
+    assert changed["hash"] != key["hash"]
+
+
+def test_key_hashes_the_end_of_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(column_profile, "HASH_SAMPLE", 4)
+    path = write_csv(tmp_path / "a.csv", "x,y\n" + "1,2\n" * 10)
+    key = file_key(path)
+    write_csv(tmp_path / "a.csv", "x,y\n" + "1,2\n" * 9 + "1,3\n")
+    assert file_key(path)["hash"] != key["hash"]
+
+
+def test_profile_is_invalidated_by_a_change(tmp_path, cache):
+    path = write_csv(tmp_path / "a.csv", "x,y\n1,2\n")
+    save_profile(path, {"rows": 1})
+    assert load_profile(path) == {"rows": 1}
+    write_csv(tmp_path / "a.csv", "x,y\n1,2\n3,4\n")
+    assert load_profile(path) is None
+
+
+def test_disabled_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    path = write_csv(tmp_path / "a.csv", "x,y\n1,2\n")
+    save_profile(path, {"rows": 1})
+    assert load_profile(path) is None
+
+
+def test_evict_removes_least_recently_used(tmp_path, cache):
+    paths = [write_csv(tmp_path / (name + ".csv"), "x\n1\n") for name in "abc"]
+    for age, path in enumerate(paths):
+        save_profile(path, {"rows": 1})
+        # a is the oldest, c the newest
+        os.utime(cache_path(path), ns=(0, (1 + age) * 10 ** 9))
+    # loading a marks it as recently used, so b is now the least recently used
+    assert load_profile(paths[0]) is not None
+    size = os.path.getsize(cache_path(paths[0]))
+    evict(2 * size)
+    assert os.path.exists(cache_path(paths[0]))
+    assert not os.path.exists(cache_path(paths[1]))
+    assert os.path.exists(cache_path(paths[2]))
@@ -0,0 +1,74 @@
+"""Tests of columnar_cache.py: the cached table and the outputs of the programs are the same as from the csv file."""
+
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_profile
+import columnar_cache
+import drop_missing_data_rows
+import feature_scaling
+import fill_missing_values
+import solve_equation
+import table_schema
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMS = [
+    (fill_missing_values, ["--in=house-prices.csv", "--out=output_fill.csv"]),
+    (fill_missing_values, ["--in=house-prices.csv", "--num_method=median", "--out=output_median.csv"]),
+    (drop_missing_data_rows, ["--in=house-prices.csv", "--percent=5"]),
+    (solve_equation, ["house-prices.csv", "LotArea*2+MSSubClass"]),
+    (feature_scaling, ["house-prices.csv", "all-numeric", "all"]),
+]
+
+
+@pytest.fixture(params=[False, True], ids=["csv types", "schema"])
+def directory(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.setattr(table_schema, "SCHEMA", request.param)
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(os.path.join(ROOT, "house-prices.csv"), tmp_path)
+    return tmp_path
+
+
+def run_programs(monkeypatch) -> 'dict':
+    """Run the programs and return their outputs, removing them."""
+    for module, args in PROGRAMS:
+        monkeypatch.setattr(sys, "argv", [module.__name__ + ".py"] + args)
+        assert module.main() == 0
+    outputs = {}
+    for name in os.listdir("."):
+        if name.startswith("output_"):
+            with open(name, "rb") as file:
+                outputs[name] = file.read()
+            os.remove(name)
+    return outputs
+
+
+def test_cached_table_matches_csv(directory):
+    parsed = columnar_cache.read_table("house-prices.csv")
+    columnar_cache.write_cache("house-prices.csv")
+    assert columnar_cache.load_meta("house-prices.csv") is not None
+    cached = columnar_cache.read_table("house-prices.csv")
+    assert cached.columns.tolist() == parsed.columns.tolist()
+    for name in parsed.columns:
+        if isinstance(cached[name].dtype, pd.CategoricalDtype):
+            # nominal columns are categoricals over the cached codes
+            assert cached[name].astype(object).fillna("").tolist() == parsed[name].astype(object).fillna("").tolist()
+        else:
+            assert cached[name].dtype == parsed[name].dtype
+            np.testing.assert_array_equal(cached[name].to_numpy(), parsed[name].to_numpy())
+
+
+def test_programs_give_the_same_outputs_with_the_cache(directory, monkeypatch):
+    expected = run_programs(monkeypatch)
+    columnar_cache.write_cache("house-prices.csv")
+    outputs = run_programs(monkeypatch)
+    assert sorted(outputs) == sorted(expected)
+    for name in expected:
+        assert outputs[name] == expected[name], name
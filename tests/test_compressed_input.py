@@ -0,0 +1,67 @@
+"""Tests of compressed_input.py: the programs give the same outputs on a compressed file as on the plain file."""
+
+import os
+import sys
+
+import pytest
+
+import column_profile
+import compressed_input
+import count_missing_rows
+import drop_duplicates
+import drop_missing_data_cols
+import drop_missing_data_rows
+import feature_scaling
+import fill_missing_values
+import solve_equation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The programs and their arguments, with {} for the input path
+PROGRAMS = [
+    (drop_duplicates, ["{}", "--keep=last"]),
+    (drop_missing_data_cols, ["{}", "0.5"]),
+    (drop_missing_data_rows, ["--in={}", "--percent=5"]),
+    (drop_missing_data_rows, ["--in={}", "--percent=5", "--chunksize=70", "--out=output_chunks.csv"]),
+    (fill_missing_values, ["--in={}", "--out=output_fill.csv"]),
+    (fill_missing_values, ["--in={}", "--chunksize=70", "--out=output_fill_chunks.csv"]),
+    (feature_scaling, ["{}", "LotArea,MSSubClass", "all", "--chunksize=70"]),
+    (solve_equation, ["{}", "LotArea*2+MSSubClass"]),
+]
+
+
+def run_programs(directory, path: str, monkeypatch) -> 'dict':
+    """Run the programs in a directory and return their outputs and the count of rows with missing data."""
+    monkeypatch.chdir(directory)
+    for module, args in PROGRAMS:
+        monkeypatch.setattr(sys, "argv", [module.__name__ + ".py"] + [arg.format(path) for arg in args])
+        assert module.main() == 0, module.__name__
+    monkeypatch.setattr(sys, "argv", ["count_missing_rows.py", path, "--chunksize=70"])
+    assert count_missing_rows.main() == 0
+    outputs = {name: (directory / name).read_bytes() for name in os.listdir(directory) if name.startswith("output_")}
+    outputs["count_missing_rows"] = count_missing_rows.summary
+    return outputs
+
+
+@pytest.mark.parametrize("extension", [".gz", ".bz2", ".xz"])
+def test_compressed_outputs_match_plain(tmp_path, monkeypatch, extension):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    # small blocks, so that records are split between blocks
+    monkeypatch.setattr(compressed_input, "BLOCK_BYTES", 4096)
+    monkeypatch.setattr(compressed_input, "QUEUE_BLOCKS", 2)
+    with open(os.path.join(ROOT, "house-prices.csv"), "rb") as file:
+        lines = file.readlines()[:301]
+    data = b"".join(lines + lines[1:50])
+    plain, compressed = tmp_path / "plain", tmp_path / "compressed"
+    plain.mkdir()
+    compressed.mkdir()
+    (plain / "a.csv").write_bytes(data)
+    with compressed_input.COMPRESSIONS[extension](str(compressed / ("a.csv" + extension)), "wb") as file:
+        file.write(data)
+    with compressed_input.open_input(str(compressed / ("a.csv" + extension)), "rb") as file:
+        assert file.read() == data
+    expected = run_programs(plain, "a.csv", monkeypatch)
+    outputs = run_programs(compressed, "a.csv" + extension, monkeypatch)
+    assert sorted(outputs) == sorted(expected)
+    for name in expected:
+        assert outputs[name] == expected[name], name
@@ -0,0 +1,36 @@
+"""Tests of count_missing_rows.py: the streamed counts match the counts of the whole table."""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import column_profile
+import count_missing_rows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "NA" only appears in the last rows, so the column is numeric in the first chunks
+MIXED = 'a,b,c\n1,x,\n2,,3\n3,y,4\n4,z,5\n5,NA,NA\n6,w,7\n,v,8\n'
+
+
+def data_path(name: str, tmp_path) -> str:
+    if name == "mixed.csv":
+        (tmp_path / name).write_text(MIXED)
+        return str(tmp_path / name)
+    return os.path.join(ROOT, name)
+
+
+@pytest.mark.parametrize("name, option", [
+    ("house-prices.csv", "--chunksize=500"), ("house-prices.csv", "--chunksize=100000"),
+    ("house-prices.csv", "--workers=2"), ("mixed.csv", "--chunksize=1"), ("mixed.csv", "--chunksize=3"),
+    ("mixed.csv", "--workers=2"),
+])
+def test_streamed_count_matches_whole_table(tmp_path, monkeypatch, name, option):
+    path = data_path(name, tmp_path)
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.setattr(sys, "argv", ["count_missing_rows.py", path, option])
+    assert count_missing_rows.main() == 0
+    df = pd.read_csv(path)
+    assert count_missing_rows.summary == {"rows": len(df), "missing_rows": count_missing_rows.count_missing_rows(df)}
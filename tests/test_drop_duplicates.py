@@ -0,0 +1,144 @@
+"""Tests of the fingerprint index and of the modes of drop_duplicates.py."""
+
+import csv
+import random
+import sys
+
+import pytest
+
+import drop_duplicates as dd
+from drop_duplicates import FingerprintIndex, drop_duplicates, encode_key, key_digest
+
+# two digests sharing their fingerprint, the low 64 bits, but not their high 64 bits
+FIRST = (1 << 64) | 42
+SECOND = (2 << 64) | 42
+
+
+def index_of(keys: 'list[bytes]', **options) -> FingerprintIndex:
+    """Build an index whose positions are indices in the list of keys."""
+    return FingerprintIndex(keys.__getitem__, **options)
+
+
+def test_forced_fingerprint_collision_keeps_both_keys():
+    keys = [b'first', b'second']
+    index = index_of(keys)
+    assert index.add(b'first', FIRST, 0, 0)
+    assert index.add(b'second', SECOND, 1, 1)
+    assert not index.add(b'first', FIRST, 0, 2)
+    assert not index.add(b'second', SECOND, 1, 3)
+    assert not index.add(b'second', SECOND, 1, 4)
+    assert index.lookup(b'first', FIRST) == (2, 2)
+    assert index.lookup(b'second', SECOND) == (4, 3)
+    assert index.size == 1
+    assert len(index.overflow) == 1
+
+
+def test_equal_digests_are_compared_exactly():
+    # a full 128-bit collision between two different keys
+    keys = [b'first', b'second']
+    index = index_of(keys)
+    assert index.add(b'first', FIRST, 0, 0)
+    assert index.add(b'second', FIRST, 1, 1)
+    assert not index.add(b'second', FIRST, 1, 2)
+    assert not index.add(b'first', FIRST, 0, 3)
+    assert index.lookup(b'first', FIRST) == (3, 2)
+    assert index.lookup(b'second', FIRST) == (2, 2)
+
+
+def test_collisions_survive_growth():
+    digests = [(high << 64) | low for low in range(0, 20) for high in (1, 2)]
+    keys = [str(digest).encode() for digest in digests]
+    index = index_of(keys, capacity=4)
+    assert all(index.add(key, digest, i, i) for i, (key, digest) in enumerate(zip(keys, digests)))
+    assert not any(index.add(key, digest, i, len(keys) + i) for i, (key, digest) in enumerate(zip(keys, digests)))
+    for i, (key, digest) in enumerate(zip(keys, digests)):
+        assert index.lookup(key, digest) == (len(keys) + i, 2)
+
+
+def test_zero_fingerprint_is_not_an_empty_slot():
+    keys = [b'zero', b'one']
+    index = index_of(keys)
+    assert index.add(b'zero', 5 << 64, 0, 0)
+    assert index.add(b'one', (5 << 64) | 1, 1, 1)
+    assert not index.add(b'zero', 5 << 64, 0, 2)
+    assert index.lookup(b'zero', 5 << 64) == (2, 2)
+    assert index.lookup(b'one', (5 << 64) | 1) == (1, 1)
+
+
+def test_repeated_keys_are_fetched_once():
+    fetched = []
+
+    def fetch(position):
+        fetched.append(position)
+        return b'key'
+
+    index = FingerprintIndex(fetch)
+    digest = key_digest(b'key')
+    assert index.add(b'key', digest, 0, 0)
+    for rownum in range(1, 100):
+        assert not index.add(b'key', digest, 0, rownum)
+    assert fetched == [0]
+
+
+def test_encoding_is_unambiguous():
+    assert encode_key(('a\x1fb', 'c')) != encode_key(('a', 'b\x1fc'))
+    assert encode_key(('ab', '')) != encode_key(('a', 'b'))
+    assert encode_key(('a', 'b')) == encode_key(('a', 'b'))
+
+
+def test_drop_duplicates_keep():
+    data = [['a', '1'], ['b', '2'], ['a', '1'], ['c', '2'], ['a', '3']]
+    assert drop_duplicates(data) == [['a', '1'], ['b', '2'], ['c', '2'], ['a', '3']]
+    assert drop_duplicates(data, keep='last') == [['b', '2'], ['a', '1'], ['c', '2'], ['a', '3']]
+    assert drop_duplicates(data, keep='none') == [['b', '2'], ['c', '2'], ['a', '3']]
+    assert drop_duplicates(data, columns=[1]) == [['a', '1'], ['b', '2'], ['a', '3']]
+
+
+def test_separator_in_values_is_not_a_duplicate(tmp_path):
+    inputpath = tmp_path / 'a.csv'
+    inputpath.write_text('x,y\na\x1fb,c\na,b\x1fc\n')
+    outputpath = tmp_path / 'out.csv'
+    dd.drop_duplicates_file(str(inputpath), str(outputpath))
+    assert outputpath.read_text() == inputpath.read_text()
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', 'none'])
+def test_forced_collisions_in_a_file(tmp_path, monkeypatch, keep):
+    # every key gets the same digest, so only the exact comparison tells them apart
+    monkeypatch.setattr(dd, 'key_digest', lambda key: 7)
+    rows = [['a', '1'], ['b', '2'], ['a', '1'], ['"c\nd"', '2'], ['b', '2']]
+    inputpath = tmp_path / 'a.csv'
+    inputpath.write_text('x,y\n' + ''.join(','.join(row) + '\n' for row in rows))
+    outputpath = tmp_path / 'out.csv'
+    dd.drop_duplicates_file(str(inputpath), str(outputpath), keep=keep)
+    parsed = [[value.strip('"') for value in row] for row in rows]
+    expected = drop_duplicates(parsed, keep=keep)
+    assert outputpath.read_text() == 'x,y\n' + ''.join(
+        ','.join('"' + value + '"' if '\n' in value else value for value in row) + '\n' for row in expected)
+
+
+def read_rows(path) -> 'list[list[str]]':
+    with open(path, newline='') as file:
+        return list(csv.reader(file))
+
+
+@pytest.mark.parametrize('keep', ['first', 'last', 'none'])
+@pytest.mark.parametrize('subset', [None, 'x', 'y,x'])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_external_matches_in_memory(tmp_path, monkeypatch, keep, subset, workers):
+    rng = random.Random(0)
+    values = ['a', 'b', '1', '1.0', '', '"q,\nr"']
+    rows = [[rng.choice(values) for _ in range(3)] for _ in range(300)]
+    (tmp_path / 'a.csv').write_text('x,y,z\n' + ''.join(','.join(row) + '\n' for row in rows))
+    monkeypatch.chdir(tmp_path)
+    options = ['--keep=' + keep, '--workers=' + str(workers)] + ([] if subset is None else ['--subset=' + subset])
+    # a tiny memory budget hashes the rows into many partitions
+    monkeypatch.setattr(sys, 'argv', ['drop_duplicates.py', 'a.csv', '--memory=0.001'] + options)
+    assert dd.main() == 0
+    external = read_rows('output_drop_duplicates_a.csv')
+    monkeypatch.setattr(sys, 'argv', ['drop_duplicates.py', 'a.csv'] + options)
+    assert dd.main() == 0
+    assert read_rows('output_drop_duplicates_a.csv') == external
+    data = read_rows('a.csv')
+    columns = dd.subset_columns(data[0], None if subset is None else subset.split(','))
+    assert external == data[:1] + drop_duplicates(data[1:], columns, keep)
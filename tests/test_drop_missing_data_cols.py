@@ -0,0 +1,49 @@
+"""Tests of drop_missing_data_cols.py: the sequential and the parallel modes give the same file."""
+
+import os
+from functools import partial
+
+import pytest
+
+import drop_missing_data_cols as dmc
+from parallel_csv import map_ranges
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLANK_LINES = 'a,b\n1,\n2,y\n3,y\n\n\n\n'
+QUOTED = 'id,note,value\n1,"two\nlines",\n2,,x\n\n3,"a ""b""",\n4,plain\n5,,y\n'
+
+
+@pytest.mark.parametrize("text, percentage, removed", [
+    (BLANK_LINES, 0.5, []),
+    (BLANK_LINES, 0.3, ['b']),
+    (QUOTED, 0.5, ['value']),
+    (QUOTED, 0.6, []),
+])
+@pytest.mark.parametrize("step", [1, 8, 10 ** 6])
+def test_workers_match_sequential(tmp_path, monkeypatch, text, percentage, removed, step):
+    monkeypatch.setattr(dmc, "map_ranges", partial(map_ranges, step=step))
+    path = tmp_path / "a.csv"
+    path.write_text(text, newline='')
+    sequential, parallel = tmp_path / "sequential.csv", tmp_path / "parallel.csv"
+    assert dmc.drop_missing_cols_file(str(path), str(sequential), percentage) == removed
+    assert dmc.drop_missing_cols_parallel(str(path), str(parallel), percentage, 2) == removed
+    assert parallel.read_bytes() == sequential.read_bytes()
+
+
+def test_blank_lines_are_not_rows(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text(BLANK_LINES, newline='')
+    output = tmp_path / "output.csv"
+    dmc.drop_missing_cols_file(str(path), str(output), 0.5)
+    assert output.read_text().splitlines() == ['a,b', '1,', '2,y', '3,y']
+
+
+@pytest.mark.parametrize("percentage", [0, 0.05, 0.5, 1])
+def test_workers_match_sequential_on_house_prices(tmp_path, monkeypatch, percentage):
+    monkeypatch.setattr(dmc, "map_ranges", partial(map_ranges, step=16 * 1024))
+    path = os.path.join(ROOT, "house-prices.csv")
+    sequential, parallel = tmp_path / "sequential.csv", tmp_path / "parallel.csv"
+    removed = dmc.drop_missing_cols_file(path, str(sequential), percentage)
+    assert dmc.drop_missing_cols_parallel(path, str(parallel), percentage, 2) == removed
+    assert parallel.read_bytes() == sequential.read_bytes()
@@ -0,0 +1,55 @@
+"""Tests of drop_missing_data_rows.py: the vectorized ratios keep the rows of a row-by-row count."""
+
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_profile
+import drop_missing_data_rows as dmr
+
+PERCENTS = [0, 1, 25, 40, 50, 75, 100]
+
+
+def is_missing(value) -> bool:
+    return value != value or value is None or value == ''
+
+
+def kept_rows(rows: 'list[list]', percent: int) -> 'list[list]':
+    """Keep the rows like the original program, counting the missing cells of each row one by one."""
+    kept = []
+    for row in rows:
+        missingPercent = sum(is_missing(value) for value in row) / len(row) * 100
+        if (missingPercent == 0) if percent == 0 else (missingPercent < percent):
+            kept.append(row)
+    return kept
+
+
+@pytest.fixture
+def rows() -> 'list[list]':
+    rng = random.Random(0)
+    return [[str(i)] + [rng.choice(['', 'x', '1.5', None, float('nan')]) for _ in range(4)] for i in range(200)]
+
+
+@pytest.mark.parametrize("percent", PERCENTS)
+def test_vectorized_matches_row_by_row(rows, percent):
+    expected = kept_rows(rows, percent)
+    assert dmr.drop_missing_rows(rows, percent) == expected
+    df = pd.DataFrame(rows, columns=["id", "a", "b", "c", "d"])
+    assert dmr.drop_missing_rows(df, percent)["id"].tolist() == [row[0] for row in expected]
+
+
+@pytest.mark.parametrize("percent", PERCENTS)
+def test_streamed_modes_keep_the_same_rows(tmp_path, monkeypatch, rows, percent):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.chdir(tmp_path)
+    text = [['' if is_missing(value) else value for value in row] for row in rows]
+    pd.DataFrame(text, columns=["id", "a", "b", "c", "d"]).to_csv("a.csv", index=False)
+    expected = [int(row[0]) for row in kept_rows(text, percent)]
+    for option in ["--chunksize=7", "--workers=2", None]:
+        args = ["drop_missing_data_rows.py", "--in=a.csv", "--out=out.csv", "--percent=" + str(percent)]
+        monkeypatch.setattr(sys, "argv", args + ([] if option is None else [option]))
+        assert dmr.main() == 0
+        assert np.array_equal(pd.read_csv("out.csv")["id"].to_numpy(), expected), option
@@ -0,0 +1,114 @@
+"""Tests of the expression engine of expression.py."""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import expression
+from expression import evaluate, evaluate_all, parse_expression, parse_expressions, shared_subtrees, tokenize
+
+COLUMNS = ["LotArea", "1stFlrSF", "Lot Area", "Missing"]
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"LotArea": [8450, 9600, 11250], "1stFlrSF": [856, 1262, 920],
+                         "Lot Area": [1, 2, 3], "Missing": [1.0, np.nan, 0.0]})
+
+
+def test_tokenize():
+    assert tokenize("1stFlrSF*2.5e1 // `Lot Area`") == [
+        ("name", "1stFlrSF"), ("op", "*"), ("number", "2.5e1"), ("op", "//"), ("name", "Lot Area"), ("end", "")]
+    assert tokenize("a<=-.5") == [("name", "a"), ("op", "<="), ("op", "-"), ("number", ".5"), ("end", "")]
+
+
+def test_parse_precedence():
+    assert parse_expression("LotArea + 1stFlrSF * 2", COLUMNS) == (
+        "binop", "+", ("col", "LotArea"), ("binop", "*", ("col", "1stFlrSF"), ("num", 2)))
+    # ** binds tighter than unary minus and is right associative
+    assert parse_expression("-2 ** -1", COLUMNS) == (
+        "neg", ("binop", "**", ("num", 2), ("neg", ("num", 1))))
+    assert parse_expression("(LotArea - 1) / 2 > 3", COLUMNS) == (
+        "binop", ">", ("binop", "/", ("binop", "-", ("col", "LotArea"), ("num", 1)), ("num", 2)), ("num", 3))
+    assert parse_expression("max(LotArea, 0.5)", COLUMNS) == (
+        "call", "max", (("col", "LotArea"), ("num", 0.5)))
+
+
+@pytest.mark.parametrize("text, message", [
+    ("LotArea $ 2", "Unexpected character '$'"),
+    ("GarageArea * 2", "Unknown column or function: GarageArea"),
+    ("(LotArea + 1", "Expected ')'"),
+    ("LotArea +", "Unexpected end of equation"),
+    ("LotArea 2", "Unexpected '2'"),
+    ("log(LotArea, 2)", "log() takes 1 argument(s)"),
+    ("__import__(LotArea)", "Unknown column or function: __import__"),
+])
+def test_parse_errors(text, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_expression(text, COLUMNS)
+
+
+def test_evaluate(df):
+    result = evaluate(parse_expression("LotArea // 2 + `Lot Area` % 2", df.columns), df)
+    np.testing.assert_array_equal(result, [4226, 4800, 5626])
+    assert evaluate(parse_expression("2 ** 3", df.columns), df) == 8
+
+
+def test_missing_values_propagate(df):
+    np.testing.assert_array_equal(evaluate(parse_expression("Missing + 1", df.columns), df), [2, np.nan, 1])
+    np.testing.assert_array_equal(evaluate(parse_expression("Missing > 0", df.columns), df), [1, np.nan, 0])
+
+
+def test_integer_division_by_zero_is_missing(df):
+    divisor = "(`Lot Area` - 2)"
+    np.testing.assert_array_equal(
+        evaluate(parse_expression("LotArea // " + divisor, df.columns), df), [-8450, np.nan, 11250])
+    np.testing.assert_array_equal(
+        evaluate(parse_expression("LotArea % " + divisor, df.columns), df), [0, np.nan, 0])
+    np.testing.assert_array_equal(
+        evaluate(parse_expression("LotArea // 0", df.columns), df), [np.nan] * 3)
+
+
+def test_float_division_by_zero_is_missing(df):
+    # NumPy gives inf for 7.0 // 0 and NaN for 7.0 % 0
+    np.testing.assert_array_equal(evaluate(parse_expression("7.0 // Missing", df.columns), df), [7, np.nan, np.nan])
+    np.testing.assert_array_equal(evaluate(parse_expression("7.5 % Missing", df.columns), df), [0.5, np.nan, np.nan])
+    np.testing.assert_array_equal(evaluate(parse_expression("Missing // 0.0", df.columns), df), [np.nan] * 3)
+    # true division keeps the infinity
+    np.testing.assert_array_equal(evaluate(parse_expression("7.0 / Missing", df.columns), df), [7, np.nan, np.inf])
+
+
+def test_named_equations_are_inlined():
+    parsed = parse_expressions([("A", "LotArea * 2"), ("B", "A + 1")], COLUMNS)
+    assert parsed == [("A", ("binop", "*", ("col", "LotArea"), ("num", 2))),
+                      ("B", ("binop", "+", ("binop", "*", ("col", "LotArea"), ("num", 2)), ("num", 1)))]
+    with pytest.raises(ValueError, match="^B: Unknown column or function: C$"):
+        parse_expressions([("A", "LotArea"), ("B", "C + 1")], COLUMNS)
+
+
+def test_shared_subtrees():
+    trees = [tree for _, tree in parse_expressions(
+        [("A", "log(LotArea + 1) * 2"), ("B", "log(LotArea + 1) - LotArea"), ("C", "LotArea + 1")], COLUMNS)]
+    total = ("binop", "+", ("col", "LotArea"), ("num", 1))
+    # the sum is shared by the first log and C, not again by the repeated log; columns and numbers are skipped
+    assert shared_subtrees(trees) == {("call", "log", (total,)), total}
+    assert shared_subtrees(trees[:2]) == {("call", "log", (total,))}
+    assert shared_subtrees([parse_expression("LotArea + LotArea", COLUMNS)]) == set()
+
+
+def test_shared_subtrees_are_evaluated_once(df, monkeypatch):
+    calls = []
+
+    def log(values):
+        calls.append(values)
+        return np.log(values)
+
+    monkeypatch.setitem(expression.FUNCTIONS, "log", (log, 1))
+    trees = [tree for _, tree in parse_expressions(
+        [("A", "log(LotArea) * 2"), ("B", "A + log(LotArea)")], df.columns)]
+    first, second = evaluate_all(trees, df)
+    assert len(calls) == 1
+    np.testing.assert_allclose(second, np.log(df["LotArea"]) * 3)
+    np.testing.assert_allclose(first, np.log(df["LotArea"]) * 2)
@@ -0,0 +1,51 @@
+"""Tests of feature_scaling.py: the streamed statistics scale like the whole columns."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_profile
+import feature_scaling
+from column_profile import column_stats
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH = os.path.join(ROOT, "house-prices.csv")
+
+# LotFrontage has missing values, the others don't
+ATTRIBUTES = ["LotArea", "MSSubClass", "LotFrontage"]
+
+
+@pytest.mark.parametrize("chunksize", [3, 7, 500, 100000])
+def test_streamed_stats_match_whole_columns(chunksize):
+    df = pd.read_csv(PATH, usecols=ATTRIBUTES)
+    stats = feature_scaling.fit_stats(PATH, ATTRIBUTES, chunksize)
+    assert list(stats) == ATTRIBUTES
+    for name in ATTRIBUTES:
+        whole = column_stats(df[name])
+        assert stats[name]["count"] == whole["count"]
+        for key in ("mean", "m2", "min", "max"):
+            assert stats[name][key] == pytest.approx(whole[key], rel=1e-12)
+
+
+@pytest.mark.parametrize("chunksize", [7, 100000])
+def test_several_attributes_scale_like_whole_columns(tmp_path, monkeypatch, chunksize):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["feature_scaling.py", PATH, ",".join(ATTRIBUTES), "all",
+                                      "--chunksize=" + str(chunksize)])
+    assert feature_scaling.main() == 0
+    output = pd.read_csv(tmp_path / ("output_feature_scaling_" + ",".join(ATTRIBUTES) + "_house-prices.csv"))
+    df = pd.read_csv(PATH, usecols=ATTRIBUTES)
+    columns = []
+    for name in ATTRIBUTES:
+        values = df[name]
+        columns += [name, name + " Min-max Scaling", name + " Z-Score"]
+        np.testing.assert_array_equal(output[name], values)
+        np.testing.assert_allclose(output[name + " Min-max Scaling"],
+                                   (values - values.min()) / (values.max() - values.min()), rtol=1e-12)
+        np.testing.assert_allclose(output[name + " Z-Score"], (values - values.mean()) / values.std(ddof=0),
+                                   rtol=1e-9)
+    assert output.columns.tolist() == columns
@@ -0,0 +1,52 @@
+"""Tests of fill_missing_values.py."""
+
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_profile
+import fill_missing_values
+from fill_missing_values import count_values
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_count_values_of_categorical_matches_list(seed):
+    rng = np.random.default_rng(seed)
+    values = list(rng.choice(["a", "b", "c", "d", "e"], size=200))
+    # unused categories are not counted
+    categorical = pd.Categorical(values, categories=["e", "z", "d", "c", "b", "a"])
+    uniques, counts = count_values(categorical)
+    expected = pd.Series(values).value_counts(sort=False)
+    assert list(uniques) == list(dict.fromkeys(values))
+    assert counts.tolist() == expected[list(uniques)].tolist()
+    listUniques, listCounts = count_values(values)
+    assert list(listUniques) == list(uniques)
+    assert listCounts.tolist() == counts.tolist()
+
+
+# "other" and "ratio" are not filled: they are read as integers in the first chunk of 3 rows and as floats later
+CHUNKED = ('id,fill,other,ratio,name\n1,10,5,1,a\n2,,6,2,b\n3,30,7,3,\n'
+           '4,40,,4,c\n5,,9,4.5,d\n6,60,10,5,e\n7,70,11,6,f\n')
+
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["fill_missing_values.py", "--in=a.csv"] + list(args))
+    assert fill_missing_values.main() == 0
+
+
+@pytest.mark.parametrize("profiled", [False, True])
+def test_chunked_output_matches_whole_file_outside_attributes(tmp_path, monkeypatch, profiled):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(column_profile, "CACHE_DIR", str(tmp_path / "cache") if profiled else "")
+    (tmp_path / "a.csv").write_text(CHUNKED)
+    if profiled:
+        column_profile.get_profile("a.csv")
+    run_main(monkeypatch, "--out=whole.csv", "--attributes=1,4", "--fit=params.json")
+    run_main(monkeypatch, "--out=chunked.csv", "--attributes=1,4", "--chunksize=3")
+    run_main(monkeypatch, "--out=transformed.csv", "--attributes=1,4", "--chunksize=3", "--transform=params.json")
+    whole = (tmp_path / "whole.csv").read_text()
+    assert "\n4,40.0,,4.0,c\n" in whole
+    assert (tmp_path / "chunked.csv").read_text() == whole
+    assert (tmp_path / "transformed.csv").read_text() == whole
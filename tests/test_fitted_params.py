@@ -0,0 +1,71 @@
+"""Tests of the --fit and --transform modes of feature_scaling.py and fill_missing_values.py."""
+
+import sys
+
+import numpy as np
+import pytest
+
+import column_profile
+import feature_scaling
+import fill_missing_values
+from fitted_params import load_params, save_params
+
+REFERENCE = 'a,b,name\n1,10.5,x\n2,,y\n3,30,\n4,40,x\n,50,y\n6,60,x\n'
+OTHER = 'a,b,name\n10,,\n,1,z\n-5,2.5,\n'
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "reference.csv").write_text(REFERENCE)
+    (tmp_path / "other.csv").write_text(OTHER)
+    return tmp_path
+
+
+def run(monkeypatch, module, *args):
+    monkeypatch.setattr(sys, "argv", [module.__name__ + ".py"] + list(args))
+    assert module.main() == 0
+
+
+def test_params_round_trip(tmp_path):
+    columns = {"a": {"count": np.int64(3), "mean": np.float64(2.5), "min": 1, "max": None}}
+    save_params(str(tmp_path / "params.json"), "feature_scaling", columns)
+    loaded = load_params(str(tmp_path / "params.json"), "feature_scaling")
+    assert loaded == {"a": {"count": 3, "mean": 2.5, "min": 1, "max": None}}
+    with pytest.raises(ValueError):
+        load_params(str(tmp_path / "params.json"), "fill_missing_values")
+
+
+@pytest.mark.parametrize("chunksize", ["2", "100000"])
+def test_feature_scaling_transform_of_fitted_file_matches_fit(files, monkeypatch, chunksize):
+    output = files / "output_feature_scaling_a,b_reference.csv"
+    run(monkeypatch, feature_scaling, "reference.csv", "a,b", "all", "--chunksize=" + chunksize, "--fit=scaler.json")
+    fitted = output.read_text()
+    run(monkeypatch, feature_scaling, "reference.csv", "a,b", "all", "--chunksize=" + chunksize,
+        "--transform=scaler.json")
+    assert output.read_text() == fitted
+
+
+def test_feature_scaling_transform_uses_fitted_stats(files, monkeypatch):
+    run(monkeypatch, feature_scaling, "reference.csv", "a", "minmaxscale", "--fit=scaler.json")
+    run(monkeypatch, feature_scaling, "other.csv", "a", "minmaxscale", "--transform=scaler.json")
+    lines = (files / "output_feature_scaling_a_other.csv").read_text().splitlines()
+    # the reference a spans 1 to 6
+    assert lines == ["a,Min-max Scaling", "10.0,1.8", ",", "-5.0,-1.2"]
+
+
+@pytest.mark.parametrize("chunksize", [[], ["--chunksize=2"]])
+def test_fill_missing_values_transform_of_fitted_file_matches_fit(files, monkeypatch, chunksize):
+    run(monkeypatch, fill_missing_values, "--in=reference.csv", "--out=fitted.csv", "--fit=imputer.json", *chunksize)
+    run(monkeypatch, fill_missing_values, "--in=reference.csv", "--out=transformed.csv", "--transform=imputer.json",
+        *chunksize)
+    assert (files / "transformed.csv").read_text() == (files / "fitted.csv").read_text()
+
+
+def test_fill_missing_values_transform_uses_fitted_fillers(files, monkeypatch):
+    run(monkeypatch, fill_missing_values, "--in=reference.csv", "--out=fitted.csv", "--fit=imputer.json")
+    run(monkeypatch, fill_missing_values, "--in=other.csv", "--out=transformed.csv", "--transform=imputer.json")
+    # the mean of the reference a and b, and the mode of its names
+    assert (files / "transformed.csv").read_text().splitlines() == [
+        "a,b,name", "10.0,38.1,x", "3.2,1.0,z", "-5.0,2.5,x"]
@@ -0,0 +1,40 @@
+"""Tests of list_missing_cols.py: the streamed counts match the counts of the whole table."""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+import column_profile
+import list_missing_cols
+from missing_mask import missing_mask
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "NA" only appears in the last rows, so the column is numeric in the first chunks
+MIXED = 'a,b,c\n1,x,\n2,,3\n3,y,4\n4,z,5\n5,NA,NA\n6,w,7\n,v,8\n'
+
+
+def data_path(name: str, tmp_path) -> str:
+    if name == "mixed.csv":
+        (tmp_path / name).write_text(MIXED)
+        return str(tmp_path / name)
+    return os.path.join(ROOT, name)
+
+
+@pytest.mark.parametrize("name, option", [
+    ("house-prices.csv", "--chunksize=500"), ("house-prices.csv", "--chunksize=100000"),
+    ("house-prices.csv", "--workers=2"), ("mixed.csv", "--chunksize=1"), ("mixed.csv", "--chunksize=3"),
+    ("mixed.csv", "--workers=2"),
+])
+def test_streamed_counts_match_whole_table(tmp_path, monkeypatch, name, option):
+    path = data_path(name, tmp_path)
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.setattr(sys, "argv", ["list_missing_cols.py", path, option])
+    assert list_missing_cols.main() == 0
+    df = pd.read_csv(path)
+    counts = missing_mask(df).sum(axis=0)
+    assert list_missing_cols.summary == {"missing": dict(zip(df.columns, counts.tolist()))}
+    missing = [name for name, count in list_missing_cols.summary["missing"].items() if count > 0]
+    assert missing == [name for _, name in list_missing_cols.list_missing_cols(df, df.columns.tolist())]
@@ -0,0 +1,79 @@
+"""Tests of output_writer.py: every format holds the same table as the csv output."""
+
+import csv
+import gzip
+import importlib.util
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from output_writer import FormatError, TableWriter, write_table
+
+NUMERIC = pd.DataFrame({"a": [1, 2, 3, 4, 5], "b": [0.5, np.nan, 2.25, -1.0, 1e10]})
+TEXT = pd.DataFrame({"a": [1, 2, 3], "name": ["x", None, "y,\"z\""]})
+
+ARROW = [pytest.param(name, marks=pytest.mark.skipif(importlib.util.find_spec("pyarrow") is None,
+                                                     reason="needs pyarrow")) for name in ("parquet", "feather")]
+
+
+def csv_text(df: 'pd.DataFrame') -> str:
+    return df.to_csv(index=False)
+
+
+def write_parts(path: str, out_format: str, df: 'pd.DataFrame', mode: str):
+    """Write a table in several parts, as data frames, rows of text or csv text."""
+    with TableWriter(path, out_format) as writer:
+        if mode == "frames":
+            for start in range(0, len(df), 2):
+                writer.write_frame(df.iloc[start:start + 2])
+            return
+        rows = list(csv.reader(io.StringIO(csv_text(df), newline="")))
+        writer.write_header(rows[0])
+        if mode == "rows":
+            writer.write_rows(rows[1:])
+        else:
+            for start in range(1, len(rows), 2):
+                text = io.StringIO()
+                csv.writer(text).writerows(rows[start:start + 2])
+                writer.write_text(text.getvalue())
+
+
+def read_back(path: str, out_format: str) -> 'pd.DataFrame':
+    if out_format == "csv.gz":
+        return pd.read_csv(path, compression="gzip")
+    if out_format == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_feather(path)
+
+
+@pytest.mark.parametrize("mode", ["frames", "rows", "text"])
+def test_csv_gz_holds_the_csv_bytes(tmp_path, mode):
+    write_parts(str(tmp_path / "a.csv"), "csv", TEXT, mode)
+    write_parts(str(tmp_path / "a.csv.gz"), "csv.gz:1", TEXT, mode)
+    with gzip.open(tmp_path / "a.csv.gz", "rb") as file:
+        assert file.read() == (tmp_path / "a.csv").read_bytes()
+
+
+@pytest.mark.parametrize("mode", ["frames", "rows", "text"])
+def test_npy_holds_the_csv_values(tmp_path, mode):
+    write_parts(str(tmp_path / "a.npy"), "npy", NUMERIC, mode)
+    np.testing.assert_array_equal(np.load(tmp_path / "a.npy"), NUMERIC.to_numpy(dtype=float))
+    write_table(NUMERIC.iloc[:0], str(tmp_path / "empty.npy"), "npy")
+    assert np.load(tmp_path / "empty.npy").shape == (0, 2)
+
+
+def test_npy_rejects_text_columns(tmp_path):
+    with pytest.raises(FormatError):
+        write_table(TEXT, str(tmp_path / "a.npy"), "npy")
+    assert not (tmp_path / "a.npy").exists()
+
+
+@pytest.mark.parametrize("out_format", ARROW)
+@pytest.mark.parametrize("mode", ["frames", "rows", "text"])
+def test_columnar_formats_hold_the_csv_table(tmp_path, out_format, mode):
+    path = str(tmp_path / ("a." + out_format))
+    write_parts(path, out_format, TEXT, mode)
+    expected = pd.read_csv(io.StringIO(csv_text(TEXT)), dtype=str if mode != "frames" else None)
+    pd.testing.assert_frame_equal(read_back(path, out_format), expected, check_dtype=False)
@@ -0,0 +1,108 @@
+"""Tests of the byte-range splitting of parallel_csv.py."""
+
+import csv
+import io
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import parallel_csv
+from parallel_csv import count_missing_parallel, read_range, record_boundaries
+
+HEADER = b'id,note,value\n'
+
+
+def write_records(path, rows: int) -> bytes:
+    """Write a csv file whose quoted notes hold newlines, escaped quotes and commas."""
+    lines = [HEADER]
+    for i in range(rows):
+        note = '"line one\nline ""two""\n, three"' if i % 3 == 0 else 'plain'
+        value = '' if i % 4 == 0 else str(i)
+        lines.append((str(i) + ',' + note + ',' + value + '\n').encode())
+    data = b''.join(lines)
+    path.write_bytes(data)
+    return data
+
+
+@pytest.mark.parametrize("step", [1, 7, 16, 100, 10 ** 6])
+@pytest.mark.parametrize("blocksize", [5, 64, 16 * 1024 * 1024])
+def test_boundaries_never_cut_quoted_newlines(tmp_path, monkeypatch, step, blocksize):
+    monkeypatch.setattr(parallel_csv, "BLOCKSIZE", blocksize)
+    path = tmp_path / "a.csv"
+    data = write_records(path, 50)
+    expected = list(csv.reader(io.StringIO(data.decode(), newline='')))
+    boundaries = record_boundaries(str(path), step)
+    assert boundaries[0] == len(HEADER)
+    assert boundaries[-1] == len(data)
+    assert boundaries == sorted(set(boundaries))
+    records = [expected[0]]
+    for start, end in zip(boundaries, boundaries[1:]):
+        # every range holds whole records
+        records += list(csv.reader(io.StringIO(read_range(str(path), start, end).decode(), newline='')))
+    assert records == expected
+
+
+def test_file_without_final_newline(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_bytes(HEADER + b'1,"a\nb",2\n2,c,3')
+    boundaries = record_boundaries(str(path), 1)
+    assert boundaries == [len(HEADER), len(HEADER) + 10, len(HEADER) + 15]
+
+
+def test_count_missing_matches_sequential(tmp_path):
+    path = tmp_path / "a.csv"
+    write_records(path, 200)
+    colnames, colCounts, missingRows, rows = count_missing_parallel(str(path), workers=2, step=64)
+    assert colnames == ['id', 'note', 'value']
+    assert colCounts.tolist() == [0, 0, 50]
+    assert (missingRows, rows) == (50, 200)
+
+
+def serial_boundaries(data: bytes, step: int) -> 'list[int]':
+    """The first unquoted newline after every multiple of step, found by counting the quotes from the start."""
+    ends = []
+    quotes = 0
+    for position, byte in enumerate(data):
+        quotes += byte == ord('"')
+        if byte == ord('\n') and quotes % 2 == 0:
+            ends.append(position + 1)
+    boundaries = []
+    for target in range(0, len(data), step):
+        boundary = next((end for end in ends if end > target), len(data))
+        if len(boundaries) == 0 or boundary > boundaries[-1]:
+            boundaries.append(boundary)
+    if len(boundaries) == 0 or boundaries[-1] != len(data):
+        boundaries.append(len(data))
+    return boundaries
+
+
+class RecordingPool(ThreadPoolExecutor):
+    """A pool that records the blocks it scans."""
+
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.blocks = []
+
+    def map(self, function, *iterables):
+        self.blocks += list(zip(*iterables[1:3]))
+        return super().map(function, *iterables)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_blocks_scanned_in_pool_match_serial_count(tmp_path, monkeypatch, seed):
+    monkeypatch.setattr(parallel_csv, "BLOCKSIZE", 16)
+    rng = random.Random(seed)
+    # long quoted fields span several blocks, with escaped quotes and newlines
+    fields = ['a', '""', '"x\ny"', '"' + '\n' * 40 + '"', '"q""\n""q"', '7', '']
+    lines = [b'h1,h2\n'] + [(','.join(rng.choice(fields) for _ in range(2)) + '\n').encode() for _ in range(30)]
+    data = b''.join(lines)
+    path = tmp_path / "a.csv"
+    path.write_bytes(data)
+    for step in (1, 5, 16, 33, 1000):
+        with RecordingPool() as pool:
+            boundaries = record_boundaries(str(path), step, pool)
+        assert boundaries == serial_boundaries(data, step)
+        # every block is scanned once, by the pool
+        assert pool.blocks == [(start, min(start + 16, len(data))) for start in range(0, len(data), 16)]
+        assert record_boundaries(str(path), step) == boundaries
@@ -0,0 +1,47 @@
+"""Tests of pipeline.py against the programs of its steps, run one after the other."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STEPS = [{"step": "drop_duplicates"}, {"step": "drop_missing_data_cols", "percentage": 0.4}]
+
+
+def run(directory, *args):
+    env = dict(os.environ, PREPROCESSING_CACHE_DIR="")
+    subprocess.run([sys.executable, os.path.join(ROOT, args[0])] + list(args[1:]), cwd=str(directory), env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def pipeline_and_programs(directory, text: str) -> 'tuple[pd.DataFrame, pd.DataFrame]':
+    """Run the steps with pipeline.py and with drop_duplicates.py then drop_missing_data_cols.py."""
+    (directory / "a.csv").write_text(text)
+    (directory / "spec.json").write_text(json.dumps({"input": "a.csv", "output": "pipeline.csv", "steps": STEPS}))
+    run(directory, "pipeline.py", "spec.json")
+    run(directory, "drop_duplicates.py", "a.csv")
+    run(directory, "drop_missing_data_cols.py", "output_drop_duplicates_a.csv", "0.4")
+    chained = directory / "output_drop_missing_data_cols_output_drop_duplicates_a.csv"
+    return pd.read_csv(directory / "pipeline.csv"), pd.read_csv(chained)
+
+
+def test_same_as_programs(tmp_path):
+    pipeline, chained = pipeline_and_programs(tmp_path, 'id,code,note\n1,,x\n1,,x\n2,5,y\n2,5,y\n3,7,\n4,,z\n')
+    assert pipeline.columns.tolist() == ["id", "note"]
+    pd.testing.assert_frame_equal(pipeline, chained)
+
+
+def test_na_strings_and_numbers_differ_from_programs(tmp_path):
+    """The steps compare values, the programs compare text, see preprocessing.py."""
+    pipeline, chained = pipeline_and_programs(tmp_path, 'id,code,note\n1,NA,x\n1.0,NULL,x\n2,,y\n2,7,y\n3,7,\n')
+    # 1 and 1.0 are duplicates, NA and NULL are missing
+    assert pipeline.columns.tolist() == ["id", "note"]
+    assert pipeline["id"].tolist() == [1.0, 2.0, 2.0, 3.0]
+    # 1 and 1.0 are different rows, NA and NULL are data
+    assert chained.columns.tolist() == ["id", "code", "note"]
+    assert chained["id"].tolist() == [1.0, 1.0, 2.0, 2.0, 3.0]
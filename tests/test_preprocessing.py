@@ -0,0 +1,50 @@
+"""Tests of preprocessing.py against the drop_duplicates.py and drop_missing_data_cols.py programs,
+which work on the text of the csv fields."""
+
+import pandas as pd
+import pytest
+
+import preprocessing
+from drop_duplicates import drop_duplicates_file
+from drop_missing_data_cols import drop_missing_cols_file
+
+# "NA" and "NULL" are read as NaN by pandas, 1 and 1.0 are the same float
+TEXT = 'id,code,note\n1,NA,x\n1.0,NULL,x\n2,,y\n2,7,y\n3,7,\n'
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text(TEXT)
+    return path
+
+
+def read_text(path) -> 'pd.DataFrame':
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+@pytest.mark.parametrize("keep", ["first", "last", "none"])
+@pytest.mark.parametrize("subset", [None, ["id"], ["id", "note"]])
+def test_drop_duplicates_on_text_matches_program(tmp_path, path, keep, subset):
+    output = tmp_path / "output.csv"
+    drop_duplicates_file(str(path), str(output), subset, keep)
+    result = preprocessing.drop_duplicates(read_text(path), subset, keep)
+    pd.testing.assert_frame_equal(result, read_text(output))
+
+
+@pytest.mark.parametrize("percentage", [0, 0.2, 0.4, 0.5, 1])
+def test_drop_missing_data_cols_on_text_matches_program(tmp_path, path, percentage):
+    output = tmp_path / "output.csv"
+    drop_missing_cols_file(str(path), str(output), percentage)
+    result = preprocessing.drop_missing_data_cols(read_text(path), percentage)
+    pd.testing.assert_frame_equal(result, read_text(output))
+
+
+def test_values_differ_from_text(tmp_path, path):
+    df = pd.read_csv(path)
+    # 1 and 1.0 are the same value, but not the same text
+    assert preprocessing.drop_duplicates(df, ["id"])["id"].tolist() == [1.0, 2.0, 3.0]
+    assert preprocessing.drop_duplicates(read_text(path), ["id"])["id"].tolist() == ["1", "1.0", "2", "3"]
+    # NA and NULL are missing values, but not empty fields
+    assert preprocessing.drop_missing_data_cols(df, 0.5).columns.tolist() == ["id", "note"]
+    assert preprocessing.drop_missing_data_cols(read_text(path), 0.5).columns.tolist() == ["id", "code", "note"]
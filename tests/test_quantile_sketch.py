@@ -0,0 +1,62 @@
+"""Tests of the quantile sketch of quantile_sketch.py and of the exact median of fill_missing_values.py."""
+
+import numpy as np
+import pytest
+
+from fill_missing_values import median
+from quantile_sketch import QuantileSketch
+
+
+def rank_distance(values: 'np.ndarray', estimate: float, q: float) -> float:
+    """Distance between q and the range of ranks of the estimate, as a fraction of the number of values."""
+    low = np.searchsorted(values, estimate, side="left") / len(values)
+    high = np.searchsorted(values, estimate, side="right") / len(values)
+    return max(low - q, q - high, 0.0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rank_error_bound(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(size=200000)
+    sketch = QuantileSketch(error=0.01, seed=seed).update(values)
+    values.sort()
+    assert 0 < sketch.rank_error() <= 0.01
+    for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+        assert rank_distance(values, sketch.quantile(q), q) <= sketch.rank_error()
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_merged_chunks_keep_the_bound(seed):
+    rng = np.random.default_rng(seed)
+    # sorted input is the worst order for the compactions
+    values = np.sort(rng.normal(size=100000))
+    merged = QuantileSketch(error=0.01, seed=seed)
+    for chunk in np.array_split(values, 37):
+        merged.merge(QuantileSketch(error=0.01, seed=seed).update(chunk))
+    assert merged.count == len(values)
+    assert merged.rank_error() <= 0.01
+    assert rank_distance(values, merged.median(), 0.5) <= merged.rank_error()
+
+
+def test_exact_until_compacted():
+    sketch = QuantileSketch(error=0.1).update([4, np.nan, 1, 3, 2])
+    assert sketch.count == 4
+    assert sketch.rank_error() == 0.0
+    assert sketch.median() == 2.5
+
+
+def test_empty_and_invalid():
+    assert np.isnan(QuantileSketch().median())
+    assert QuantileSketch().rank_error() == 0.0
+    with pytest.raises(ValueError):
+        QuantileSketch(error=0)
+
+
+def test_exact_median():
+    data = [5.0, 1.0, 4.0, 2.0]
+    assert median(data) == 3.0
+    assert data == [5.0, 1.0, 4.0, 2.0]
+    assert median([3, 1, 2]) == 2.0
+    assert median([]) == 0
+    values = np.random.default_rng(0).normal(size=10001)
+    assert median(values) == np.median(values)
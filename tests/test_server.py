@@ -0,0 +1,103 @@
+"""Tests of server.py and client.py."""
+
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+
+import pytest
+
+import column_profile
+import columnar_cache
+import server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets only")
+
+
+def test_default_socket_in_runtime_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert server.default_socket() == str(tmp_path / "preprocessing_data.sock")
+
+
+def test_default_socket_in_private_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(server.tempfile, "gettempdir", lambda: str(tmp_path))
+    path = server.default_socket()
+    directory = os.path.dirname(path)
+    assert os.path.dirname(directory) == str(tmp_path)
+    server.private_directory(directory)
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+
+def test_private_directory_rejects_shared_directory_and_link(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir(mode=0o755)
+    shared.chmod(0o755)
+    with pytest.raises(PermissionError):
+        server.private_directory(str(shared))
+    private = tmp_path / "private"
+    server.private_directory(str(private))
+    link = tmp_path / "link"
+    link.symlink_to(private)
+    with pytest.raises(PermissionError):
+        server.private_directory(str(link))
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid") or os.getuid() != 0, reason="needs root to give the socket away")
+def test_socket_of_another_user_is_refused(tmp_path):
+    path = str(tmp_path / "a.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as listener:
+        listener.bind(path)
+        listener.listen()
+        os.chown(path, 12345, -1)
+        with pytest.raises(PermissionError):
+            server.send_request(path, {"status": True})
+
+
+# whole-table programs, which read their table from the server's cache
+PROGRAMS = [
+    ("fill_missing_values", ["--in=a.csv", "--out=output_fill.csv"]),
+    ("drop_missing_data_rows", ["--in=a.csv", "--percent=5"]),
+    ("solve_equation", ["a.csv", "LotArea*2+MSSubClass"]),
+]
+
+
+def outputs(directory) -> 'dict':
+    """Read and remove the outputs of the programs."""
+    result = {}
+    for path in sorted(directory.glob("output_*")):
+        result[path.name] = path.read_bytes()
+        path.unlink()
+    return result
+
+
+def test_cached_runs_match_direct_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(os.path.join(ROOT, "house-prices.csv"), tmp_path / "a.csv")
+    for program, args in PROGRAMS:
+        assert server.run_program(program, args, str(tmp_path))["code"] == 0
+    expected = outputs(tmp_path)
+
+    path = str(tmp_path / "server.sock")
+    thread = threading.Thread(target=server.serve, args=(path, 64))
+    thread.start()
+    try:
+        while not os.path.exists(path):
+            time.sleep(0.01)
+        # the first run reads the table, the next ones get it from the cache
+        for _ in range(3):
+            for program, args in PROGRAMS:
+                response = server.send_request(path, {"program": program, "args": args, "cwd": str(tmp_path)})
+                assert response["code"] == 0, response["stderr"]
+            assert outputs(tmp_path) == expected
+        status = json.loads(server.send_request(path, {"status": True})["stdout"])
+        assert status["hits"] == 3 * len(PROGRAMS) - 1 and status["misses"] == 1
+    finally:
+        server.send_request(path, {"stop": True})
+        thread.join()
+    assert columnar_cache.memory_cache is None
@@ -0,0 +1,56 @@
+"""Tests of table_schema.py: the compact tables hold the same values as with the default types."""
+
+import os
+
+import pandas as pd
+import pytest
+
+import column_profile
+import table_schema
+from compressed_input import read_csv as read_default
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The sample of the first 4 rows fits int8, float32 and categories, the next rows don't
+BEYOND_SAMPLE = ('small,whole,name,wide\n'
+                 '1,1.0,a,1\n2,,b,2\n3,3.0,a,3\n4,4.0,b,4\n'
+                 '1000,0.5,c,5000000000\n-7,16777217.0,,6\n5,5.0,d,7\n')
+
+
+@pytest.fixture
+def schema_on(monkeypatch):
+    monkeypatch.setattr(column_profile, "CACHE_DIR", "")
+    monkeypatch.setattr(table_schema, "SCHEMA", True)
+
+
+def assert_same_values(compact: 'pd.DataFrame', default: 'pd.DataFrame'):
+    widened = table_schema.widen(compact)
+    # pandas reads a column without any value as floats, but as a categorical with the schema
+    empty = [name for name in default.columns if default[name].isna().all()]
+    pd.testing.assert_frame_equal(widened.drop(columns=empty), default.drop(columns=empty))
+    assert widened[empty].isna().all().all()
+
+
+@pytest.mark.parametrize("chunksize", [None, 1, 3, 4, 100])
+def test_values_beyond_the_sample_are_kept(tmp_path, monkeypatch, schema_on, chunksize):
+    monkeypatch.setattr(table_schema, "SAMPLE_ROWS", 4)
+    path = tmp_path / "a.csv"
+    path.write_text(BEYOND_SAMPLE)
+    schema = table_schema.infer_schema(str(path))
+    assert schema["columns"] == {"small": "int8", "whole": "float32", "name": "category", "wide": "int8"}
+    if chunksize is None:
+        assert_same_values(table_schema.read_csv(str(path)), read_default(str(path)))
+        return
+    for compact, default in zip(table_schema.read_csv(str(path), chunksize=chunksize),
+                                read_default(str(path), chunksize=chunksize)):
+        assert_same_values(compact, default)
+
+
+def test_house_prices_is_smaller_with_the_same_values(schema_on):
+    path = os.path.join(ROOT, "house-prices.csv")
+    compact = table_schema.read_csv(path)
+    default = read_default(path)
+    assert_same_values(compact, default)
+    assert compact.memory_usage(deep=True).sum() < default.memory_usage(deep=True).sum() / 2
+    pd.testing.assert_frame_equal(pd.concat(table_schema.read_csv(path, chunksize=300), ignore_index=True)
+                                  .pipe(table_schema.widen), default, check_categorical=False)